@@ -0,0 +1,54 @@
+#Alert sequencer playing vibration, LED and RGB unit patterns without blocking
+#A pattern is a tuple of steps (ms, vibration, led, rgb), rgb True moves the alert color
+#on the RGB unit one pixel further. Nothing runs while there is no alert: start() creates
+#the task playing the steps and stop() cancels it, so an acknowledgement silences the
+#device at once and the steady state costs no wakeups.
+
+try:
+  import uasyncio as asyncio
+except:
+  import asyncio
+
+OFF = (0, 0, 0, False)
+
+class AlertSequencer:
+
+  def __init__(self, output):
+    self.output = output #called with each step
+    self.task = None
+
+  def active(self):
+    return self.task != None
+
+  def start(self, intro, loop):
+    #plays intro once, then loop until stopped, an alert already playing goes on
+    if self.task != None:
+      return
+    self.task = asyncio.create_task(self.play(intro, loop))
+
+  def stop(self):
+    if self.task == None:
+      return
+    task = self.task
+    self.task = None
+    task.cancel()
+    self.output(OFF)
+
+  async def play(self, intro, loop):
+    try:
+      for step in intro:
+        await self.step(step)
+      while len(loop) > 0:
+        for step in loop:
+          await self.step(step)
+      self.task = None
+      self.output(OFF)
+    except Exception:
+      #a failing output must not leave the vibration motor running
+      self.task = None
+      self.output(OFF)
+      raise
+
+  async def step(self, step):
+    self.output(step)
+    await asyncio.sleep_ms(step[0])
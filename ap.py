@@ -6,33 +6,14 @@ import network
 import esp
 esp.osdebug(None)
 import uos
-import ujson
-import sys
-import os
+
+from configfile import CONFIG, CONFIG_FILE, saveConfigFile, readConfigFile
 
 SSID = 'AP-M5DiabConf'
 PASSWORD = '123456789'
-CONFIG = 'config'
-CONFIG_FILE = 'config.json'
 
 ipconfig = None
 
-def saveConfigFile(config):
-  try:
-    with open(CONFIG_FILE, 'w') as confFile:
-      ujson.dump(config, confFile) 
-    print("Successfully saved config file")
-  except Exception as e:
-    sys.print_exception(e) 
-
-def readConfigFile():
-  try:
-    os.stat(CONFIG_FILE)
-    confFile = open(CONFIG_FILE, 'r')
-    return ujson.loads(confFile.read())
-  except Exception as e:
-    sys.print_exception(e)     
-
 def randstr(length=20):
     source = 'abcdefghijklmnopqrstuvwxyz1234567890'
     return ''.join([source[x] for x in [(uos.urandom(1)[0] % len(source)) for _ in range(length)]])
@@ -68,6 +49,31 @@ def unquote(string):
 
     return bytes(res)
 
+def readRequest(conn):
+  #the request head and the whole body announced by Content-Length, which may arrive
+  #in several segments after the head
+  request = b''
+  while request.find(b'\r\n\r\n') == -1:
+    chunk = conn.recv(1024)
+    if not chunk:
+      break
+    request += chunk
+  end = request.find(b'\r\n\r\n')
+  if end == -1:
+    return (request.decode(), '')
+  head = request[:end].decode()
+  body = request[end+4:]
+  length = 0
+  for line in head.split('\r\n')[1:]:
+    if line.lower().startswith('content-length:'):
+      length = int(line[15:].strip())
+  while len(body) < length:
+    chunk = conn.recv(1024)
+    if not chunk:
+      break
+    body += chunk
+  return (head, body[:length].decode())
+
 def open_access_point(successCallback):
 
   ap = network.WLAN(network.AP_IF)
@@ -97,8 +103,7 @@ def open_access_point(successCallback):
   while True:
     conn, addr = s.accept()
     print('Got a connection from %s' % str(addr))
-    request = conn.recv(1024)
-    contentStr = request.decode()
+    (contentStr, configParams) = readRequest(conn)
     print('Content = %s' % contentStr)
     splittedRequest = contentStr.split()
     #rmethod = splittedRequest[0]
@@ -109,15 +114,15 @@ def open_access_point(successCallback):
     conn.send('Connection: close\n\n')
 
     if rurl.find("/config") != -1:
-      splittedRequest = contentStr.split('\r\n')
-      configParams = splittedRequest[len(splittedRequest)-1]
       print('Config params: ' + configParams) 
       entries = configParams.split('&') 
       wifi_ssid = None
       wifi_password = None
       config = {}
       for entry in entries:
-        [k,v] = entry.split('=')
+        if entry.find('=') == -1:
+          continue
+        [k,v] = entry.split('=', 1)
         value = unquote(v).decode()
         if k == 'ssid': wifi_ssid = value
         elif k == 'wifi_password': wifi_password = value  
@@ -0,0 +1,88 @@
+#Boot stages run as tasks of the event loop in the order of their dependencies
+#A stage starts as soon as all stages it depends on are done, so stages waiting for the
+#radio, e.g. the Wi-Fi association, let independent ones like peripheral probes and
+#flash loads run meanwhile. Every stage is timed from boot and the critical path, the
+#chain of stages each waiting for the one before, is logged when all are done.
+
+import sys
+import utime
+
+try:
+  import uasyncio as asyncio
+except:
+  import asyncio
+
+class Stage:
+
+  def __init__(self, name, action, after):
+    self.name = name
+    self.action = action #async function without arguments
+    self.after = after #names of the stages to wait for
+    self.done = asyncio.Event()
+    self.start = None #ms since boot
+    self.end = None
+    self.error = None
+
+class BootGraph:
+
+  def __init__(self, bootTicks):
+    self.bootTicks = bootTicks
+    self.stages = []
+
+  def stage(self, name, action, after=()):
+    for dependency in after:
+      if self.find(dependency) == None: raise ValueError('Unknown boot stage ' + dependency)
+    self.stages.append(Stage(name, action, after))
+
+  def find(self, name):
+    for stage in self.stages:
+      if stage.name == name:
+        return stage
+    return None
+
+  def elapsed(self):
+    return utime.ticks_diff(utime.ticks_ms(), self.bootTicks)
+
+  async def runStage(self, stage):
+    for dependency in stage.after:
+      d = self.find(dependency)
+      await d.done.wait()
+      if d.error != None:
+        stage.error = d.error
+        print('Boot stage ' + stage.name + ' skipped, ' + d.name + ' failed')
+        stage.done.set()
+        return
+    stage.start = self.elapsed()
+    try:
+      await stage.action()
+    except Exception as e:
+      sys.print_exception(e)
+      stage.error = e
+    stage.end = self.elapsed()
+    print('Boot stage ' + stage.name + ' ' + str(stage.end - stage.start) + ' ms, done at ' + str(stage.end) + ' ms')
+    stage.done.set()
+
+  async def run(self):
+    #the first error of a stage is raised once all stages are done or skipped
+    tasks = [asyncio.create_task(self.runStage(stage)) for stage in self.stages]
+    for task in tasks:
+      await task
+    print('Boot critical path ' + self.criticalPath())
+    for stage in self.stages:
+      if stage.error != None:
+        raise stage.error
+
+  def criticalPath(self):
+    #from the stage done last back through the dependency each stage waited for longest
+    path = []
+    stage = None
+    for s in self.stages:
+      if s.end != None and (stage == None or s.end > stage.end): stage = s
+    while stage != None:
+      path.insert(0, stage.name + ' ' + str(stage.end - stage.start) + ' ms')
+      last = None
+      for dependency in stage.after:
+        d = self.find(dependency)
+        if d.end != None and (last == None or d.end > last.end): last = d
+      stage = last
+    return ' > '.join(path)
@@ -0,0 +1,74 @@
+#Poll scheduler following the cadence of the CGM readings
+#The reading interval and its phase are learned from the timestamps in the history, so
+#the backend only has to be polled from a margin before the next reading is due until
+#it arrived (or a late window passed). In between the radio can doze or be switched off.
+#It also keeps the time the radio was needed to estimate radio-on seconds per hour.
+
+import utime
+
+class PollScheduler:
+
+  def __init__(self, interval=300, margin=20, window=60, retry=5, maxRetry=60):
+    self.nominal = interval
+    self.interval = interval
+    self.margin = margin #secs before a reading is due the polling starts
+    self.window = window #secs after a reading was due the polling goes on
+    self.retry = retry
+    self.maxRetry = maxRetry
+    self.failures = 0
+    self.last = None #local time seconds of the newest reading
+    self.started = utime.time()
+    self.awakeSince = utime.ticks_ms()
+    self.awakeMs = 0
+
+  def learn(self, history, samples=12):
+    #median of the recent gaps between readings, gaps left by missed readings are ignored
+    n = len(history)
+    if n == 0:
+      return
+    gaps = []
+    for i in range(max(n - samples, 1), n):
+      gap = history.time(i) - history.time(i - 1)
+      if gap >= self.nominal // 2 and gap <= self.nominal * 3 // 2: gaps.append(gap)
+    if len(gaps) > 0:
+      gaps.sort()
+      self.interval = gaps[len(gaps) // 2]
+    self.last = history.time(n - 1)
+
+  def due(self, now):
+    #local time seconds the next reading is expected, a slot whose window has passed
+    #without a reading is skipped
+    if self.last == None:
+      return now
+    k = max((now - self.window - self.last) // self.interval + 1, 1)
+    return self.last + k * self.interval
+
+  def delay(self, now):
+    #secs to wait before the next poll, 0 to poll right away
+    return max(self.due(now) - self.margin - now, 0)
+
+  def succeeded(self):
+    self.failures = 0
+
+  def failed(self):
+    #secs to wait before retrying, doubled with every failure in a row
+    delay = min(self.retry * (1 << min(self.failures, 8)), self.maxRetry)
+    self.failures += 1
+    return delay
+
+  def sleep(self):
+    if self.awakeSince != None:
+      self.awakeMs += utime.ticks_diff(utime.ticks_ms(), self.awakeSince)
+      self.awakeSince = None
+
+  def wake(self):
+    if self.awakeSince == None:
+      self.awakeSince = utime.ticks_ms()
+
+  def radioSecondsPerHour(self):
+    awake = self.awakeMs
+    if self.awakeSince != None: awake += utime.ticks_diff(utime.ticks_ms(), self.awakeSince)
+    total = utime.time() - self.started
+    if total <= 0:
+      return 0
+    return min(awake * 3.6 / total, 3600)
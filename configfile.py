@@ -0,0 +1,25 @@
+#config.json read and written by the app and by the configuration portal in ap.py,
+#kept apart so the app imports the portal only when it has to open it
+
+import ujson
+import sys
+import os
+
+CONFIG = 'config'
+CONFIG_FILE = 'config.json'
+
+def saveConfigFile(config):
+  try:
+    with open(CONFIG_FILE, 'w') as confFile:
+      ujson.dump(config, confFile) 
+    print("Successfully saved config file")
+  except Exception as e:
+    sys.print_exception(e) 
+
+def readConfigFile():
+  try:
+    os.stat(CONFIG_FILE)
+    confFile = open(CONFIG_FILE, 'r')
+    return ujson.loads(confFile.read())
+  except Exception as e:
+    sys.print_exception(e)     
@@ -1,4 +1,18 @@
 ampy --port /dev/ttyACM0 put main.py
 ampy --port /dev/ttyACM0 put ap.py
+ampy --port /dev/ttyACM0 put configfile.py
+ampy --port /dev/ttyACM0 put widgets.py
+ampy --port /dev/ttyACM0 put history.py
+ampy --port /dev/ttyACM0 put journal.py
+ampy --port /dev/ttyACM0 put entries.py
+ampy --port /dev/ttyACM0 put httpclient.py
+ampy --port /dev/ttyACM0 put cadence.py
+ampy --port /dev/ttyACM0 put alerts.py
+ampy --port /dev/ttyACM0 put orientation.py
+ampy --port /dev/ttyACM0 put touchinput.py
+ampy --port /dev/ttyACM0 put power.py
+ampy --port /dev/ttyACM0 put stats.py
+ampy --port /dev/ttyACM0 put bootgraph.py
+ampy --port /dev/ttyACM0 put timesync.py
 ampy --port /dev/ttyACM0 put config.html
 ampy --port /dev/ttyACM0 put success.html
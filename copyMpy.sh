@@ -0,0 +1,23 @@
+#Copies the app to the device as precompiled bytecode, so it is not compiled on every boot
+#The firmware runs only a main.py source file, the code of main.py goes to app.mpy and
+#main.py becomes a loader of it. mpy-cross has to match the MicroPython version of the
+#firmware, e.g. pip install mpy-cross==1.24.1. copyAll.sh switches back to the sources.
+set -e
+PORT=/dev/ttyACM0
+MODULES="ap configfile widgets history journal entries httpclient cadence alerts orientation touchinput power stats bootgraph timesync"
+rm -rf build
+mkdir build
+for m in $MODULES; do
+  mpy-cross -o build/$m.mpy $m.py
+done
+mpy-cross -o build/app.mpy main.py
+echo "import app" > build/main.py
+for m in $MODULES; do
+  #a source file would be imported instead of its bytecode
+  ampy --port $PORT rm $m.py || true
+  ampy --port $PORT put build/$m.mpy
+done
+ampy --port $PORT put build/app.mpy
+ampy --port $PORT put build/main.py
+ampy --port $PORT put config.html
+ampy --port $PORT put success.html
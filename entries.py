@@ -0,0 +1,182 @@
+#Streaming parser for Nightscout entries.json responses
+#The body is read from the response stream in small fixed chunks and only the fields
+#drawScreen and backendMonitor use are kept, so the heap needed for a poll depends
+#neither on the number of entries the server returns nor on their extra fields.
+#A make function turns the fields of every entry into a compact record as soon as the
+#entry is complete, so the fields dict is garbage right away.
+
+FIELDS = {b'sgv': 'sgv', b'date': 'date', b'direction': 'direction', b'id': 'id', b'ago': 'ago'}
+MAX_TOKEN = 32 #longer keys and values are cut, none of the kept fields is that long
+
+QUOTE = 0x22
+BACKSLASH = 0x5C
+COLON = 0x3A
+COMMA = 0x2C
+OPEN_OBJECT = 0x7B
+CLOSE_OBJECT = 0x7D
+OPEN_ARRAY = 0x5B
+CLOSE_ARRAY = 0x5D
+WHITESPACE = b' \t\r\n'
+
+#Nightscout trend directions as small ints, also the codes stored by the journal
+DIRECTIONS = ['NONE', 'DoubleUp', 'SingleUp', 'FortyFiveUp', 'Flat', 'FortyFiveDown', 'SingleDown', 'DoubleDown', 'NOT COMPUTABLE', 'RATE OUT OF RANGE']
+NONE = 0
+DOUBLE_UP = 1
+SINGLE_UP = 2
+FORTY_FIVE_UP = 3
+FLAT = 4
+FORTY_FIVE_DOWN = 5
+SINGLE_DOWN = 6
+DOUBLE_DOWN = 7
+
+def directionCode(direction):
+  if direction in DIRECTIONS:
+    return DIRECTIONS.index(direction)
+  return NONE
+
+def directionName(code):
+  return DIRECTIONS[code] if code < len(DIRECTIONS) else 'NONE'
+
+def rising(code):
+  return code >= DOUBLE_UP and code <= FORTY_FIVE_UP
+
+def falling(code):
+  return code >= FORTY_FIVE_DOWN and code <= DOUBLE_DOWN
+
+#a reading is a tuple of id, local time seconds, sgv, direction code and the backend's
+#'ago' text: MicroPython ignores __slots__, an instance would carry a dict
+ID = 0
+TIME = 1
+SGV = 2
+DIRECTION = 3
+AGO = 4
+
+def record(id, time, sgv, direction=NONE, ago=None):
+  return (id, time, sgv, direction, ago)
+
+class Parser:
+  #push parser, feed it chunks of the body and read entries when done
+
+  def __init__(self, limit=10, make=None):
+    self.limit = limit
+    self.make = make #fields dict to record, None keeps the dicts
+    self.entries = []
+    self.entry = None
+    self.depth = 0
+    self.inString = False
+    self.escape = False
+    self.expectKey = False
+    self.key = None
+    self.token = bytearray(MAX_TOKEN)
+    self.length = 0
+    self.scalar = False
+
+  def add(self, c):
+    if self.length < MAX_TOKEN:
+      self.token[self.length] = c
+      self.length += 1
+
+  def value(self, v):
+    #a complete value of the current key inside an entry
+    if self.entry != None and self.key != None:
+      self.entry[self.key] = v
+    self.key = None
+
+  def endScalar(self):
+    self.scalar = False
+    if self.depth == 2 and self.key != None:
+      text = bytes(self.token[:self.length])
+      if text == b'true': v = True
+      elif text == b'false': v = False
+      elif text == b'null': v = None
+      elif b'.' in text or b'e' in text or b'E' in text: v = float(text)
+      else: v = int(text)
+      self.value(v)
+    self.key = None
+
+  def feed(self, buf, n=None):
+    if n == None: n = len(buf)
+    for i in range(n):
+      c = buf[i]
+      if self.inString:
+        if self.escape:
+          self.escape = False
+          self.add(c)
+        elif c == BACKSLASH:
+          self.escape = True
+        elif c == QUOTE:
+          self.inString = False
+          if self.depth == 2:
+            if self.expectKey:
+              self.key = FIELDS.get(bytes(self.token[:self.length]))
+              self.expectKey = False
+            else:
+              self.value(str(self.token[:self.length], 'utf-8'))
+        else:
+          self.add(c)
+        continue
+      if self.scalar:
+        if c == COMMA or c == CLOSE_OBJECT or c == CLOSE_ARRAY or c in WHITESPACE:
+          self.endScalar()
+        else:
+          self.add(c)
+          continue
+      if c == QUOTE:
+        self.inString = True
+        self.length = 0
+      elif c == OPEN_OBJECT or c == OPEN_ARRAY:
+        self.depth += 1
+        if self.depth == 1 and c != OPEN_ARRAY:
+          raise ValueError('Response is not a list')
+        if self.depth == 2:
+          if c != OPEN_OBJECT:
+            raise ValueError('Entry is not an object')
+          self.entry = {} if len(self.entries) < self.limit else None
+          self.expectKey = True
+        elif self.depth > 2:
+          #nested values of a field are skipped
+          self.key = None
+      elif c == CLOSE_OBJECT or c == CLOSE_ARRAY:
+        if self.depth == 2 and self.entry != None:
+          self.entries.append(self.entry if self.make == None else self.make(self.entry))
+          self.entry = None
+        self.depth -= 1
+        if self.depth < 0:
+          raise ValueError('Unbalanced json')
+      elif c == COMMA:
+        if self.depth == 2:
+          self.expectKey = True
+      elif c == COLON or c in WHITESPACE:
+        pass
+      elif self.depth == 0:
+        raise ValueError('Response is not a list')
+      else:
+        self.scalar = True
+        self.length = 0
+        self.add(c)
+
+  def close(self):
+    if self.inString or self.depth != 0:
+      raise ValueError('Truncated json')
+    return self.entries
+
+def read(stream, limit=10, bufsize=128, make=None):
+  #entries from a blocking stream with readinto
+  parser = Parser(limit, make)
+  buf = bytearray(bufsize)
+  while True:
+    n = stream.readinto(buf)
+    if not n:
+      break
+    parser.feed(buf, n)
+  return parser.close()
+
+async def readAsync(body, limit=10, bufsize=128, make=None):
+  #entries from an asyncio stream, e.g. the body of an httpclient response
+  parser = Parser(limit, make)
+  while True:
+    data = await body.read(bufsize)
+    if not data:
+      break
+    parser.feed(data)
+  return parser.close()
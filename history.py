@@ -0,0 +1,121 @@
+#Fixed capacity sgv history kept in two parallel arrays used as a ring buffer
+#Readings are ordered by timestamp, the oldest one is dropped when the buffer is full.
+#288 readings (24h of 5 minute readings) take 1.7 KB
+
+from array import array
+
+class History:
+
+  def __init__(self, capacity=288):
+    self.capacity = capacity
+    #from a list, MicroPython does not document repeating an array and reads a bytearray
+    #as raw items where CPython takes its bytes one by one
+    self.times = array('I', [0] * capacity) #local time seconds
+    self.sgvs = array('H', [0] * capacity)
+    self.start = 0
+    self.count = 0
+
+  def __len__(self):
+    return self.count
+
+  def slot(self, i):
+    #array index of the i-th oldest reading
+    return (self.start + i) % self.capacity
+
+  def time(self, i):
+    return self.times[(self.start + i) % self.capacity]
+
+  def sgv(self, i):
+    return self.sgvs[(self.start + i) % self.capacity]
+
+  def newest(self):
+    #(seconds, sgv) of the newest reading or None
+    if self.count == 0:
+      return None
+    i = self.slot(self.count - 1)
+    return (self.times[i], self.sgvs[i])
+
+  def find(self, seconds):
+    #position of the first reading not older than seconds
+    lo = 0
+    hi = self.count
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self.time(mid) < seconds: lo = mid + 1
+      else: hi = mid
+    return lo
+
+  def get(self, seconds):
+    #sgv stored for this timestamp or None
+    i = self.find(seconds)
+    if i < self.count and self.time(i) == seconds:
+      return self.sgv(i)
+    return None
+
+  def append(self, seconds, sgv):
+    #O(1) for a reading newer than the newest one, older readings are merged in
+    if self.count > 0 and seconds <= self.time(self.count - 1):
+      self.merge([(seconds, sgv)])
+      return
+    if self.count < self.capacity:
+      i = self.slot(self.count)
+      self.count += 1
+    else:
+      i = self.start
+      self.start = (self.start + 1) % self.capacity
+    self.times[i] = seconds
+    self.sgvs[i] = sgv
+
+  def dropOldest(self):
+    #(seconds, sgv) of the dropped reading
+    i = self.start
+    self.start = (self.start + 1) % self.capacity
+    self.count -= 1
+    return (self.times[i], self.sgvs[i])
+
+  def clear(self):
+    self.start = 0
+    self.count = 0
+
+  def merge(self, batch):
+    #adds (seconds, sgv) pairs in any order, a reading with a known timestamp replaces
+    #the stored one. Only the part of the buffer from the oldest new reading on is rewritten
+    batch = sorted(batch)
+    if len(batch) == 0:
+      return
+    p = self.find(batch[0][0])
+    tail = [(self.time(i), self.sgv(i)) for i in range(p, self.count)]
+    merged = []
+    i = 0
+    j = 0
+    while i < len(tail) or j < len(batch):
+      if j == len(batch) or (i < len(tail) and tail[i][0] < batch[j][0]):
+        item = tail[i]
+        i += 1
+      else:
+        item = batch[j]
+        j += 1
+        if i < len(tail) and tail[i][0] == item[0]:
+          i += 1
+      if len(merged) > 0 and merged[-1][0] == item[0]:
+        merged[-1] = item
+      else:
+        merged.append(item)
+    self.count = p
+    for (seconds, sgv) in merged:
+      self.append(seconds, sgv)
+
+  def range(self, since=0, until=0xFFFFFFFF):
+    #(seconds, sgv) pairs with since <= seconds < until, oldest first
+    items = []
+    i = self.find(since)
+    while i < self.count:
+      seconds = self.time(i)
+      if seconds >= until:
+        break
+      items.append((seconds, self.sgv(i)))
+      i += 1
+    return items
+
+  def items(self):
+    return self.range()
@@ -0,0 +1,208 @@
+#Keep-alive HTTP/1.1 client for the backend API on asyncio streams
+#One connection to the endpoint stays open across requests, so a long-poll costs no TCP
+#connect and no TLS handshake, and waiting for the answer never blocks the other tasks.
+#When the connection has to be opened again the TLS session of the previous one is
+#offered for resumption, if the ssl module supports it.
+
+try:
+  import uasyncio as asyncio
+except:
+  import asyncio
+try:
+  import ussl as ssl
+except:
+  import ssl
+import time
+
+def ticksMs():
+  if hasattr(time, 'ticks_ms'): return time.ticks_ms()
+  return int(time.monotonic() * 1000)
+
+def ticksDiff(end, start):
+  if hasattr(time, 'ticks_diff'): return time.ticks_diff(end, start)
+  return end - start
+
+class Body:
+  #response body limited by Content-Length or chunked transfer encoding
+
+  def __init__(self, response, reader, length, chunked):
+    self.response = response
+    self.reader = reader
+    self.remaining = 0 if chunked else length
+    self.chunked = chunked
+    self.done = length == 0 and not chunked
+
+  async def read(self, size=128):
+    #at most size bytes, b'' at the end of the body
+    if self.done:
+      return b''
+    if self.chunked and self.remaining == 0:
+      line = await self.reader.readline()
+      if line == b'\r\n': line = await self.reader.readline()
+      self.remaining = int(line.split(b';')[0], 16)
+      if self.remaining == 0:
+        #trailer ends with an empty line
+        while (await self.reader.readline()) not in (b'\r\n', b''):
+          pass
+        self.done = True
+        return b''
+    data = await self.reader.read(size if self.remaining < 0 else min(size, self.remaining))
+    if len(data) == 0:
+      if self.remaining < 0:
+        #body delimited by the end of the connection
+        self.response.keepAlive = False
+        self.done = True
+        return b''
+      raise OSError('Connection closed in response body')
+    if self.remaining > 0:
+      self.remaining -= len(data)
+      if self.remaining == 0 and not self.chunked:
+        self.done = True
+    return data
+
+class Response:
+
+  def __init__(self, client):
+    self.client = client
+    self.keepAlive = True
+    self.status_code = None
+    self.headers = {}
+    self.raw = None
+
+  async def start(self, reader):
+    #reads the status line and the headers
+    line = await reader.readline()
+    if line == b'':
+      raise OSError('Connection closed by server')
+    parts = line.split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith(b'HTTP/1.'):
+      raise ValueError('Invalid status line')
+    self.status_code = int(parts[1])
+    if parts[0] == b'HTTP/1.0': self.keepAlive = False
+    while True:
+      line = await reader.readline()
+      if line in (b'\r\n', b'\n', b''):
+        break
+      k, v = line.split(b':', 1)
+      self.headers[str(k.strip(), 'ascii').lower()] = str(v.strip(), 'ascii')
+    if self.headers.get('connection', '').lower() == 'close': self.keepAlive = False
+    chunked = self.headers.get('transfer-encoding', '').lower() == 'chunked'
+    length = int(self.headers.get('content-length', '-1'))
+    self.raw = Body(self, reader, length, chunked)
+
+  def close(self):
+    #the connection is kept only when the body was read to its end
+    if self.raw == None:
+      return
+    if not (self.raw.done and self.keepAlive):
+      self.client.close()
+    self.raw = None
+
+class SessionContext:
+  #ssl context handed to open_connection, which wraps the socket itself: the session is
+  #added to the wrap_socket call of MicroPython and the wrap_bio call of CPython
+
+  def __init__(self, context, session):
+    self.context = context
+    self.session = session
+
+  def wrap_socket(self, sock, **kwargs):
+    return self.context.wrap_socket(sock, session=self.session, **kwargs)
+
+  def wrap_bio(self, incoming, outgoing, **kwargs):
+    return self.context.wrap_bio(incoming, outgoing, session=self.session, **kwargs)
+
+  def __getattr__(self, name):
+    return getattr(self.context, name)
+
+class Client:
+
+  def __init__(self, url, context=None):
+    scheme, _, host, base = (url + '/').split('/', 3)
+    self.tls = scheme == 'https:'
+    self.host = host
+    self.port = 443 if self.tls else 80
+    if ':' in host:
+      self.host, port = host.split(':')
+      self.port = int(port)
+    self.base = '/' + base.rstrip('/') if base.rstrip('/') != '' else ''
+    self.context = context
+    self.reader = None
+    self.writer = None
+    self.session = None
+    self.resumption = True #False once the ssl module turned a session down
+    self.requests = 0
+    self.connects = 0
+    self.resumed = 0
+    self.connectMs = 0
+
+  async def connect(self):
+    context = None
+    if self.tls:
+      if self.context == None:
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        if hasattr(self.context, 'check_hostname'): self.context.check_hostname = False
+        self.context.verify_mode = ssl.CERT_NONE
+      context = self.context
+      if self.session != None and self.resumption:
+        context = SessionContext(self.context, self.session)
+    s = ticksMs()
+    try:
+      self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=context, server_hostname=self.host if self.tls else None)
+    except TypeError:
+      if context == self.context:
+        raise
+      #no session resumption in this ssl module
+      self.resumption = False
+      self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.context, server_hostname=self.host)
+    self.connectMs += ticksDiff(ticksMs(), s)
+    self.connects += 1
+    if getattr(self.tlsSocket(), 'session_reused', False): self.resumed += 1
+
+  def tlsSocket(self):
+    #the ssl object of CPython's transport or the wrapped socket of MicroPython's stream
+    if not self.tls or self.writer == None:
+      return None
+    try:
+      sock = self.writer.get_extra_info('ssl_object')
+    except Exception:
+      sock = None
+    return sock if sock != None else getattr(self.writer, 's', None)
+
+  def close(self):
+    if self.writer != None:
+      #the session is only complete once the server sent its tickets, keep it for the next connect
+      session = getattr(self.tlsSocket(), 'session', None)
+      if session != None: self.session = session
+      try:
+        self.writer.close()
+      except Exception:
+        pass
+      self.reader = None
+      self.writer = None
+
+  async def get(self, path, headers=None):
+    request = 'GET ' + self.base + path + ' HTTP/1.1\r\nHost: ' + self.host + '\r\nConnection: keep-alive\r\n'
+    for k in (headers or {}):
+      request += k + ': ' + headers[k] + '\r\n'
+    request = (request + '\r\n').encode()
+    for attempt in range(2):
+      reused = self.writer != None
+      if not reused:
+        await self.connect()
+      try:
+        self.writer.write(request)
+        await self.writer.drain()
+        response = Response(self)
+        await response.start(self.reader)
+        self.requests += 1
+        return response
+      except OSError:
+        self.close()
+        #the server may have dropped an idle connection, a fresh one is tried once
+        if not reused:
+          raise
+    raise OSError('Request failed')
+
+  def stats(self):
+    return 'requests: ' + str(self.requests) + ', connects: ' + str(self.connects) + (' (TLS, ' + str(self.resumed) + ' resumed)' if self.tls else '') + ', connect time: ' + str(self.connectMs) + ' ms'
@@ -0,0 +1,84 @@
+#Append-only binary journal of sgv readings
+#Every reading is one fixed 8 byte record (local time seconds, sgv, direction code, check byte)
+#appended to the end of the file, so a reading costs 8 bytes of flash. A power loss can
+#only tear the last record, which the check byte exposes when the journal is loaded.
+#Once the file holds twice the capacity it is compacted: the newest records are written
+#to a temporary file which then replaces the journal.
+
+import os
+import struct
+
+RECORD = '<IHBB'
+RECORD_SIZE = 8
+def check(data):
+  #check byte over the first 7 bytes, never matches an erased or zeroed record
+  return (sum(data[:RECORD_SIZE - 1]) + 0x5A) & 0xFF
+
+def pack(seconds, sgv, direction):
+  data = struct.pack(RECORD, seconds, sgv, direction, 0)
+  return data[:RECORD_SIZE - 1] + bytes([check(data)])
+
+class Journal:
+
+  def __init__(self, filename, capacity=288):
+    self.filename = filename
+    self.tmpFilename = filename + '.tmp'
+    self.capacity = capacity
+    self.records = 0
+    self.last = None
+
+  def load(self):
+    #valid (seconds, sgv, direction) records, oldest first
+    data = None
+    for filename in (self.filename, self.tmpFilename):
+      try:
+        with open(filename, 'rb') as f:
+          data = f.read()
+        if filename == self.tmpFilename:
+          #compaction was cut off after the temporary file was complete
+          self.replace()
+        break
+      except OSError:
+        pass
+    if data == None:
+      return []
+    n = len(data) // RECORD_SIZE
+    #a torn write can only hit the end of the file, scan back to the last valid record
+    while n > 0 and data[n * RECORD_SIZE - 1] != check(data[(n - 1) * RECORD_SIZE:n * RECORD_SIZE]):
+      n -= 1
+    records = []
+    for i in range(n):
+      record = data[i * RECORD_SIZE:(i + 1) * RECORD_SIZE]
+      if record[RECORD_SIZE - 1] == check(record):
+        seconds, sgv, direction, c = struct.unpack(RECORD, record)
+        records.append((seconds, sgv, direction))
+    self.records = len(records)
+    self.last = records[-1] if len(records) > 0 else None
+    if n * RECORD_SIZE != len(data) or len(records) != n:
+      #appending after garbage would shift every following record
+      self.compact(records)
+    return records
+
+  def append(self, seconds, sgv, direction):
+    with open(self.filename, 'ab') as f:
+      f.write(pack(seconds, sgv, direction))
+    self.records += 1
+    self.last = (seconds, sgv, direction)
+    if self.records >= 2 * self.capacity:
+      self.compact(self.load())
+
+  def compact(self, records):
+    #keeps the newest capacity records, the journal is replaced only by a complete file
+    records = records[-self.capacity:]
+    with open(self.tmpFilename, 'wb') as f:
+      f.write(b''.join([pack(seconds, sgv, direction) for (seconds, sgv, direction) in records]))
+    self.replace()
+    self.records = len(records)
+
+  def replace(self):
+    try:
+      os.rename(self.tmpFilename, self.filename)
+    except OSError:
+      #FAT does not rename over an existing file
+      os.remove(self.filename)
+      os.rename(self.tmpFilename, self.filename)
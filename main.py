@@ -1,42 +1,78 @@
 #UiFlow2 https://uiflow-micropython.readthedocs.io/en/develop/
 
 import M5
-import ntptime
 from hardware import WDT, I2C, Pin
-import machine
-import requests2
 import math
 import time
 import network
 import sys
-import _thread
 import utime
-from collections import OrderedDict
+try:
+  import uasyncio as asyncio
+except:
+  import asyncio
 import re
-import ap
+import configfile
 import ujson
+import gc
+import esp
 from unit import ENVUnit, RGBUnit
+import widgets
+from history import History
+from journal import Journal
+import entries
+import httpclient
+from cadence import PollScheduler
+from alerts import AlertSequencer
+from orientation import OrientationDetector
+from touchinput import TouchInput
+from power import PowerManager
+from stats import GlucoseStats
+from bootgraph import BootGraph
+from timesync import TimeSync
+
+bootTicks = utime.ticks_ms() #time to first pixel and to the first live reading count from here
+esp.osdebug(None)
 
 EMERGENCY_PAUSE_INTERVAL = 1800  #sec = 30 mins
+ALERT_VIBRATE = ((1000, 128, 255, True),) #steps of ms, vibration, led, move rgb color
+ALERT_BLINK = ((700, 0, 255, True), (300, 0, 0, False))
 MODES = ["full_elapsed", "full_date", "full_battery", "basic", "flip_full_elapsed", "flip_full_date", "flip_full_battery", "chart", "flip_chart"]
-SGVDICT_FILE = 'sgvdict.txt'
-RESPONSE_FILE = 'response.json'
+JOURNAL_FILE = 'sgv.journal'
+WIFI_FILE = 'wifi.json' #ssid, bssid and channel of the last access point connected to
+WIFI_TIMEOUT = 10 #sec to wait for the association with a known access point
 BACKEND_TIMEOUT_MS = 30000 #max 60000
-MAX_SAVED_ENTRIES = 10
+HISTORY_SIZE = 288 #24h of 5 minute readings
+READING_INTERVAL = 300 #sec between cgm readings
+SYNC_MAX_ENTRIES = 36 #max entries requested per backend call, 3h of readings
+REFRESH_INTERVAL = 30 #sec between screen refreshes while the backend is not polled
+LOOP_WATCHDOG_MS = 120000 #max ms the event loop may be blocked
+WIFI_AWAKE = 0
+WIFI_POWERSAVE = 1
+WIFI_DISCONNECT = 2
 YEAR = 2025
 SCREEN_WIDTH = 320
 SCREEN_HEIGHT = 240
 
-drawScreenLock = _thread.allocate_lock()
+#retained widget tree, drawScreen only updates it and the screen redraws what changed
+screen = widgets.Screen()
+headerBand = screen.add(widgets.Band(0, int(SCREEN_HEIGHT/5), M5.Display.COLOR.DARKGREY))
+middleBand = screen.add(widgets.Band(int(SCREEN_HEIGHT/5), 3*int(SCREEN_HEIGHT/5), M5.Display.COLOR.BLACK))
+footerBand = screen.add(widgets.Band(SCREEN_HEIGHT-int(SCREEN_HEIGHT/5), int(SCREEN_HEIGHT/5), M5.Display.COLOR.DARKGREY))
+clockLabel = headerBand.add(widgets.Clock(10, 12, M5.Display.FONTS.DejaVu24))
+sgvDiffLabel = headerBand.add(widgets.Label(int(25 + SCREEN_WIDTH/2), 12, M5.Display.FONTS.DejaVu24, align=widgets.CENTER))
+batteryLabel = headerBand.add(widgets.Label(SCREEN_WIDTH - 10, 12, M5.Display.FONTS.DejaVu24, align=widgets.RIGHT))
+sgvLabel = middleBand.add(widgets.Label(0, 0, M5.Display.FONTS.DejaVu40, size=2.5))
+arrow = middleBand.add(widgets.Arrow())
+chart = middleBand.add(widgets.Chart(0, int(SCREEN_HEIGHT/5), SCREEN_WIDTH, 3*int(SCREEN_HEIGHT/5)))
+dateLabel = footerBand.add(widgets.Label(int(SCREEN_WIDTH/2), SCREEN_HEIGHT-24-12, M5.Display.FONTS.DejaVu24, align=widgets.CENTER))
 
 def getBatteryLevel():
   return M5.Power.getBatteryLevel() 
 
-def isOlderThan(date_str, mins, now_seconds, print_time=False): 
-  the_date = getDateTuple(date_str)
-  the_date_seconds = utime.mktime(the_date)
-  #print("Date: " + str(the_date) + " - " + str(the_date_seconds) + ", Now: " + str(now_seconds))
-  diff = (now_seconds - the_date_seconds)
+def isOlderThan(seconds, mins, now_seconds, print_time=False): 
+  #print("Date: " + str(seconds) + ", Now: " + str(now_seconds))
+  diff = (now_seconds - seconds)
   if print_time == True:
      printTime(diff, prefix='Entry read', suffix='ago')
   return (diff > (60 * mins) and getBatteryLevel() >= 5)  
@@ -46,49 +82,47 @@ def getDateTuple(date_str):
   [HH, MM, SS] = [int(i) for i in date_str.split('T')[1].split(':')]
   return (yyyy, mm, dd, HH, MM, SS, 0, 0)    
 
+def makeEntry(fields):
+  #the date is parsed once when the entry arrives, the fields dict is dropped right away
+  return entries.record(fields.get('id'), utime.mktime(getDateTuple(fields['date'])), fields['sgv'], entries.directionCode(fields.get('direction')), fields.get('ago'))
+
 def printTime(seconds, prefix='', suffix=''):
   m, s = divmod(seconds, 60)
   h, m = divmod(m, 60)
   print(prefix + ' {:02d}:{:02d}:{:02d} '.format(h, m, s) + suffix)  
 
-def saveResponseFile():
-  global response
-  with open(RESPONSE_FILE, 'w') as responseFile:
-    ujson.dump(response, responseFile) 
- 
+def getDateStr(seconds):
+  t = utime.localtime(seconds)
+  return '{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}'.format(t[0], t[1], t[2], t[3], t[4], t[5])
+
 def readResponseFile():
+  #the newest journaled readings stand in for the last response until the backend answers
   global response
-  try:
-    with open(RESPONSE_FILE, 'r') as responseFile:
-      response = ujson.loads(responseFile.read())
-  except Exception as e:
-    sys.print_exception(e)
-    saveError(e)
-    response = None
-    
-def saveSgvFile(sgvdict):
-  items = []
-  for key in sgvdict:
-    items.append(str(key) + ':' + str(sgvdict[key]))
-  content = '\n'.join(items)
-  with open(SGVDICT_FILE, 'w') as file:
-    file.write(content)
-
-def readSgvFile():
-  d = OrderedDict()
+  response = None
+  n = len(sgvHistory)
+  if n > 0:
+    response = []
+    for i in range(n - 1, max(n - 3, -1), -1):
+      seconds = sgvHistory.time(i)
+      direction = entries.NONE
+      if journal.last != None and journal.last[0] == seconds: direction = journal.last[2]
+      response.append(entries.record(None, seconds, sgvHistory.sgv(i), direction))
+
+def readJournal():
+  h = History(HISTORY_SIZE)
   try: 
-    with open(SGVDICT_FILE, 'r') as f:
-      sgvFile = f.read()
-    if sgvFile != None:
-      entries = sgvFile.split('\n')
-      for entry in entries:
-        if ":" in entry:
-          [s, v] = [int(i) for i in entry.split(':')]
-          d.update({s: v})   
+    records = journal.load()
+    h.merge([(seconds, sgv) for (seconds, sgv, direction) in records])
   except Exception as e:
     sys.print_exception(e)
     saveError(e)
-  return d 
+  return h 
+
+def freeHeap():
+  #bytes, -1 where the gc module cannot tell, e.g. in the simulator
+  gc.collect()
+  if hasattr(gc, 'mem_free'): return gc.mem_free()
+  return -1
 
 def saveError(e):
   now = utime.ticks_cpu()
@@ -97,63 +131,56 @@ def saveError(e):
     sys.print_exception(e, file)
 
 def persistEntries():
-  global response, sgvDict
-  saveResponseFile()
-  d = OrderedDict()
-  seconds = -1
-  for index, entry in enumerate(response):
-    the_date = getDateTuple(entry['date'])  
-    seconds = utime.mktime(the_date)
-    d.update({seconds: entry['sgv']})
-  
-  dictLen = len(d)  
-  for key in sgvDict:
-    if key < seconds and dictLen < MAX_SAVED_ENTRIES:
-       d.update({key: sgvDict[key]})
-    elif dictLen >= MAX_SAVED_ENTRIES:
-      break  
-    dictLen = len(d)
-
-  sgvDict = d
-  saveSgvFile(d)
-  print('\nPersisted ' + str(dictLen) + " sgv entries")
+  global response, sgvHistory
+  batch = []
+  appended = 0
+  #oldest first, so the last journal record is the newest reading
+  for entry in reversed(response):
+    if sgvHistory.get(entry[entries.TIME]) != entry[entries.SGV]:
+      journal.append(entry[entries.TIME], entry[entries.SGV], entry[entries.DIRECTION])
+      appended += 1
+    batch.append((entry[entries.TIME], entry[entries.SGV]))
+  sgvHistory.merge(batch)
+  glucoseStats.update(sgvHistory, batch)
+  print('\nPersisted ' + str(appended) + " new sgv entries, " + str(len(sgvHistory)) + " in history")
+
+def secondsOfDay(timeStr):
+  [HH, MM, SS] = [int(i) for i in timeStr.split(':')]
+  return HH * 3600 + MM * 60 + SS
+
+def inBeeperWindow():
+  #the beeper window is parsed once with the config, see BEEPER_START and BEEPER_END
+  now = utime.time()
+  if utime.localtime(now)[0] < YEAR:
+    raise ValueError('Invalid datetime: ' + str(utime.localtime(now)))
+  c = (now + secondsDiff) % 86400
+  if BEEPER_START < BEEPER_END:
+     #start | current | end 
+     return c > BEEPER_START and c < BEEPER_END
+  else:
+     # current | end | or | start | current 
+     return c > BEEPER_START or c < BEEPER_END
+
+def mayDim():
+  #the backlight is dimmed when idle if idleDim is on, but not while charging
+  try:
+    return IDLE_DIM == 1 and not M5.Power.isCharging()
+  except Exception as e:
+    sys.print_exception(e)
+    return False
+
+def isNight():
+  #the panel sleeps outside the beeper window when nightSleep is on
+  try:
+    return NIGHT_SLEEP == 1 and not inBeeperWindow()
+  except Exception as e:
+    sys.print_exception(e)
+    return False
 
 def checkBeeper():
-  global USE_BEEPER, BEEPER_START_TIME, BEEPER_END_TIME, secondsDiff
   try:   
     if (USE_BEEPER == 1 and getBatteryLevel() >= 5):
-      d = utime.localtime(0)
-      now_datetime = utime.localtime(utime.time()) 
-      if now_datetime[0] < YEAR:
-        raise ValueError('Invalid datetime: ' + str(now_datetime))
-      now = utime.mktime((now_datetime[0], now_datetime[1], now_datetime[2], now_datetime[3], now_datetime[4], now_datetime[5],0,0))
-      localtime = utime.localtime(now + secondsDiff)
-      
-      c = list(d)
-      c[3] = localtime[3]
-      c[4] = localtime[4]
-      c[5] = localtime[5]
-
-      d1 = list(d)
-      [HH, MM, SS] = [int(i) for i in BEEPER_START_TIME.split(':')]
-      d1[3] = HH
-      d1[4] = MM
-      d1[5] = SS
-
-      d2 = list(d)
-      [HH, MM, SS] = [int(i) for i in BEEPER_END_TIME.split(':')]
-      d2[3] = HH
-      d2[4] = MM
-      d2[5] = SS
-
-      #print("Compare start: " + str(d1) + ", end: " + str(d2) + ", current: " + str(c))
-      
-      if tuple(d1) < tuple(d2):
-         #d1 start | current | d2 end 
-         return tuple(c) > tuple(d1) and tuple(c) < tuple(d2)
-      else:
-         # current | d2 end | or | d1 start | current 
-         return tuple(c) > tuple(d1) or tuple(c) < tuple(d2)
+      return inBeeperWindow()
     else:
       return False 
   except Exception as e:
@@ -161,6 +188,153 @@ def checkBeeper():
     saveError(e)
     return False   
 
+def getRotation(mode):
+  #flip modes 4, 5, 6 and 8 are drawn upside down
+  if mode in range(4,7) or mode == 8: return 3
+  return 1
+
+def getChartPoints(newestEntry):
+  #sgvHistory gets the newest entry only after the screen has been drawn
+  seconds = newestEntry[entries.TIME]
+  points = sgvHistory.range(since=seconds - (chart.w // chart.step) * widgets.Chart.INTERVAL)
+  if len(points) == 0 or points[-1][0] < seconds: points.append((seconds, newestEntry[entries.SGV]))
+  return points
+
+def getSyncCount():
+  #entries to request: the readings missed since the newest one in the history, at
+  #least one, so a long poll that times out still returns the newest entry. Before the
+  #time is set the first call runs alongside ntp and asks for the most
+  newest = sgvHistory.newest()
+  if newest == None or not rtcValid(): return SYNC_MAX_ENTRIES
+  missing = int((utime.time() + secondsDiff - newest[0] + READING_INTERVAL / 2) // READING_INTERVAL)
+  return min(max(missing, 1), SYNC_MAX_ENTRIES)
+
+def getSgvDiff(entry):
+  #difference to the reading before entry in the history
+  newest = glucoseStats.newest()
+  if newest != None and newest[0] == entry[entries.TIME]: return glucoseStats.diff
+  i = sgvHistory.find(entry[entries.TIME])
+  if i == 0: return 0
+  return entry[entries.SGV] - sgvHistory.sgv(i - 1)
+
+def setAgoMins(entry):
+  #minutes the backend's 'ago' text counts, kept to count them on locally
+  global agoMins
+  agoMins = None
+  if entry[entries.AGO] != None:
+    agoMins = str(int((utime.time() + secondsDiff - entry[entries.TIME]) // 60))
+
+def refreshAgo(entry):
+  #the 'ago' text is localized by the backend, only its minutes are updated while it is not
+  #called, in a new entry as entries are tuples
+  global agoMins
+  if agoMins == None: return entry
+  mins = str(int((utime.time() + secondsDiff - entry[entries.TIME]) // 60))
+  words = entry[entries.AGO].split(' ')
+  if agoMins in words and mins != agoMins:
+    words[words.index(agoMins)] = mins
+    agoMins = mins
+    return entry[:entries.AGO] + (' '.join(words),)
+  return entry
+
+def readWifiCache():
+  try:
+    with open(WIFI_FILE, 'r') as f:
+      cache = ujson.loads(f.read())
+    bssid = None
+    if cache['bssid'] != None: bssid = bytes(cache['bssid'])
+    return (cache['ssid'], bssid, cache['channel'])
+  except Exception as e:
+    print('No cached wifi access point')
+    return None
+
+def saveWifiCache(ssid, bssid, channel):
+  #written only when the device moved to another access point
+  global wifiCache
+  cache = (ssid, bssid, channel)
+  if cache == wifiCache: return
+  try:
+    with open(WIFI_FILE, 'w') as f:
+      f.write(ujson.dumps({'ssid': ssid, 'bssid': list(bssid) if bssid != None else None, 'channel': channel}))
+    wifiCache = cache
+  except Exception as e:
+    sys.print_exception(e)
+    saveError(e)
+
+def scanWifi():
+  #known networks in range, the strongest first
+  known = []
+  try: 
+    nets = nic.scan()
+    for result in nets:
+      ssid = result[0].decode() 
+      if ssid in config: 
+        known.append((result[3], ssid, result[1], result[2]))
+      else:
+        print('No password for wifi ' + ssid + ' found')  
+  except Exception as e:
+    sys.print_exception(e)
+    saveError(e)
+    printBootStatus("Wifi not found!", backgroundColor=M5.Display.COLOR.RED)  
+  known.sort(reverse=True)
+  return known
+
+async def joinWifi(ssid, password, bssid=None, timeout=WIFI_TIMEOUT):
+  #with a bssid the driver associates right away instead of scanning all channels first
+  nic.connect(ssid, password, bssid=bssid)
+  start = utime.ticks_ms()
+  while not nic.isconnected():
+    status = nic.status()
+    if status == network.STAT_NO_AP_FOUND or status == network.STAT_WRONG_PASSWORD:
+      nic.disconnect()
+      raise OSError('Wifi ' + ssid + ' connect failed with status ' + str(status))
+    if utime.ticks_diff(utime.ticks_ms(), start) > timeout * 1000:
+      nic.disconnect()
+      raise OSError('Wifi ' + ssid + ' connect timeout')
+    await asyncio.sleep(0.25)
+
+async def reconnectWifi(timeout=20):
+  if nic.isconnected(): return
+  print('Reconnecting wifi ' + wifi_ssid)
+  nic.active(True)
+  if wifiCache != None and wifiCache[0] == wifi_ssid and wifiCache[1] != None:
+    try:
+      await joinWifi(wifi_ssid, wifi_password, wifiCache[1])
+      return
+    except OSError as e:
+      print('Cached wifi access point not reachable')
+  await joinWifi(wifi_ssid, wifi_password, timeout=timeout)
+  #any access point of the network, the next boot connects without a bssid
+  saveWifiCache(wifi_ssid, None, nic.config('channel'))
+
+async def sleepUntilPoll(seconds):
+  #the radio dozes or is switched off until shortly before the next reading is due,
+  #the screen is refreshed meanwhile so 'ago' and the old data checks stay current
+  global response
+  print('Next reading due in ' + str(seconds + pollScheduler.margin) + ' secs, polling again in ' + str(seconds) + ' secs')
+  pollScheduler.sleep()
+  if WIFI_SLEEP == WIFI_DISCONNECT:
+    backendClient.close()
+    nic.disconnect()
+    nic.active(False)
+  else:
+    nic.config(pm=nic.PM_POWERSAVE)
+  end = utime.time() + seconds
+  while utime.time() < end:
+    await asyncio.sleep(min(end - utime.time(), REFRESH_INTERVAL))
+    if response != None and utime.time() < end:
+      response[0] = refreshAgo(response[0])
+      requestScreen(response[0])
+  pollScheduler.wake()
+  if WIFI_SLEEP == WIFI_DISCONNECT:
+    await reconnectWifi()
+  else:
+    nic.config(pm=nic.PM_PERFORMANCE)
+
+def rtcValid():
+  #the RTC keeps running through a watchdog reset, after power on it starts in 2000
+  return utime.localtime(utime.time())[0] >= YEAR
+
 def getRtcDatetime():
   now_datetime = None
   for i in range(3):
@@ -172,86 +346,23 @@ def getRtcDatetime():
 # gui methods ----
 
 def printCenteredText(msg, mode, font=M5.Display.FONTS.DejaVu24, backgroundColor=M5.Display.COLOR.BLACK, textColor=M5.Display.COLOR.WHITE, clear=True):  
-  if mode >= 4:
-    M5.Display.setRotation(3)
-  else:        
-    M5.Display.setRotation(1)
+  M5.Display.setRotation(getRotation(mode))
     
   if clear:
     M5.Display.clear(backgroundColor)
+  screen.invalidate()
         
-  M5.Display.setFont(font)
-    
   M5.Display.setTextColor(textColor, backgroundColor)
     
-  w = M5.Display.textWidth(msg)
-  f = M5.Display.fontHeight()
+  w = widgets.METRICS.width(font, 1, msg)
+  f = widgets.METRICS.height(font)
   x = int((SCREEN_WIDTH-w)/2)
   y = int((SCREEN_HEIGHT-f)/2)
 
+  M5.Display.setFont(font)
   M5.Display.drawString(msg, x, y)
 
-def printText(msg, x, y, font=None, backgroundColor=M5.Display.COLOR.BLACK, textColor=M5.Display.COLOR.WHITE, clear=False, rotate=1, silent=False):
-  M5.Display.setRotation(rotate)  
-    
-  if clear:
-    M5.Display.clear(backgroundColor)
-        
-  if font != None:       
-    M5.Display.setFont(font)
-    
-  M5.Display.setTextColor(textColor, backgroundColor)
-    
-  M5.Display.drawString(msg, x, y)
-  
-  if silent == False:
-    print("Printing " + msg)
-
-def drawDirectionV2(cx, cy, radius=48, angle_degrees=0, gap=16, circle_color=M5.Display.COLOR.WHITE, tri_color=M5.Display.COLOR.WHITE, ydiff=0):
-    #cx - Center X coordinate
-    #cy - Center Y coordinate
-    #radius - Radius of the circle
-    #gap - Pixel gap
-    #circle_color 
-    #tri_color
-    #ydiff - triangle distance 
-    
-    # 1. Clear previous state
-    M5.Lcd.fillCircle(cx, cy, radius, circle_color)
-
-    r_tri = radius - gap
-    
-    # 2. Adjust the Angle
-    # We subtract 90 degrees so that Input 0 aligns with "Up" (270 deg / -90 deg on circle)
-    # We add the user input 'angle_degrees' to rotate clockwise from there.
-    adjusted_angle = angle_degrees - 90
-    rotation_rad = adjusted_angle * (math.pi / 180)
-
-    # 3. Calculate Vertices
-    
-    # Vertex 1: The "Pointer"
-    v1_angle = rotation_rad
-    x1 = cx + int(r_tri * math.cos(v1_angle))
-    y1 = cy + int(r_tri * math.sin(v1_angle))
-
-    # Vertex 2: +120 degrees from pointer
-    v2_angle = rotation_rad + (2 * math.pi / 3)
-    x2 = cx + int(r_tri * math.cos(v2_angle))
-    y2 = cy + int(r_tri * math.sin(v2_angle))
-
-    # Vertex 3: +240 degrees from pointer
-    v3_angle = rotation_rad + (4 * math.pi / 3)
-    x3 = cx + int(r_tri * math.cos(v3_angle))
-    y3 = cy + int(r_tri * math.sin(v3_angle))
-
-    # 4. Draw
-    if ydiff == 0:
-      M5.Lcd.fillTriangle(x1, y1, x2, y2, x3, y3, tri_color)
-    else:  
-      M5.Lcd.fillTriangle(x1, y1-ydiff, x2, y2-ydiff, x3, y3-ydiff, tri_color)
-      M5.Lcd.fillTriangle(x1, y1+ydiff, x2, y2+ydiff, x3, y3+ydiff, tri_color)
-
-def printLocaltime(mode, secondsDiff, localtime=None, useLock=False, silent=False):
+def printLocaltime(mode, secondsDiff, localtime=None, render=True, silent=False):
   try: 
     if localtime == None:
       now_datetime = getRtcDatetime()
@@ -261,252 +372,291 @@ def printLocaltime(mode, secondsDiff, localtime=None, useLock=False, silent=Fals
     if (localtime[3] < 10): h = "0" + h   
     m = str(localtime[4])
     if (localtime[4] < 10): m = "0" + m
-    s = str(localtime[5])
-    if (localtime[5] < 10): s = "0" + s
-    timeStr = h + ":" + m + ":" + s
-    locked = False 
-    if useLock == False and drawScreenLock.locked() == False:
-      locked = drawScreenLock.acquire()
-    if locked == True or useLock == True:
-      rotate = 1
-      if mode >= 4:
-        rotate = 3
-      printText(timeStr, 10, 12, font=M5.Display.FONTS.DejaVu24, backgroundColor=M5.Display.COLOR.DARKGREY, silent=silent, rotate=rotate)  
-      if useLock == False and locked == True:
-        drawScreenLock.release()
+    timeStr = h + ":" + m
+    clockLabel.update(timeStr)
+    clockLabel.silent = silent
+    if render == True:
+      screen.render(getRotation(mode), only=clockLabel)
   except Exception as e:
     sys.print_exception(e)
     saveError(e)
 
 def drawScreen(newestEntry, noNetwork=False):
-  global response, mode, brightness, emergency, emergencyPause, MIN, MAX, EMERGENCY_MIN, EMERGENCY_MAX, startTime, rgbUnit, secondsDiff, OLD_DATA, OLD_DATA_EMERGENCY, batteryStrIndex, envUnit, secondsDiff 
+  global response, mode, brightness, emergency, emergencyPause, MIN, MAX, EMERGENCY_MIN, EMERGENCY_MAX, startTime, rgbUnit, secondsDiff, OLD_DATA, OLD_DATA_EMERGENCY, batteryStrIndex, envUnit, secondsDiff, firstPixelMs, firstLiveMs 
   #320*240
   
-  now_datetime = getRtcDatetime()
+  #until the time is set after power on the age of a cached reading is unknown
+  ageKnown = rtcValid()
     
-  locked = drawScreenLock.acquire()
+  currentMode = mode
 
-  if locked == True: 
+  s = utime.time()
+  print('Printing screen in ' + MODES[currentMode] + ' mode')
 
-    currentMode = mode
+  sgv = newestEntry[entries.SGV]
+  sgvStr = str(sgv)
 
-    s = utime.time()
-    print('Printing screen in ' + MODES[currentMode] + ' mode')
-  
-    sgv = newestEntry['sgv']
-    sgvStr = str(sgv)
-  
-    directionStr = newestEntry['direction']
-    sgvDateStr = newestEntry['date']
-  
-    now = utime.mktime((now_datetime[0], now_datetime[1], now_datetime[2], now_datetime[3], now_datetime[4], now_datetime[5],0,0))  + secondsDiff
-    
-    tooOld = False
-    try:
-      tooOld = isOlderThan(sgvDateStr, OLD_DATA, now, print_time=True)
-    except Exception as e:
-      sys.print_exception(e)
-      saveError(e)
-    #print("Is sgv data older than " + str(OLD_DATA) + " minutes?", tooOld)  
+  direction = newestEntry[entries.DIRECTION]
+  sgvTime = newestEntry[entries.TIME]
 
-    emergencyNew = None
-  
-    if tooOld: backgroundColor=M5.Display.COLOR.DARKGREY; emergencyNew=False
-    elif sgv <= EMERGENCY_MIN: backgroundColor=M5.Display.COLOR.RED; emergencyNew=(utime.time() > emergencyPause and not tooOld)  
-    elif sgv >= (MIN-10) and sgv < MIN and directionStr.endswith("Up"): backgroundColor=M5.Display.COLOR.DARKGREEN; emergencyNew=False
-    elif sgv > EMERGENCY_MIN and sgv < MIN: backgroundColor=M5.Display.COLOR.RED; emergencyNew=False
-    elif sgv >= MIN and sgv <= MAX: backgroundColor=M5.Display.COLOR.DARKGREEN; emergencyNew=False 
-    elif sgv > MAX and sgv <= (MAX+10) and directionStr.endswith("Down"): backgroundColor=M5.Display.COLOR.DARKGREEN; emergencyNew=False
-    elif sgv > MAX and sgv <= EMERGENCY_MAX: backgroundColor=M5.Display.COLOR.ORANGE; emergencyNew=False
-    elif sgv > EMERGENCY_MAX: backgroundColor=M5.Display.COLOR.ORANGE; emergencyNew=(utime.time() > emergencyPause and not tooOld)  
-  
-    #battery level emergency
-    batteryLevel = getBatteryLevel()
-    uptime = utime.time() - startTime  
-    if (batteryLevel < 10 and batteryLevel > 0 and uptime > 300) and (utime.time() > emergencyPause) and not M5.Power.isCharging(): 
-      emergencyNew = True
-      if currentMode < 4 or currentMode == 7: currentMode = 2
-      else: currentMode = 6
-      clear = True
-
-    #old data emergency
-    if utime.time() > emergencyPause and isOlderThan(sgvDateStr, OLD_DATA_EMERGENCY, now):
-      emergencyNew = True
-      clear = True   
-
-    emergency = emergencyNew  
-
-    if emergency == False and rgbUnit != None:
-      rgbUnit.set_color(0, M5.Display.COLOR.BLACK)
-      rgbUnit.set_color(1, backgroundColor)
-      rgbUnit.set_color(2, M5.Display.COLOR.BLACK)
-
-    #if emergency change to one of full modes 
-    if emergency == True and (currentMode == 3 or currentMode == 7): currentMode = 0
-  
-    if noNetwork == False and "ago" in newestEntry and (currentMode == 0 or currentMode == 4): 
-      dateStr = newestEntry['ago']
-    elif currentMode == 2 or currentMode == 6:
-      if batteryLevel >= 0:
-       dateStr = "Battery: " + str(batteryLevel) + "%"
-      else: 
-       dateStr = "Battery level unknown"
-    else:   
-      dateStr = sgvDateStr.replace("T", " ")[:-3] #remove seconds
+  now = sgvTime
+  if ageKnown:
+    now_datetime = getRtcDatetime()
+    now = utime.mktime((now_datetime[0], now_datetime[1], now_datetime[2], now_datetime[3], now_datetime[4], now_datetime[5],0,0))  + secondsDiff
   
-    if not tooOld and directionStr == 'DoubleUp' and sgv+20>=MAX and sgv<MAX: arrowColor = M5.Display.COLOR.ORANGE
-    elif not tooOld and directionStr == 'DoubleUp' and sgv>=MAX: arrowColor = M5.Display.COLOR.RED
-    elif not tooOld and directionStr == 'DoubleDown' and sgv-20<=MIN: arrowColor = M5.Display.COLOR.RED
-    elif not tooOld and directionStr.endswith('Up') and sgv+10>=MAX and sgv<MAX: arrowColor = M5.Display.COLOR.ORANGE
-    elif not tooOld and directionStr.endswith('Down') and sgv-10<=MIN: arrowColor = M5.Display.COLOR.RED
-    else: arrowColor = backgroundColor  
-
-    batteryStr = str(batteryLevel) + '%'
-    batteryTextColor = M5.Display.COLOR.WHITE
-    if batteryLevel < 20: batteryTextColor = M5.Display.COLOR.RED
-    try:
-      if envUnit != None and batteryLevel > 20:
-        if batteryStrIndex == 1: 
-          batteryStr = "%.0fC" % envUnit.read_temperature()
-          if envUnit.read_temperature() > 25 or envUnit.read_temperature() < 18: batteryTextColor = M5.Display.COLOR.RED
-          batteryStrIndex = 2
-        elif batteryStrIndex == 2:
-          batteryStr = 'p'+ "%.0f" % envUnit.read_pressure()
-          if envUnit.read_pressure() > 1050 or envUnit.read_pressure() < 950: batteryTextColor = M5.Display.COLOR.RED
-          batteryStrIndex = 3
-        elif batteryStrIndex == 3:
-          batteryStr = 'h' + "%.0f" % envUnit.read_humidity() + '%'
-          if envUnit.read_humidity() < 40 or envUnit.read_humidity() > 60: batteryTextColor = M5.Display.COLOR.RED
-          batteryStrIndex = 0  
-        else:
-          batteryStrIndex = 1  
-    except Exception as e:
-      sys.print_exception(e)
-      #saveError(e)
-
-    sgvDiff = 0
-    if len(response) > 1: sgvDiff = sgv - response[1]['sgv']
-    sgvDiffStr = str(sgvDiff)
-    if sgvDiff > 0: sgvDiffStr = "+" + sgvDiffStr
-     
-    rotate = 1
-    if mode >= 4:
-      rotate = 3
-    
-    M5.Display.setRotation(rotate)  
-
-    w = int(SCREEN_HEIGHT/5)
-
-    M5.Display.fillRect(0, 0, SCREEN_WIDTH, w, M5.Display.COLOR.DARKGREY)
-    M5.Display.fillRect(0, w, SCREEN_WIDTH, 3*w, backgroundColor)
-    M5.Display.fillRect(0, SCREEN_HEIGHT-w, SCREEN_WIDTH, w, M5.Display.COLOR.DARKGREY)
+  tooOld = not ageKnown
+  try:
+    if ageKnown: tooOld = isOlderThan(sgvTime, OLD_DATA, now, print_time=True)
+  except Exception as e:
+    sys.print_exception(e)
+    saveError(e)
+  #print("Is sgv data older than " + str(OLD_DATA) + " minutes?", tooOld)  
+
+  emergencyNew = None
+
+  if tooOld: backgroundColor=M5.Display.COLOR.DARKGREY; emergencyNew=False
+  elif sgv <= EMERGENCY_MIN: backgroundColor=M5.Display.COLOR.RED; emergencyNew=(utime.time() > emergencyPause and not tooOld)  
+  elif sgv >= (MIN-10) and sgv < MIN and entries.rising(direction): backgroundColor=M5.Display.COLOR.DARKGREEN; emergencyNew=False
+  elif sgv > EMERGENCY_MIN and sgv < MIN: backgroundColor=M5.Display.COLOR.RED; emergencyNew=False
+  elif sgv >= MIN and sgv <= MAX: backgroundColor=M5.Display.COLOR.DARKGREEN; emergencyNew=False 
+  elif sgv > MAX and sgv <= (MAX+10) and entries.falling(direction): backgroundColor=M5.Display.COLOR.DARKGREEN; emergencyNew=False
+  elif sgv > MAX and sgv <= EMERGENCY_MAX: backgroundColor=M5.Display.COLOR.ORANGE; emergencyNew=False
+  elif sgv > EMERGENCY_MAX: backgroundColor=M5.Display.COLOR.ORANGE; emergencyNew=(utime.time() > emergencyPause and not tooOld)  
+
+  #battery level emergency
+  batteryLevel = getBatteryLevel()
+  uptime = utime.time() - startTime  
+  if (batteryLevel < 10 and batteryLevel > 0 and uptime > 300) and (utime.time() > emergencyPause) and not M5.Power.isCharging(): 
+    emergencyNew = True
+    if currentMode < 4 or currentMode == 7: currentMode = 2
+    else: currentMode = 6
+    clear = True
+
+  #old data emergency
+  if ageKnown and utime.time() > emergencyPause and isOlderThan(sgvTime, OLD_DATA_EMERGENCY, now):
+    emergencyNew = True
+    clear = True   
+
+  emergency = emergencyNew  
+  updateAlert(sgv, batteryLevel)
+
+  if emergency == False and rgbUnit != None:
+    rgbUnit.set_color(0, M5.Display.COLOR.BLACK)
+    rgbUnit.set_color(1, backgroundColor)
+    rgbUnit.set_color(2, M5.Display.COLOR.BLACK)
 
-    #draw current time
-    printLocaltime(mode, secondsDiff, useLock=True)  
- 
-    #draw sgv
+  #if emergency change to one of full modes 
+  if emergency == True and (currentMode == 3 or currentMode == 7): currentMode = 0
+  elif emergency == True and currentMode == 8: currentMode = 4
+
+  if noNetwork == False and newestEntry[entries.AGO] != None and (currentMode == 0 or currentMode == 4): 
+    dateStr = newestEntry[entries.AGO]
+  elif currentMode == 2 or currentMode == 6:
+    if batteryLevel >= 0:
+     dateStr = "Battery: " + str(batteryLevel) + "%"
+    else: 
+     dateStr = "Battery level unknown"
+  else:   
+    dateStr = getDateStr(sgvTime).replace("T", " ")[:-3] #remove seconds
+
+  if not tooOld and direction == entries.DOUBLE_UP and sgv+20>=MAX and sgv<MAX: arrowColor = M5.Display.COLOR.ORANGE
+  elif not tooOld and direction == entries.DOUBLE_UP and sgv>=MAX: arrowColor = M5.Display.COLOR.RED
+  elif not tooOld and direction == entries.DOUBLE_DOWN and sgv-20<=MIN: arrowColor = M5.Display.COLOR.RED
+  elif not tooOld and entries.rising(direction) and sgv+10>=MAX and sgv<MAX: arrowColor = M5.Display.COLOR.ORANGE
+  elif not tooOld and entries.falling(direction) and sgv-10<=MIN: arrowColor = M5.Display.COLOR.RED
+  else: arrowColor = backgroundColor  
+
+  batteryStr = str(batteryLevel) + '%'
+  batteryTextColor = M5.Display.COLOR.WHITE
+  if batteryLevel < 20: batteryTextColor = M5.Display.COLOR.RED
+  try:
+    if envUnit != None and batteryLevel > 20:
+      if batteryStrIndex == 1: 
+        batteryStr = "%.0fC" % envUnit.read_temperature()
+        if envUnit.read_temperature() > 25 or envUnit.read_temperature() < 18: batteryTextColor = M5.Display.COLOR.RED
+        batteryStrIndex = 2
+      elif batteryStrIndex == 2:
+        batteryStr = 'p'+ "%.0f" % envUnit.read_pressure()
+        if envUnit.read_pressure() > 1050 or envUnit.read_pressure() < 950: batteryTextColor = M5.Display.COLOR.RED
+        batteryStrIndex = 3
+      elif batteryStrIndex == 3:
+        batteryStr = 'h' + "%.0f" % envUnit.read_humidity() + '%'
+        if envUnit.read_humidity() < 40 or envUnit.read_humidity() > 60: batteryTextColor = M5.Display.COLOR.RED
+        batteryStrIndex = 0  
+      else:
+        batteryStrIndex = 1  
+  except Exception as e:
+    sys.print_exception(e)
+    #saveError(e)
+
+  sgvDiff = getSgvDiff(newestEntry)
+  sgvDiffStr = str(sgvDiff)
+  if sgvDiff > 0: sgvDiffStr = "+" + sgvDiffStr
+   
+  rotate = getRotation(mode)
+
+  #current time
+  if ageKnown: printLocaltime(mode, secondsDiff, render=False)  
+  else: clockLabel.update("--:--")
+
+  if currentMode == 7 or currentMode == 8:
+    #chart with the sgv and its time in the footer, which shows the status color
+    middleBand.setColor(M5.Display.COLOR.BLACK)
+    footerBand.setColor(backgroundColor)
+    sgvLabel.update(None)
+    arrow.update(arrow.cx, arrow.cy, None, arrowColor)
+    chart.update(getChartPoints(newestEntry), MIN, MAX)
+    dateStr = sgvStr + "  " + getDateStr(sgvTime)[11:16]
+    if not live: dateStr = sgvStr + " cached " + getDateStr(sgvTime)[11:16]
+  else:
+    middleBand.setColor(backgroundColor)
+    footerBand.setColor(M5.Display.COLOR.DARKGREY)
+    chart.update([], MIN, MAX)
+
+    #sgv
     gap = 10 #between sgv and arrow
-    radius = 48 #arrow circle 
-    M5.Display.setFont(M5.Display.FONTS.DejaVu40)  
-    M5.Display.setTextSize(2.5)
-    w = M5.Display.textWidth(sgvStr)
+    radius = arrow.radius #arrow circle 
+    w = sgvLabel.measure(sgvStr)
     group_width = w + gap + (radius * 2) #(Text + Gap + Circle Diameter)
     x = int((SCREEN_WIDTH - group_width) / 2)
     if x > 25:
       x -= 10
       gap += 10     
-    f = M5.Display.fontHeight()
-    y = int((SCREEN_HEIGHT - f) / 2) + 10
-    printText(sgvStr, x, y, backgroundColor=backgroundColor, rotate=rotate)
-    M5.Display.setTextSize(1)
-    
-    #draw arrow
-    x += w + gap + radius
-    y = int(SCREEN_HEIGHT / 2)
-        
-    if directionStr == 'DoubleUp': drawDirectionV2(x, y, tri_color=arrowColor, ydiff=8)
-    elif directionStr == 'DoubleDown': drawDirectionV2(x, y, angle_degrees=180, tri_color=arrowColor, ydiff=8) 
-    elif directionStr == 'SingleUp': drawDirectionV2(x, y, tri_color=arrowColor)
-    elif directionStr == 'SingleDown': drawDirectionV2(x, y, angle_degrees=180, tri_color=arrowColor)
-    elif directionStr == 'Flat': drawDirectionV2(x, y, angle_degrees=90, tri_color=arrowColor)
-    elif directionStr == 'FortyFiveUp': drawDirectionV2(x, y, angle_degrees=45, tri_color=arrowColor)
-    elif directionStr == 'FortyFiveDown': drawDirectionV2(x, y, angle_degrees=135, tri_color=arrowColor)
-
-    #draw battery
-    M5.Display.setFont(M5.Display.FONTS.DejaVu24)
-    textColor = batteryTextColor
-    w = M5.Display.textWidth(batteryStr)
-    printText(batteryStr, int(SCREEN_WIDTH - w - 10), 12, font=M5.Display.FONTS.DejaVu24, backgroundColor=M5.Display.COLOR.DARKGREY, textColor=textColor, rotate=rotate) 
-    
-    #draw sgv diff
-    textColor = M5.Display.COLOR.WHITE
-    if math.fabs(sgvDiff) >= 10 and backgroundColor != M5.Display.COLOR.RED and not tooOld: textColor = M5.Display.COLOR.RED
-    w = M5.Display.textWidth(sgvDiffStr)
-    x = int(25 + (SCREEN_WIDTH - w) / 2)
-    printText(sgvDiffStr, x, 12, font=M5.Display.FONTS.DejaVu24, backgroundColor=M5.Display.COLOR.DARKGREY, textColor=textColor, rotate=rotate)
-    
-    #draw dateStr
-    M5.Display.setFont(M5.Display.FONTS.DejaVu24)
-    textColor = M5.Display.COLOR.WHITE
-    if isOlderThan(sgvDateStr, 10, now): 
-      textColor = M5.Display.COLOR.RED
-    w = M5.Display.textWidth(dateStr)
-    x = int((SCREEN_WIDTH - w) / 2)
-    y = SCREEN_HEIGHT-24-12
-    printText(dateStr, x, y, font=M5.Display.FONTS.DejaVu24, backgroundColor=M5.Display.COLOR.DARKGREY, textColor=textColor, rotate=rotate)  
-    
-    drawScreenLock.release()
-    print("Printing screen finished in " + str((utime.time() - s)) + " secs ...")  
-  else:    
-    print("Printing locked!")
+    sgvLabel.y = int((SCREEN_HEIGHT - sgvLabel.height) / 2) + 10
+    sgvLabel.update(sgvStr, x=x)
+  
+    #arrow
+    arrow.update(x + w + gap + radius, int(SCREEN_HEIGHT / 2), direction, arrowColor)
+
+    #a reading from flash shown before the backend answered is marked with its age
+    if not live and ageKnown: dateStr = "Cached " + str(int((now - sgvTime) // 60)) + " min ago"
+    elif not live: dateStr = "Cached " + getDateStr(sgvTime)[11:16]
+
+  #battery
+  batteryLabel.update(batteryStr, batteryTextColor)
+  
+  #sgv diff
+  textColor = M5.Display.COLOR.WHITE
+  if math.fabs(sgvDiff) >= 10 and backgroundColor != M5.Display.COLOR.RED and not tooOld: textColor = M5.Display.COLOR.RED
+  sgvDiffLabel.update(sgvDiffStr, textColor)
+  
+  #dateStr
+  textColor = M5.Display.COLOR.WHITE
+  if not live or isOlderThan(sgvTime, 10, now): 
+    textColor = M5.Display.COLOR.RED
+  dateLabel.update(dateStr, textColor)
+
+  screen.render(rotate)
+
+  print("Printing screen finished in " + str((utime.time() - s)) + " secs ...")  
+  if firstPixelMs == None:
+    firstPixelMs = utime.ticks_diff(utime.ticks_ms(), bootTicks)
+    print("Time to first pixel " + str(firstPixelMs) + " ms" + ("" if live else " (cached reading)"))
+  if firstLiveMs == None and live:
+    firstLiveMs = utime.ticks_diff(utime.ticks_ms(), bootTicks)
+    print("Time to first live reading " + str(firstLiveMs) + " ms")
+  print("Text metrics " + widgets.METRICS.stats())
+
+def requestScreen(newestEntry, noNetwork=False):
+  #the render task draws the screen once the calling task yields, requests made
+  #meanwhile are merged into one frame
+  global screenRequest
+  screenRequest = (newestEntry, noNetwork)
+  screenEvent.set()
+
+async def renderMonitor():
+  global screenRequest
+  while True:
+    await screenEvent.wait()
+    screenEvent.clear()
+    newestEntry, noNetwork = screenRequest
+    try:
+      drawScreen(newestEntry, noNetwork=noNetwork)
+    except Exception as e:
+      sys.print_exception(e)
+      saveError(e)
 
 # ------
 
-def backendMonitor():
-  global response, API_ENDPOINT, API_TOKEN, LOCALE, TIMEZONE, startTime, sgvDict, secondsDiff, backendResponseTimer, backendResponse, mode
+async def backendCall(count, lastid):
+  #one long poll, the entries are parsed while they arrive
+  global backendResponse
+  backendResponse = await backendClient.get("/entries.json?count=" + str(count) + "&waitfornextid=" + str(lastid) + "&timeout=" + str(BACKEND_TIMEOUT_MS), headers={'api-secret': API_TOKEN,'accept-language': LOCALE,'accept-charset': 'ascii', 'x-gms-tz': TIMEZONE})
+  #sets the clock when no time server answers
+  timeSync.httpDate(backendResponse.headers.get('date'))
+  newEntries = await entries.readAsync(backendResponse.raw, count, make=makeEntry)
+  backendResponse.close()
+  backendResponse = None
+  return newEntries
+
+async def backendMonitor():
+  global response, API_ENDPOINT, API_TOKEN, LOCALE, TIMEZONE, startTime, sgvHistory, secondsDiff, backendResponse, backendClient, pollScheduler, mode, live
   lastid = -1
   while True:
     try:
+      if WIFI_SLEEP != WIFI_AWAKE and response != None and lastid != -1 and rtcValid():
+        wait = pollScheduler.delay(utime.time() + secondsDiff)
+        if wait > 0: await sleepUntilPoll(wait)
+      await reconnectWifi()
       print('Battery level: ' + str(getBatteryLevel()) + '%')
       printTime((utime.time() - startTime), prefix='Uptime is')
       print("Calling backend with timeout " + str(BACKEND_TIMEOUT_MS) + " ms ...")
       s = utime.time()
-      backendResponseTimer.init(mode=machine.Timer.ONE_SHOT, period=BACKEND_TIMEOUT_MS+10000, callback=watchdogCallback)
-      backendResponse = requests2.get(API_ENDPOINT + "/entries.json?count=10&waitfornextid=" + str(lastid) + "&timeout=" + str(BACKEND_TIMEOUT_MS), headers={'api-secret': API_TOKEN,'accept-language': LOCALE,'accept-charset': 'ascii', 'x-gms-tz': TIMEZONE})
-      backendResponseTimer.deinit()
-      response = backendResponse.json()
-      backendResponse.close()
+      count = getSyncCount()
+      #the connection stays open between calls, the other tasks run while the call waits
+      try:
+        newEntries = await asyncio.wait_for(backendCall(count, lastid), (BACKEND_TIMEOUT_MS+10000)/1000)
+      except asyncio.TimeoutError:
+        watchdogCallback(None)
+        raise
+      if len(newEntries) == 0: raise ValueError('No entries received')
+      response = newEntries
+      live = True
+      liveEvent.set()
       printTime((utime.time() - s), prefix='Response received in')
-      sgv = response[0]['sgv']
-      sgvDate = response[0]['date']
-      lastid = response[0]['id']
+      print('Backend connection ' + backendClient.stats())
+      setAgoMins(response[0])
+      sgv = response[0][entries.SGV]
+      isNew = response[0][entries.ID] != lastid
+      lastid = response[0][entries.ID]
+      print('Received ' + str(len(response)) + ' of ' + str(count) + ' requested entries')
       print('Sgv:', sgv)
-      print('Direction:', response[0]['direction'])
-      print('Read: ' + sgvDate + ' (' + TIMEZONE + ')')
-      sgvDiff = 0
-      if len(response) > 1: sgvDiff = sgv - response[1]['sgv']
-      print('Sgv diff from previous read:', sgvDiff)
-      drawScreen(response[0])
-      _thread.start_new_thread(persistEntries, ())
-      #persistEntries() 
+      print('Direction:', entries.directionName(response[0][entries.DIRECTION]))
+      print('Read: ' + getDateStr(response[0][entries.TIME]) + ' (' + TIMEZONE + ')')
+      try:
+        persistEntries()
+      except Exception as e:
+        sys.print_exception(e)
+        saveError(e)
+      pollScheduler.succeeded()
+      #a new reading is redrawn without waking the panel, only touch, buttons and alerts do
+      if isNew: pollScheduler.learn(sgvHistory)
+      print('Reading interval ' + str(pollScheduler.interval) + ' secs, radio on estimate ' + str(int(pollScheduler.radioSecondsPerHour())) + ' s/h')
+      print('Power ' + powerManager.stats())
+      print('Time sync ' + timeSync.stats())
+      print('Sgv diff from previous read:', getSgvDiff(response[0]))
+      print('Stats 24h: ' + glucoseStats.summary())
+      requestScreen(response[0])
     except Exception as e:
-      backendResponseTimer.deinit()
-      if backendResponse != None: backendResponse.close()
-      lastid = -1
+      #a failed call leaves the connection in an unknown state
+      backendResponse = None
+      backendClient.close()
+      #lastid is kept, the next call asks only for what is still missing
       sys.print_exception(e)
       #saveError(e)
       print('Battery level: ' + str(getBatteryLevel()) + '%')
       if response == None: readResponseFile()
       try: 
         if response != None and len(response) >= 1: 
-          drawScreen(response[0], noNetwork=True)
+          requestScreen(response[0], noNetwork=True)
         else:
           printCenteredText("Network error! Please wait.", mode, backgroundColor=M5.Display.COLOR.RED, clear=True)
       except Exception as e:
         sys.print_exception(e)
         saveError(e)
-      print('Backend call error. Retry in 5 secs ...')
-      time.sleep(5)
+      retry = pollScheduler.failed()
+      print('Backend call error. Retry in ' + str(retry) + ' secs ...')
+      await asyncio.sleep(retry)
     print('---------------------------')
 
 def setEmergencyrgbUnitColor(setBeepColorIndex, beepColor):
@@ -516,82 +666,59 @@ def setEmergencyrgbUnitColor(setBeepColorIndex, beepColor):
   if rgbUnit != None:
     rgbUnit.set_color(setBlackColorIndex, M5.Display.COLOR.BLACK)
     rgbUnit.set_color(setBeepColorIndex, beepColor)
-        
-def emergencyMonitor():
-  global emergency, response, rgbUnit, beeperExecuted, EMERGENCY_MAX, EMERGENCY_MIN, OLD_DATA_EMERGENCY
-  useBeeper = False
-  set_colorIndex = 1
-  
-  while True:
-    #print('Emergency monitor checking status')
-    if emergency == True:
-      batteryLevel = getBatteryLevel()
-      sgv = response[0]['sgv']
-      if batteryLevel < 10:
-        print('Low battery level ' + str(batteryLevel) + "%!!!")
-      elif sgv > EMERGENCY_MAX or sgv <= EMERGENCY_MIN:
-        print('Emergency glucose level ' + str(sgv) + '!!!')
-      else:
-        print('SGV data is older than ' + str(OLD_DATA_EMERGENCY) + ' minutes!!!')  
-      
-      beepColor = M5.Display.COLOR.RED
-      if sgv > EMERGENCY_MAX: beepColor = M5.Display.COLOR.ORANGE  
-
-      setEmergencyrgbUnitColor(set_colorIndex, beepColor)
-      set_colorIndex += 1
-      if set_colorIndex > 2: set_colorIndex = 0 
-      if beeperExecuted == False:
-        useBeeper = checkBeeper()
-      if useBeeper == True:
-        M5.Power.setVibration(128) #Max 255
-        M5.Power.setLed(255)
-        time.sleep(1)
-        M5.Power.setVibration(0)
-        M5.Power.setLed(0)
-        beeperExecuted = True   
-        useBeeper = False 
-      else:
-        M5.Power.setLed(255)
-        time.sleep(1)
-        M5.Power.setLed(0)
-      print("beeperExecuted=" + str(beeperExecuted) + ", useBeeper=" + str(useBeeper))              
+
+def alertOutput(step):
+  #plays one step of an alert pattern
+  global alertPixel
+  M5.Power.setVibration(step[1])
+  M5.Power.setLed(step[2])
+  if step[3] == True:
+    setEmergencyrgbUnitColor(alertPixel, alertColor)
+    alertPixel = (alertPixel + 1) % 3
+
+def updateAlert(sgv, batteryLevel):
+  #called by drawScreen after the emergency state was evaluated
+  global alertColor, alertPixel
+  if emergency == True:
+    alertColor = M5.Display.COLOR.RED
+    if sgv > EMERGENCY_MAX: alertColor = M5.Display.COLOR.ORANGE
+    if alertSequencer.active():
+      return
+    if batteryLevel < 10 and batteryLevel > 0:
+      print('Low battery level ' + str(batteryLevel) + "%!!!")
+    elif sgv > EMERGENCY_MAX or sgv <= EMERGENCY_MIN:
+      print('Emergency glucose level ' + str(sgv) + '!!!')
     else:
-      #print('No Emergency')
-      beeperExecuted = False
-      useBeeper = False
-      set_colorIndex = 0
-      time.sleep(1)
+      print('SGV data is older than ' + str(OLD_DATA_EMERGENCY) + ' minutes!!!')  
+    #vibration only once per emergency and within the beeper window
+    useBeeper = checkBeeper()
+    print("useBeeper=" + str(useBeeper))
+    powerManager.activity()
+    alertPixel = 0
+    alertSequencer.start(ALERT_VIBRATE if useBeeper else ALERT_BLINK, ALERT_BLINK)
+  else:
+    alertSequencer.stop()
 
 #accelerator
-def accelMonitor():
+async def accelMonitor():
   while True:
     accelAction()
-    time.sleep(0.5)
+    await asyncio.sleep_ms(IMU_INTERVAL)
 
 def accelAction():
   global mode, response
-  acceleration = M5.Imu.getAccel()
-  hasResponse = (response != None)
-  if hasResponse and acceleration[1] < -0.1 and mode in range(0,3): mode += 4; drawScreen(response[0]) #change to 'Flip mode' #4,5,6
-  elif hasResponse and acceleration[1] > 0.1 and mode in range(4,7): mode -= 4; drawScreen(response[0]) #change to 'Normal mode' #0,1,2
-  elif hasResponse and acceleration[1] < -0.1 and mode == 7: mode = 8; drawScreen(response[0])
-  elif hasResponse and acceleration[1] > 0.1 and mode == 8: mode = 7; drawScreen(response[0])
-
-def touchPadCallback(t):
-  M5.update()
-  if M5.Touch.getCount() > 0:
-    td = M5.Touch.getDetail(0)
-    #print(td)
-    if td[4] == True:
-      tx = M5.Touch.getX()
-      ty = M5.Touch.getY()
-      print("Touch screen pressed at " + str(tx) + "," + str(ty))
-      if tx >= 120 and tx <= 160 and ty >= 240 and ty <= 280:
-        onBtnBPressed(t)
-      elif tx >= 240 and tx <= 280 and ty >= 240 and ty <= 280:
-        onBtnCPressed(t)  
-      else:
-        onBtnPressed(t)
+  #the mode follows the orientation only once there is something to show
+  if response == None:
+    return
+  if not orientationDetector.update(M5.Imu.getAccel()[1]):
+    return
+  flipped = orientationDetector.flipped
+  if flipped and mode in range(0,3): mode += 4 #change to 'Flip mode' #4,5,6
+  elif not flipped and mode in range(4,7): mode -= 4 #change to 'Normal mode' #0,1,2
+  elif flipped and mode == 7: mode = 8
+  elif not flipped and mode == 8: mode = 7
+  print('Orientation ' + ('flipped' if flipped else 'normal') + ', suppressed flips: ' + str(orientationDetector.suppressed))
+  requestScreen(response[0])
 
 def watchdogCallback(t):
   global shuttingDown, backendResponse, rgbUnit, response, mode
@@ -606,10 +733,13 @@ def watchdogCallback(t):
   shuttingDown = True
   printCenteredText("Restarting...", mode, backgroundColor=M5.Display.COLOR.RED, clear=True)
 
-def localtimeCallback(t):
+async def localtimeMonitor():
+  #the clock shows minutes, so it wakes only at the next minute boundary
   global shuttingDown, mode, secondsDiff 
-  if shuttingDown == False:
-    printLocaltime(mode, secondsDiff, silent=True)
+  while True:
+    if shuttingDown == False:
+      printLocaltime(mode, secondsDiff, silent=True)
+    await asyncio.sleep(60 - (utime.time() + secondsDiff) % 60)
 
 def onBtnPressed(t):
   print('Button pressed')
@@ -617,19 +747,24 @@ def onBtnPressed(t):
   if emergency == True:
     emergency = False
     emergencyPause = utime.time() + EMERGENCY_PAUSE_INTERVAL
+    alertSequencer.stop()
   else:   
     global brightness, config
     brightness += 32
     if brightness > 255: brightness = 32
-    M5.Widgets.setBrightness(brightness)
+    powerManager.setBrightness(brightness)
     config["brightness"] = brightness
-    ap.saveConfigFile(config)
+    #one flash write once the user stopped pressing
+    touchInput.afterActivity(saveConfig)
+
+def saveConfig():
+  configfile.saveConfigFile(config)
 
 def onBtnBPressed(t):
   global shuttingDown, mode, config
   print('Button B pressed')
-  config[ap.CONFIG] = 0
-  ap.saveConfigFile(config)
+  config[configfile.CONFIG] = 0
+  configfile.saveConfigFile(config)
   WDT(timeout=1000)
   shuttingDown = True
   printCenteredText("Restarting...", mode, backgroundColor=M5.Display.COLOR.RED, clear=True)  
@@ -639,10 +774,14 @@ def onBtnCPressed(t):
 
 # main app code -------------------------------------------------------------------     
 
-config = ap.readConfigFile()
+config = configfile.readConfigFile()
 
 mode = 0
 if M5.Imu.getAccel()[1] < 0: mode = 4 #flip
+if config != None and "chart" in config and config["chart"] == 1:
+  if mode == 4: mode = 8 #flip_chart
+  else: mode = 7 #chart
+orientationDetector = OrientationDetector(getRotation(mode) == 3)
 
 M5.begin()
 
@@ -651,43 +790,54 @@ if config != None: brightness = config["brightness"]
 M5.Widgets.setBrightness(brightness)
 M5.Power.setLed(0)
 
+#full screen redraws are composed off-screen in PSRAM and pushed in one transfer
+useCanvas = 1
+if config != None and "canvas" in config: useCanvas = config["canvas"]
+if useCanvas == 1:
+  try:
+    screen.canvas = M5.Display.newCanvas(SCREEN_WIDTH, SCREEN_HEIGHT, 16, True)
+    if mode >= 7: chart.canvas = M5.Display.newCanvas(chart.w, chart.h, 16, True)
+  except Exception as e:
+    print('Canvas not available')
+    sys.print_exception(e)
+
 printCenteredText("Starting...", mode, backgroundColor=M5.Display.COLOR.DARKGREY, clear=True)  
 
+#probed by a boot stage
 envUnit = None
-try: 
-   i2c0 = I2C(0, scl=Pin(33), sda=Pin(32), freq=40000)
-   envUnit = ENVUnit(i2c=i2c0, type=3) 
-   print('Temperature:',str(envUnit.read_temperature()) + " C")
-   print('Humidity:',str(envUnit.read_humidity()) + " %")
-   print('Pressure:',str(envUnit.read_pressure()) + " hPa")
-except Exception as e:
-   print('Weather Monitoring Unit not found')
-   sys.print_exception(e)
-
 rgbUnit = None
-try: 
-   rgbUnit = RGBUnit((36, 26), 3)
-   rgbUnit.set_color(0, M5.Display.COLOR.BLACK)     
-   rgbUnit.set_color(1, M5.Display.COLOR.DARKGREY)
-   rgbUnit.set_color(2, M5.Display.COLOR.BLACK)
-except Exception as e:
-   print('RGB Unit not found')
-   sys.print_exception(e)
 
 print('Starting ...')
 print('System:', sys.implementation)
+#compare the source and the .mpy build of copyMpy.sh
+print('Imports done ' + str(bootTicks) + ' ms after reset, free heap ' + str(freeHeap()) + ' bytes')
 
 response = None
+agoMins = None #minutes in the ago text of response[0]
+live = False #True once the backend answered, before that the newest journaled reading is shown
+liveEvent = asyncio.Event()
+backendTask = None
+wifiCache = None
+firstPixelMs = None
+firstLiveMs = None
 emergency = False
 emergencyPause = 0
 shuttingDown = False
 backendResponse = None
-beeperExecuted = False
+alertSequencer = AlertSequencer(alertOutput)
+powerManager = PowerManager(brightness, dim=mayDim, night=isNight, awake=alertSequencer.active)
+timeSync = TimeSync(YEAR)
+alertColor = M5.Display.COLOR.RED
+alertPixel = 0
+screenRequest = None
+screenEvent = asyncio.Event()
   
 batteryStrIndex = 0
 
-if config == None or config[ap.CONFIG] == 0:
+if config == None or config[configfile.CONFIG] == 0:
    printCenteredText("Connect AP ...", mode, backgroundColor=M5.Display.COLOR.RED, clear=True)
+   #the configuration portal is imported only when it is opened
+   import ap
    print("Connect wifi " + ap.SSID)
    def reboot():
       global shuttingDown 
@@ -709,8 +859,20 @@ else:
      USE_BEEPER = config["beeper"]
      BEEPER_START_TIME = config["beeperStartTime"]
      BEEPER_END_TIME = config["beeperEndTime"]
+     BEEPER_START = secondsOfDay(BEEPER_START_TIME)
+     BEEPER_END = secondsOfDay(BEEPER_END_TIME)
      OLD_DATA = config["oldData"]
      OLD_DATA_EMERGENCY = config["oldDataEmergenc"]
+     POLL_MARGIN = 20
+     if "pollMargin" in config: POLL_MARGIN = config["pollMargin"]
+     WIFI_SLEEP = WIFI_POWERSAVE
+     if "wifiSleep" in config: WIFI_SLEEP = config["wifiSleep"]
+     IDLE_DIM = 0
+     if "idleDim" in config: IDLE_DIM = config["idleDim"]
+     NIGHT_SLEEP = 0
+     if "nightSleep" in config: NIGHT_SLEEP = config["nightSleep"]
+     IMU_INTERVAL = 1000
+     if "imuInterval" in config: IMU_INTERVAL = config["imuInterval"]
 
      if MIN < 30: MIN=30
      if MAX < 100: MAX=100
@@ -721,6 +883,9 @@ else:
      if re.search("^GMT[+-]((0?[0-9]|1[0-1]):([0-5][0-9])|12:00)$",TIMEZONE) == None: TIMEZONE="GMT+0:00"
      if OLD_DATA < 10: OLD_DATA=10
      if OLD_DATA_EMERGENCY < 15: OLD_DATA_EMERGENCY=15
+     if POLL_MARGIN < 5: POLL_MARGIN=5
+     if IMU_INTERVAL < 100: IMU_INTERVAL=100
+     if WIFI_SLEEP not in (WIFI_AWAKE, WIFI_POWERSAVE, WIFI_DISCONNECT): WIFI_SLEEP=WIFI_POWERSAVE
 
      timeStr = TIMEZONE[4:]
      [HH, MM] = [int(i) for i in timeStr.split(':')]
@@ -730,94 +895,174 @@ else:
    except Exception as e:
      sys.print_exception(e)
      saveError(e)
-     config[ap.CONFIG] = 0
-     ap.saveConfigFile(config)
+     config[configfile.CONFIG] = 0
+     configfile.saveConfigFile(config)
      printCenteredText("Fix config!", mode, backgroundColor=M5.Display.COLOR.RED, clear=True)
      time.sleep(2)
      WDT(timeout=1000)
      shuttingDown = True
      printCenteredText("Restarting...", mode, backgroundColor=M5.Display.COLOR.RED, clear=True)
 
-# activate buttons to enable configuration changes     
-
-M5.BtnA.setCallback(type=M5.BtnA.CB_TYPE.WAS_PRESSED, cb=onBtnPressed)
-M5.BtnB.setCallback(type=M5.BtnB.CB_TYPE.WAS_PRESSED, cb=onBtnBPressed)
-M5.BtnC.setCallback(type=M5.BtnC.CB_TYPE.WAS_PRESSED, cb=onBtnCPressed)
+# activate buttons and touch regions to enable configuration changes, the actions run in the input task
 
-touchPadTimer = machine.Timer(0)
-touchPadTimer.init(period=100, callback=touchPadCallback)
+touchInput = TouchInput()
+touchInput.region(120, 240, 160, 280, onBtnBPressed)
+touchInput.region(240, 240, 280, 280, onBtnCPressed)
+touchInput.fallback = onBtnPressed
+touchInput.wake = powerManager.activity
+M5.BtnA.setCallback(type=M5.BtnA.CB_TYPE.WAS_PRESSED, cb=lambda t: touchInput.defer(onBtnPressed))
+M5.BtnB.setCallback(type=M5.BtnB.CB_TYPE.WAS_PRESSED, cb=lambda t: touchInput.defer(onBtnBPressed))
+M5.BtnC.setCallback(type=M5.BtnC.CB_TYPE.WAS_PRESSED, cb=lambda t: touchInput.defer(onBtnCPressed))
 
 # from here code runs only if application is properly configured
 
-try:
-  nic = network.WLAN(network.STA_IF)
-  nic.active(True)
+def printBootStatus(msg, backgroundColor=M5.Display.COLOR.DARKGREY):
+  #the cached reading stays on screen while booting, the status goes to the log only
+  if response != None: print(msg)
+  else: printCenteredText(msg, mode, backgroundColor=backgroundColor)
+
+def warmStart():
+  #shows the newest journaled reading before the wifi and the time are set up
+  readResponseFile()
+  if response == None:
+    print('No cached reading')
+    return
+  try:
+    drawScreen(response[0], noNetwork=True)
+  except Exception as e:
+    sys.print_exception(e)
+    saveError(e)
 
-  printCenteredText("Scanning wifi ...", mode, backgroundColor=M5.Display.COLOR.DARKGREY)
-
-  wifi_password = None
-  wifi_ssid = None  
-  while wifi_password == None:
-    try: 
-      nets = nic.scan()
-      for result in nets:
-        wifi_ssid = result[0].decode() 
-        if wifi_ssid in config: 
-          wifi_password = config[wifi_ssid]
-        else:
-          print('No password for wifi ' + wifi_ssid + ' found')  
-        if wifi_password != None: break
-    except Exception as e:
-      sys.print_exception(e)
-      saveError(e)
-      printCenteredText("Wifi not found!", mode, backgroundColor=M5.Display.COLOR.RED, clear=True)  
-    if wifi_password == None: time.sleep(1)
+async def loadFlash():
+  #flash only, so the cached reading is on screen within a second of boot
+  global startTime, journal, sgvHistory, glucoseStats, backendClient, pollScheduler
+  startTime = utime.time()
+  journal = Journal(JOURNAL_FILE, HISTORY_SIZE)
+  sgvHistory = readJournal()
+  dictLen = len(sgvHistory)
+  print("Loaded " + str(dictLen) + " sgv entries")
+  glucoseStats = GlucoseStats(MIN, MAX, capacity=HISTORY_SIZE)
+  glucoseStats.rebuild(sgvHistory)
+  warmStart()
 
-  printCenteredText("Connecting wifi...", mode, backgroundColor=M5.Display.COLOR.DARKGREY) 
-  nic.connect(wifi_ssid, wifi_password)
-  print('Connecting wifi ' + wifi_ssid)
-  while not nic.isconnected():
-    print(".", end="")
-    time.sleep(0.25)
-  print("")  
+  backendClient = httpclient.Client(API_ENDPOINT)
+  pollScheduler = PollScheduler(READING_INTERVAL, POLL_MARGIN)
+  pollScheduler.learn(sgvHistory)
 
-  time_server = 'pool.ntp.org'
-  printCenteredText("Setting time...", mode, backgroundColor=M5.Display.COLOR.DARKGREY) 
-  print('Connecting time server ' + time_server)
-  now_datetime = None
-  while now_datetime is None:
-    try:
-      print(".", end="")
-      #TODO use 0.pool.ntp.org, 1.pool.ntp.org, 2.pool.ntp.org, 3.pool.ntp.org
-      ntptime.host = "pool.ntp.org" 
-      ntptime.settime()
-      now_datetime = getRtcDatetime()
-      startTime = utime.time()
-    except Exception as e:
-      sys.print_exception(e)
-      #saveError(e)
-      time.sleep(2)
-  print("\nCurrent UTC datetime " +  str(now_datetime))
+async def probeUnits():
+  global envUnit, rgbUnit
+  try: 
+     i2c0 = I2C(0, scl=Pin(33), sda=Pin(32), freq=40000)
+     envUnit = ENVUnit(i2c=i2c0, type=3) 
+     print('Temperature:',str(envUnit.read_temperature()) + " C")
+     print('Humidity:',str(envUnit.read_humidity()) + " %")
+     print('Pressure:',str(envUnit.read_pressure()) + " hPa")
+  except Exception as e:
+     print('Weather Monitoring Unit not found')
+     sys.print_exception(e)
 
-  printCenteredText("Loading data...", mode, backgroundColor=M5.Display.COLOR.DARKGREY) 
+  try: 
+     rgbUnit = RGBUnit((36, 26), 3)
+     rgbUnit.set_color(0, M5.Display.COLOR.BLACK)     
+     rgbUnit.set_color(1, M5.Display.COLOR.DARKGREY)
+     rgbUnit.set_color(2, M5.Display.COLOR.BLACK)
+  except Exception as e:
+     print('RGB Unit not found')
+     sys.print_exception(e)
 
-  sgvDict = readSgvFile()
-  dictLen = len(sgvDict)
-  print("Loaded " + str(dictLen) + " sgv entries")
+async def connectWifi():
+  #the access point of the last boot first, after a watchdog reset it is usually still
+  #there, otherwise the known networks in range by signal strength
+  global nic, wifi_ssid, wifi_password, wifiCache
+  nic = network.WLAN(network.STA_IF)
+  nic.active(True)
 
-  #max 4 timers 0-3
+  wifiCache = readWifiCache()
+  if wifiCache != None and wifiCache[0] in config:
+    (wifi_ssid, bssid, channel) = wifiCache
+    wifi_password = config[wifi_ssid]
+    printBootStatus("Connecting wifi...") 
+    print('Connecting cached wifi ' + wifi_ssid + ' on channel ' + str(channel))
+    try:
+      await joinWifi(wifi_ssid, wifi_password, bssid)
+      return
+    except OSError as e:
+      sys.print_exception(e)
 
-  backendResponseTimer = machine.Timer(1)
-  
-  localtimeTimer = machine.Timer(2)
-  localtimeTimer.init(period=1000, callback=localtimeCallback)
+  while True:
+    printBootStatus("Scanning wifi ...")
+    for (rssi, ssid, bssid, channel) in scanWifi():
+      wifi_ssid = ssid
+      wifi_password = config[ssid]
+      printBootStatus("Connecting wifi...") 
+      print('Connecting wifi ' + ssid + ' with rssi ' + str(rssi) + ' on channel ' + str(channel))
+      try:
+        await joinWifi(ssid, wifi_password, bssid)
+        saveWifiCache(ssid, bssid, channel)
+        return
+      except OSError as e:
+        sys.print_exception(e)
+    await asyncio.sleep(1)
+
+async def setTime():
+  #done right away when the RTC kept running since the last sync, otherwise with the
+  #first answer of a time server or the first backend response
+  global now_datetime, startTime
+  valid = rtcValid()
+  asyncio.create_task(timeSync.monitor())
+  if not timeSync.synced.is_set():
+    printBootStatus("Setting time...") 
+    await timeSync.synced.wait()
+  now_datetime = getRtcDatetime()
+  if not valid: startTime = utime.time()
+  print("Current UTC datetime " +  str(now_datetime) + ", time sync " + timeSync.stats())
+
+  #the reading on screen gets its age now that the time is set
+  if response != None: requestScreen(response[0], noNetwork=not live)
+  asyncio.create_task(localtimeMonitor())
+
+async def firstReading():
+  #the backend is polled from now on, the stage is done with the first reading
+  global backendTask
+  backendTask = asyncio.create_task(backendMonitor())
+  await liveEvent.wait()
+
+async def loopWatchdog():
+  #backstop for the timeouts of the tasks, which cannot fire while a call blocks the loop,
+  #e.g. a name lookup or a socket read: the watchdog resets when it is not fed in time.
+  #Feeding stops when shutting down, a restart arms it with a short timeout
+  wdt = WDT(timeout=LOOP_WATCHDOG_MS)
+  while not shuttingDown:
+    wdt.feed()
+    await asyncio.sleep_ms(LOOP_WATCHDOG_MS // 12)
+
+async def boot():
+  #tasks of the one event loop, only one runs at a time so they share the globals without locks
+  try:
+    asyncio.create_task(loopWatchdog())
+    asyncio.create_task(renderMonitor())
+    asyncio.create_task(accelMonitor())
+    asyncio.create_task(powerManager.monitor())
+
+    #the probes run while the radio associates and the time is set while the first
+    #reading is requested, the wifi waits for the cached reading as a scan blocks
+    graph = BootGraph(bootTicks)
+    graph.stage('flash', loadFlash)
+    graph.stage('wifi', connectWifi, after=('flash',))
+    graph.stage('units', probeUnits, after=('flash',))
+    graph.stage('backend', firstReading, after=('flash', 'wifi'))
+    graph.stage('time', setTime, after=('wifi',))
+    await graph.run()
+    print('Boot done ' + str(utime.ticks_ms()) + ' ms after reset, free heap ' + str(freeHeap()) + ' bytes')
+    await backendTask
+  except Exception as e:
+    sys.print_exception(e)
+    #saveError(e)
+    printCenteredText("Fix config!", mode, backgroundColor=M5.Display.COLOR.RED, clear=True)
 
-  #main method and threads
+async def main():
+  #touch and buttons work from the start, e.g. to open the configuration while no wifi is found
+  asyncio.create_task(touchInput.monitor())
+  await boot()
 
-  _thread.start_new_thread(emergencyMonitor, ())
-  _thread.start_new_thread(accelMonitor, ())
-  _thread.start_new_thread(backendMonitor(), ())
-except:
-  sys.print_exception(e)
-  #saveError(e)
-  printCenteredText("Fix config!", mode, backgroundColor=M5.Display.COLOR.RED, clear=True)
+asyncio.run(main())
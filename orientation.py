@@ -0,0 +1,47 @@
+#Orientation detector for the accelerometer y axis
+#The device counts as flipped below -threshold g and as upright above +threshold g, in
+#between it keeps its orientation (hysteresis). A new orientation has to hold for dwell
+#ms before it is reported, so a device lying near horizontal or being carried around
+#does not thrash between the normal and the flip modes. Tilts crossing the trigger level
+#(the former flip threshold) that are not reported are counted as suppressed flips.
+
+import utime
+
+class OrientationDetector:
+
+  def __init__(self, flipped=False, threshold=0.3, trigger=0.1, dwell=1000):
+    self.flipped = flipped
+    self.threshold = threshold
+    self.trigger = trigger
+    self.dwell = dwell
+    self.attempt = False #tilted towards the other orientation
+    self.since = None #ticks ms the other orientation holds since
+    self.changes = 0
+    self.suppressed = 0
+
+  def update(self, y, now=None):
+    #True when the orientation changed with this sample
+    if now == None: now = utime.ticks_ms()
+    towardsFlip = y < -self.trigger
+    towardsUpright = y > self.trigger
+    if (towardsFlip and not self.flipped) or (towardsUpright and self.flipped):
+      self.attempt = True
+    elif towardsFlip or towardsUpright:
+      #back to the current orientation
+      if self.attempt: self.suppressed += 1
+      self.attempt = False
+      self.since = None
+      return False
+    beyond = y < -self.threshold if not self.flipped else y > self.threshold
+    if not beyond:
+      self.since = None
+      return False
+    if self.since == None:
+      self.since = now
+    if utime.ticks_diff(now, self.since) < self.dwell:
+      return False
+    self.flipped = not self.flipped
+    self.attempt = False
+    self.since = None
+    self.changes += 1
+    return True
@@ -0,0 +1,112 @@
+#Power manager for the backlight, the panel and the CPU clock
+#The device is active for a while after a touch, a button press or an alert, then it is
+#idle: the CPU is clocked down and, when the dim function says so, the backlight dimmed.
+#At night, when the night function says so, the panel sleeps instead. The time spent in
+#every state is kept to compare the battery life of units running unplugged.
+
+import M5
+import machine
+import utime
+
+try:
+  import uasyncio as asyncio
+except:
+  import asyncio
+
+ACTIVE = 0
+IDLE = 1
+NIGHT = 2
+STATES = ['active', 'idle', 'night']
+
+class PowerManager:
+
+  def __init__(self, brightness, dimBrightness=8, dimAfter=60, idleFreq=80000000, dim=None, night=None, awake=None):
+    self.brightness = brightness
+    self.dimBrightness = dimBrightness
+    self.dimAfter = dimAfter #secs without activity before the device is idle
+    self.fullFreq = machine.freq()
+    self.idleFreq = idleFreq
+    self.dim = dim #True when the backlight may be dimmed
+    self.night = night #True when the panel may sleep
+    self.awake = awake #True while something, e.g. an alert, keeps the device active
+    self.state = None
+    self.backlight = None
+    self.since = utime.ticks_ms()
+    self.lastActivity = utime.ticks_ms()
+    self.stateMs = [0, 0, 0]
+    self.woken = asyncio.Event()
+    self.set(ACTIVE)
+
+  def set(self, state):
+    if state == self.state:
+      return
+    now = utime.ticks_ms()
+    if self.state != None: self.stateMs[self.state] += utime.ticks_diff(now, self.since)
+    self.since = now
+    previous = self.state
+    self.state = state
+    if state == ACTIVE:
+      machine.freq(self.fullFreq)
+      if previous == NIGHT: M5.Display.wakeup()
+      self.setBacklight(self.brightness)
+    elif state == IDLE:
+      if previous == NIGHT: M5.Display.wakeup()
+      self.setBacklight(self.idleBrightness())
+      machine.freq(self.idleFreq)
+    else:
+      self.setBacklight(0)
+      M5.Display.sleep()
+      machine.freq(self.idleFreq)
+    print('Power state ' + STATES[state])
+
+  def activity(self):
+    #True when the device was woken up by it
+    self.lastActivity = utime.ticks_ms()
+    woken = self.state != ACTIVE
+    self.set(ACTIVE)
+    if woken: self.woken.set()
+    return woken
+
+  def setBrightness(self, brightness):
+    self.brightness = brightness
+    if self.state == ACTIVE: self.setBacklight(brightness)
+    elif self.state == IDLE: self.setBacklight(self.idleBrightness())
+
+  def setBacklight(self, level):
+    if level != self.backlight:
+      M5.Widgets.setBrightness(level)
+      self.backlight = level
+
+  def idleBrightness(self):
+    if self.dim != None and self.dim():
+      return min(self.dimBrightness, self.brightness)
+    return self.brightness
+
+  def idleState(self):
+    if self.night != None and self.night():
+      return NIGHT
+    return IDLE
+
+  async def monitor(self):
+    #wakes when the active time is over, when woken up and once a minute while idle to
+    #follow the night and the dim function, e.g. when the charger is plugged in
+    while True:
+      if self.awake != None and self.awake():
+        self.activity()
+      if self.state == ACTIVE:
+        remaining = self.dimAfter * 1000 - utime.ticks_diff(utime.ticks_ms(), self.lastActivity)
+        if remaining > 0:
+          await asyncio.sleep_ms(remaining)
+          continue
+      self.set(self.idleState())
+      if self.state == IDLE: self.setBacklight(self.idleBrightness())
+      self.woken.clear()
+      try:
+        await asyncio.wait_for(self.woken.wait(), 60)
+      except asyncio.TimeoutError:
+        pass
+
+  def stats(self):
+    ms = list(self.stateMs)
+    ms[self.state] += utime.ticks_diff(utime.ticks_ms(), self.since)
+    return ', '.join([STATES[i] + ' ' + str(ms[i] // 60000) + ' min' for i in range(len(STATES))])
@@ -0,0 +1 @@
+#Host side simulator for the Core2 glucose monitor, see "Running on a PC" in README.md
@@ -0,0 +1,81 @@
+#Compares drawScreen frames drawn straight to the panel with frames composed on an
+#off-screen canvas: draw calls, panel pixels, modelled bus time and host time per frame
+#
+#  python -m sim.bench_canvas --hours 2
+#
+#The device is turned over every 10 minutes and the glucose profile crosses the
+#min/max limits, so the run mixes full repaints with small incremental updates.
+
+import argparse
+import io
+import math
+import sys
+import time
+
+from sim.device import Simulation
+from sim.world import Glucose
+
+COUNTERS = ['lcd.calls', 'lcd.pixels', 'lcd.us', 'canvas.calls', 'canvas.us']
+
+class FrameProbe(io.TextIOBase):
+  #application log that snapshots the counters around every drawScreen
+
+  def __init__(self, metrics):
+    self.metrics = metrics
+    self.start = None
+    self.frames = []
+
+  def counters(self):
+    return [self.metrics.get(name) for name in COUNTERS] + [time.perf_counter()]
+
+  def write(self, text):
+    if 'Printing screen in ' in text:
+      self.start = self.counters()
+    elif 'Printing screen finished' in text and self.start != None:
+      self.frames.append([b - a for a, b in zip(self.start, self.counters())])
+      self.start = None
+    return len(text)
+
+def run(hours, canvas, seed):
+  sim = Simulation(seed=seed, config={'canvas': canvas})
+  probe = FrameProbe(sim.kernel.metrics)
+  sim.log = probe
+  sim.world.glucose = Glucose(sim.world, profile=lambda t: 130 + 100 * math.sin(t / 1500))
+  for i in range(int(hours * 6)):
+    sim.world.tilt(i * 600 + 300, -1.0 if i % 2 == 0 else 1.0)
+  with sim:
+    sim.run(hours * 3600)
+  return probe.frames
+
+def average(frames, column):
+  if len(frames) == 0:
+    return 0
+  return sum(f[column] for f in frames) / len(frames)
+
+def report(name, frames, out):
+  print('  %-12s %4d frames  panel %5.1f calls %7.0f px %6.0f us  canvas %5.1f calls %5.0f us  host %5.2f ms' % (
+    name, len(frames), average(frames, 0), average(frames, 1), average(frames, 2),
+    average(frames, 3), average(frames, 4), average(frames, 5) * 1000), file=out)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Per frame cost of drawScreen with and without an off-screen canvas')
+  parser.add_argument('--hours', type=float, default=2)
+  parser.add_argument('--seed', type=int, default=1)
+  args = parser.parse_args(argv)
+
+  results = {}
+  for canvas in (0, 1):
+    results[canvas] = run(args.hours, canvas, args.seed)
+  #both runs see the same frames, a frame is a full repaint when the canvas got pushed
+  full = set(i for i, f in enumerate(results[1]) if f[3] > 0)
+  for canvas in (0, 1):
+    frames = results[canvas]
+    fullFrames = [frames[i] for i in full if i < len(frames)]
+    partFrames = [f for i, f in enumerate(frames) if i not in full]
+    print('Canvas ' + ('on' if canvas else 'off') + ':', file=sys.stdout)
+    report('full repaint', fullFrames, sys.stdout)
+    report('incremental', partFrames, sys.stdout)
+    report('all', frames, sys.stdout)
+
+if __name__ == '__main__':
+  main()
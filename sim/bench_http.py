@@ -0,0 +1,156 @@
+#httpclient against a local HTTPS stand-in of the backend: a CPython HTTP/1.1 server with
+#a throwaway self-signed certificate (made with the openssl command line tool) serving the
+#recorded entries.json payloads. The client runs on CPython's asyncio. Counts TLS
+#handshakes, the resumed ones, and their time for
+#
+#  fresh     a new connection per request, what requests2 does
+#  pooled    one kept-alive connection for all requests
+#  reconnect the connection dropped before every request, the TLS session resumed
+#  idle      the server closing idle connections, the client reconnects and retries
+#
+#  python -m sim.bench_http
+#  python -m sim.bench_http --requests 50
+
+import argparse
+import asyncio
+import http.server
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from sim.bench_json import PAYLOAD_DIR
+from sim.device import APP_DIR
+
+sys.path.insert(0, APP_DIR)
+import entries
+import httpclient
+
+class Handler(http.server.BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+  timeout = 5
+  disable_nagle_algorithm = True
+
+  def do_GET(self):
+    self.server.requests += 1
+    path = self.path.split('?')[0]
+    name = 'entries-50.json' if 'count=50' in self.path else 'entries-10.json'
+    with open(os.path.join(PAYLOAD_DIR, name), 'rb') as f:
+      body = f.read()
+    if not path.endswith('/entries.json'):
+      self.send_error(404)
+      return
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    if 'chunked' in self.path:
+      self.send_header('Transfer-Encoding', 'chunked')
+      self.end_headers()
+      for i in range(0, len(body), 700):
+        chunk = body[i:i + 700]
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+      self.wfile.write(b'0\r\n\r\n')
+    else:
+      self.send_header('Content-Length', str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+class Server(http.server.ThreadingHTTPServer):
+  daemon_threads = True
+
+  def __init__(self, address, context):
+    http.server.ThreadingHTTPServer.__init__(self, address, Handler)
+    self.context = context
+    self.requests = 0
+    self.handshakes = 0
+    self.resumed = 0
+
+  def get_request(self):
+    sock, address = self.socket.accept()
+    sock = self.context.wrap_socket(sock, server_side=True)
+    self.handshakes += 1
+    if sock.session_reused: self.resumed += 1
+    return sock, address
+
+def certificate(directory):
+  cert = os.path.join(directory, 'cert.pem')
+  key = os.path.join(directory, 'key.pem')
+  subprocess.run(['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1', '-nodes',
+    '-keyout', key, '-out', cert, '-days', '1', '-subj', '/CN=localhost', '-addext', 'subjectAltName=DNS:localhost'],
+    check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+  return cert, key
+
+async def call(client, query='count=10'):
+  response = await client.get('/entries.json?' + query, headers={'accept-charset': 'ascii'})
+  assert response.status_code == 200, response.status_code
+  kept = await entries.readAsync(response.raw, 10)
+  response.close()
+  assert len(kept) == 10 and 'sgv' in kept[0]
+  return kept
+
+async def scenario(name, server, url, context, n, before=None, fresh=False):
+  server.handshakes = server.resumed = server.requests = 0
+  client = httpclient.Client(url, context)
+  s = time.perf_counter()
+  connects = resumed = connectMs = 0
+  for i in range(n):
+    if fresh:
+      client = httpclient.Client(url, context)
+    elif before != None:
+      await before(client)
+    await call(client, 'count=10&chunked=1' if i % 2 else 'count=10')
+    if fresh:
+      client.close()
+      connects += client.connects
+      resumed += client.resumed
+      connectMs += client.connectMs
+  spent = time.perf_counter() - s
+  if not fresh:
+    connects, resumed, connectMs = client.connects, client.resumed, client.connectMs
+  client.close()
+  print('%-9s %8d %10d %8d %9d %10.1f %12.1f' % (name, n, connects, server.resumed, connectMs, spent * 1000, spent * 1000 / n))
+  assert server.handshakes == connects and server.resumed == resumed and server.requests == n, (server.handshakes, server.resumed, server.requests)
+  return connects, resumed
+
+async def dropConnection(client):
+  client.close()
+
+async def idle(client):
+  await asyncio.sleep(0.4)
+
+async def run(server, url, context, n):
+  print('%-9s %8s %10s %8s %9s %10s %12s' % ('mode', 'requests', 'handshakes', 'resumed', 'hs ms', 'total ms', 'ms/request'))
+  assert await scenario('fresh', server, url, context, n, fresh=True) == (n, 0)
+  assert await scenario('pooled', server, url, context, n) == (1, 0)
+  assert await scenario('reconnect', server, url, context, n, before=dropConnection) == (n, n - 1)
+  Handler.timeout = 0.2
+  assert await scenario('idle', server, url, context, min(n, 5), before=idle) == (min(n, 5), min(n, 5) - 1)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='keep-alive and TLS session resumption of httpclient')
+  parser.add_argument('--requests', type=int, default=20)
+  args = parser.parse_args(argv)
+  n = args.requests
+  directory = tempfile.mkdtemp(prefix='bench-http-')
+  try:
+    cert, key = certificate(directory)
+    serverContext = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    serverContext.load_cert_chain(cert, key)
+    server = Server(('127.0.0.1', 0), serverContext)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'https://localhost:' + str(server.server_address[1]) + '/api/v1'
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.load_verify_locations(cert)
+    asyncio.run(run(server, url, context, n))
+    server.shutdown()
+  finally:
+    shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,58 @@
+#Peak heap allocation of parsing an entries.json response: the whole body read and
+#decoded with json (what backendResponse.json() does) against entries.read streaming
+#it in 128 byte chunks
+#
+#  python -m sim.bench_json
+#  python -m sim.bench_json recorded.json ...
+#
+#Without arguments the payloads recorded from the simulated backend in sim/payloads are
+#used. CPython object sizes are larger than MicroPython's, the ratio is what matters.
+
+import glob
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from sim.device import APP_DIR
+
+sys.path.insert(0, APP_DIR)
+import entries
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'payloads')
+
+def measure(fn, body):
+  #peak bytes allocated while fn parses body from a socket-like stream, and the time
+  stream = io.BytesIO(body)
+  tracemalloc.start()
+  s = time.perf_counter()
+  result = fn(stream)
+  spent = time.perf_counter() - s
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return result, peak, spent
+
+def whole(stream):
+  return json.loads(stream.read())
+
+def streaming(stream):
+  return entries.read(stream, 10)
+
+def main(argv=None):
+  paths = (argv if argv != None else sys.argv[1:]) or sorted(glob.glob(os.path.join(PAYLOAD_DIR, '*.json')))
+  print('%-20s %8s %8s %12s %12s %10s %10s' % ('payload', 'bytes', 'entries', 'json peak', 'stream peak', 'json ms', 'stream ms'))
+  for path in paths:
+    with open(path, 'rb') as f:
+      body = f.read()
+    full, fullPeak, fullTime = measure(whole, body)
+    kept, streamPeak, streamTime = measure(streaming, body)
+    for entry, parsed in zip(full, kept):
+      for key in parsed:
+        assert parsed[key] == entry[key], (path, key)
+    print('%-20s %8d %8d %10.1f K %10.1f K %10.2f %10.2f' % (os.path.basename(path), len(body), len(full),
+      fullPeak / 1024, streamPeak / 1024, fullTime * 1000, streamTime * 1000))
+
+if __name__ == '__main__':
+  main()
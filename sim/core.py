@@ -0,0 +1,324 @@
+#Virtual clock and cooperative scheduler used by the host simulator
+#
+#Every device thread (_thread.start_new_thread and the main script) runs in a real
+#CPython thread, but only one of them holds the baton at a time. A thread gives the
+#baton back to the kernel whenever it blocks (sleep, lock, network, ...) and the kernel
+#then jumps the virtual clock to the next due event. Timer callbacks run in the kernel
+#context, like the soft machine.Timer callbacks on the device.
+
+import heapq
+import threading
+import time as _time
+import sys
+import traceback
+
+RTC_UNSET = 946684800 #2000-01-01 00:00:00, ESP32 RTC value after power on
+TICKS_PERIOD = 1 << 30
+
+class SimulationExit(BaseException):
+  pass
+
+class DeviceReset(BaseException):
+  pass
+
+class Event:
+  __slots__ = ('time', 'seq', 'fn', 'wake', 'persistent', 'cancelled')
+
+  def __init__(self, time, seq, fn, wake, persistent):
+    self.time = time
+    self.seq = seq
+    self.fn = fn
+    self.wake = wake
+    self.persistent = persistent
+    self.cancelled = False
+
+  def __lt__(self, other):
+    return (self.time, self.seq) < (other.time, other.seq)
+
+  def cancel(self):
+    self.cancelled = True
+
+class Waiter:
+  #one blocking wait of a thread, it is resumed by whatever comes first: a notify
+  #or the timeout, later wakeups for the same wait are ignored
+
+  def __init__(self, actor):
+    self.actor = actor
+    self.active = True
+    self.notified = False
+
+class Actor:
+
+  def __init__(self, kernel, name, target, args, kwargs):
+    self.kernel = kernel
+    self.name = name
+    self.target = target
+    self.args = args
+    self.kwargs = kwargs or {}
+    self.ident = kernel.nextIdent()
+    self.go = threading.Event()
+    self.pending = None
+    self.waiter = None
+    self.done = False
+    self.cpu = 0.0
+    self.wakeups = 0
+    self.thread = threading.Thread(target=self.main, name='sim-' + name, daemon=True)
+
+  def main(self):
+    self.kernel.local.actor = self
+    self.go.wait()
+    self.go.clear()
+    try:
+      if self.pending != None:
+        raise self.pending
+      self.target(*self.args, **self.kwargs)
+    except (SimulationExit, DeviceReset):
+      pass
+    except BaseException as e:
+      self.kernel.crashed(self, e)
+    finally:
+      self.done = True
+      self.kernel.yielded.set()
+
+class Metrics:
+  #counters are kept both for the whole run and for the current cycle, a cycle
+  #being everything that happens between two delivered sgv readings
+
+  def __init__(self, kernel):
+    self.kernel = kernel
+    self.total = {}
+    self.cycles = []
+    self.cycle = None
+
+  def add(self, name, value=1):
+    self.total[name] = self.total.get(name, 0) + value
+    if self.cycle != None:
+      counters = self.cycle['counters']
+      counters[name] = counters.get(name, 0) + value
+
+  def get(self, name, default=0):
+    return self.total.get(name, default)
+
+  def newCycle(self, label):
+    self.cycle = {'label': label, 'start': self.kernel.now, 'counters': {}}
+    self.cycles.append(self.cycle)
+
+class Kernel:
+
+  def __init__(self, epoch):
+    self.epoch = epoch
+    self.now = 0.0
+    self.rtcOffset = RTC_UNSET
+    self.rtcDriftPpm = 0
+    self.rtcSetAt = 0.0
+    self.queue = []
+    self.seq = 0
+    self.idents = 0
+    self.yielded = threading.Event()
+    self.local = threading.local()
+    self.actors = []
+    self.halt = None
+    self.stopping = False
+    self.resets = 0
+    self.resetCause = 'power_on'
+    self.resetHooks = []
+    self.boot = None
+    self.errors = []
+    self.metrics = Metrics(self)
+    self.cpu = 0.0
+
+  # clock ----
+
+  def world(self):
+    #wall clock of the simulated world (what NTP and the backend see)
+    return self.epoch + self.now
+
+  def rtc(self):
+    #wall clock of the device RTC, which is only right after it has been set
+    return self.rtcOffset + self.rtcSetAt + (self.now - self.rtcSetAt) * (1 + self.rtcDriftPpm / 1000000)
+
+  def setRtc(self, seconds):
+    self.rtcSetAt = self.now
+    self.rtcOffset = seconds - self.now
+
+  def ticks(self, scale):
+    return int(self.now * scale) % TICKS_PERIOD
+
+  # scheduling ----
+
+  def nextIdent(self):
+    self.idents += 1
+    return self.idents
+
+  def at(self, time, fn, wake=False, persistent=False):
+    #persistent events belong to the simulated world and survive device resets
+    self.seq += 1
+    event = Event(max(time, self.now), self.seq, fn, wake, persistent)
+    heapq.heappush(self.queue, event)
+    return event
+
+  def after(self, seconds, fn, persistent=False):
+    return self.at(self.now + seconds, fn, persistent=persistent)
+
+  def current(self):
+    return getattr(self.local, 'actor', None)
+
+  def spawn(self, name, target, args=(), kwargs=None):
+    actor = Actor(self, name, target, args, kwargs)
+    self.actors.append(actor)
+    actor.thread.start()
+    self.wake(actor)
+    return actor
+
+  def wake(self, actor, delay=0):
+    return self.at(self.now + delay, lambda: self.resume(actor), wake=True)
+
+  def waiter(self):
+    actor = self.current()
+    if actor == None:
+      raise RuntimeError('Blocking call outside of a thread (timer callback?)')
+    return Waiter(actor)
+
+  def fire(self, waiter, notified):
+    if waiter.active:
+      waiter.active = False
+      waiter.notified = notified
+      self.resume(waiter.actor)
+
+  def notify(self, waiter, delay=0):
+    #can be called from any thread or from kernel context
+    return self.at(self.now + delay, lambda: self.fire(waiter, True), wake=True)
+
+  def wait(self, waiter, timeout=None):
+    #parks the calling thread until notify or timeout, returns True when notified
+    self.guard()
+    timer = None
+    if timeout != None:
+      timer = self.at(self.now + max(timeout, 0), lambda: self.fire(waiter, False), wake=True)
+    waiter.actor.waiter = waiter
+    try:
+      self.park()
+    finally:
+      waiter.actor.waiter = None
+      if timer != None:
+        timer.cancel()
+    return waiter.notified
+
+  def guard(self):
+    #device code keeps running only until the thread gets back to the kernel, after
+    #a reset or the end of the run every further hardware access aborts the thread
+    actor = self.current()
+    if self.halt != None and actor != None:
+      raise self.halt()
+
+  def park(self):
+    actor = self.current()
+    if actor == None:
+      raise RuntimeError('Blocking call outside of a thread (timer callback?)')
+    self.yielded.set()
+    actor.go.wait()
+    actor.go.clear()
+    if actor.pending != None:
+      e = actor.pending
+      actor.pending = None
+      raise e
+
+  def sleep(self, seconds):
+    self.wait(self.waiter(), seconds)
+
+  def resume(self, actor):
+    if actor.done:
+      return
+    if self.halt != None and actor.pending == None:
+      actor.pending = self.halt()
+    actor.wakeups += 1
+    self.metrics.add('wakeups')
+    s = _time.perf_counter()
+    actor.go.set()
+    self.yielded.wait()
+    self.yielded.clear()
+    spent = _time.perf_counter() - s
+    actor.cpu += spent
+    self.cpu += spent
+    self.metrics.add('cpu', spent)
+
+  def call(self, fn):
+    #runs fn in kernel (interrupt) context
+    s = _time.perf_counter()
+    try:
+      fn()
+    except (SimulationExit, DeviceReset):
+      pass
+    except Exception as e:
+      self.crashed(None, e)
+    spent = _time.perf_counter() - s
+    self.cpu += spent
+    self.metrics.add('cpu', spent)
+
+  def crashed(self, actor, e):
+    if self.halt != None:
+      return
+    name = 'timer' if actor == None else actor.name
+    self.errors.append((self.now, name, e))
+    print('Unhandled exception in ' + name + ':', file=sys.__stderr__)
+    traceback.print_exception(type(e), e, e.__traceback__, file=sys.__stderr__)
+
+  def step(self, until):
+    while self.queue:
+      event = self.queue[0]
+      if event.time > until:
+        return False
+      heapq.heappop(self.queue)
+      if event.cancelled or (self.halt != None and not event.persistent):
+        continue
+      self.now = event.time
+      if event.wake:
+        event.fn()
+      else:
+        self.call(event.fn)
+      return True
+    return False
+
+  def run(self, until):
+    while self.step(until):
+      pass
+    self.now = max(self.now, until)
+
+  # lifecycle ----
+
+  def stopAll(self, exc):
+    self.halt = exc
+    for i in range(100):
+      alive = [a for a in self.actors if not a.done]
+      if len(alive) == 0:
+        break
+      for actor in alive:
+        if actor.waiter != None:
+          actor.waiter.active = False
+        actor.pending = exc()
+        self.resume(actor)
+    self.actors = [a for a in self.actors if not a.done]
+    self.queue = [e for e in self.queue if not e.cancelled and e.persistent]
+    heapq.heapify(self.queue)
+
+  def start(self):
+    self.halt = None
+    self.boot()
+
+  def reset(self, cause='soft'):
+    #machine.reset() and watchdog expiry: every thread and timer is gone, RTC keeps going
+    def doReset():
+      self.stopAll(DeviceReset)
+      self.resets += 1
+      self.resetCause = cause
+      self.metrics.add('resets')
+      for hook in self.resetHooks:
+        hook()
+      self.start()
+    if self.halt == None:
+      self.halt = DeviceReset
+      self.at(self.now, doReset, persistent=True)
+
+  def shutdown(self):
+    self.stopping = True
+    self.stopAll(SimulationExit)
@@ -0,0 +1,198 @@
+#A simulated Core2: kernel, world and display wired to the stub modules, running the
+#unmodified application from a temporary flash directory
+
+import builtins
+import calendar
+import importlib.util
+import io
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import traceback
+
+from sim.core import Kernel
+from sim.display import Display
+from sim.world import World
+
+STUB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS = ['utime', 'time', '_thread', 'ujson', 'uos', 'esp', 'machine', 'hardware', 'network', 'ntptime', 'requests2', 'unit', 'usocket', 'ussl', 'uasyncio', 'M5']
+DEFAULT_EPOCH = calendar.timegm((2025, 6, 2, 6, 0, 0))
+DEFAULT_CONFIG = {
+  'config': 1,
+  'brightness': 32,
+  'api-endpoint': 'https://sim.local/api/v1',
+  'api-token': 'sim-token',
+  'locale': 'en',
+  'min': 75,
+  'max': 180,
+  'emergencyMin': 50,
+  'emergencyMax': 250,
+  'timezone': '+02:00',
+  'beeper': 1,
+  'beeperStartTime': '07:00:00',
+  'beeperEndTime': '22:00:00',
+  'oldData': 15,
+  'oldDataEmergenc': 1440,
+  'home': 'secret'
+}
+
+current = None
+realOpen = builtins.open
+
+def load(name):
+  #stubs are loaded from their files under the MicroPython module names
+  module = sys.modules.get(name)
+  if module != None and getattr(module, '__simstub__', False):
+    return module
+  spec = importlib.util.spec_from_file_location(name, os.path.join(STUB_DIR, name + '.py'))
+  module = importlib.util.module_from_spec(spec)
+  module.__simstub__ = True
+  sys.modules[name] = module
+  spec.loader.exec_module(module)
+  return module
+
+def printException(e, file=None):
+  traceback.print_exception(type(e), e, e.__traceback__, file=file if file != None else sys.stdout)
+
+class FlashFile:
+  #counts the bytes the application reads from and writes to flash
+
+  def __init__(self, f, metrics):
+    self.f = f
+    self.metrics = metrics
+
+  def write(self, data):
+    self.metrics.kernel.guard()
+    self.metrics.add('flash.writes')
+    self.metrics.add('flash.bytesWritten', len(data.encode() if isinstance(data, str) else data))
+    return self.f.write(data)
+
+  def read(self, *args):
+    data = self.f.read(*args)
+    self.metrics.add('flash.bytesRead', len(data))
+    return data
+
+  def __getattr__(self, name):
+    return getattr(self.f, name)
+
+  def __iter__(self):
+    return iter(self.f)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.f.close()
+
+class Simulation:
+
+  def __init__(self, app='main.py', epoch=DEFAULT_EPOCH, seed=1, flash=None, config=None, log=None):
+    self.kernel = Kernel(epoch)
+    self.world = World(self.kernel, seed)
+    self.display = Display(self.kernel.metrics)
+    self.appPath = os.path.join(APP_DIR, app)
+    self.flash = flash if flash != None else tempfile.mkdtemp(prefix='core2-flash-')
+    self.ownFlash = flash == None
+    self.log = log
+    self.cpuFreq = 240000000
+    self.cpuFreqSince = 0.0
+    self.cpuFreqSeconds = {}
+    self.pinIrqs = {}
+    self.saved = {}
+    os.makedirs(self.flash, exist_ok=True)
+    if not os.path.exists(os.path.join(self.flash, 'config.json')):
+      settings = dict(DEFAULT_CONFIG)
+      settings.update(config or {})
+      with io.open(os.path.join(self.flash, 'config.json'), 'w') as f:
+        json.dump(settings, f)
+    for name in os.listdir(APP_DIR):
+      if name.endswith('.html') and not os.path.exists(os.path.join(self.flash, name)):
+        shutil.copy(os.path.join(APP_DIR, name), self.flash)
+    self.kernel.boot = self.boot
+
+  def setCpuFreq(self, hz):
+    self.cpuFreqSeconds[self.cpuFreq] = self.cpuFreqSeconds.get(self.cpuFreq, 0) + self.kernel.now - self.cpuFreqSince
+    self.cpuFreq = hz
+    self.cpuFreqSince = self.kernel.now
+    self.kernel.metrics.add('machine.freq')
+
+  # process wiring ----
+
+  def flashOpen(self, file, mode='r', *args, **kwargs):
+    f = realOpen(file, mode, *args, **kwargs)
+    if isinstance(file, str) and not os.path.isabs(file):
+      self.kernel.metrics.add('flash.opens')
+      return FlashFile(f, self.kernel.metrics)
+    return f
+
+  def install(self):
+    global current
+    current = self
+    for name in STUBS:
+      self.saved[name] = sys.modules.get(name)
+    self.savedCwd = os.getcwd()
+    self.savedStdout = sys.stdout
+    os.chdir(self.flash)
+    sys.path.insert(0, APP_DIR)
+    builtins.open = self.flashOpen
+    sys.print_exception = printException
+    if self.log != None:
+      sys.stdout = self.log
+    for name in STUBS:
+      load(name)
+
+  def uninstall(self):
+    global current
+    for name in STUBS:
+      if self.saved.get(name) != None:
+        sys.modules[name] = self.saved[name]
+      else:
+        sys.modules.pop(name, None)
+    self.unloadApp()
+    builtins.open = realOpen
+    del sys.print_exception
+    sys.stdout = self.savedStdout
+    sys.path.remove(APP_DIR)
+    os.chdir(self.savedCwd)
+    current = None
+
+  def unloadApp(self):
+    #application modules are imported again on every boot, as on the device
+    for name, module in list(sys.modules.items()):
+      path = getattr(module, '__file__', None) or ''
+      if os.path.dirname(os.path.abspath(path)) == APP_DIR:
+        del sys.modules[name]
+
+  def boot(self):
+    self.unloadApp()
+    self.kernel.metrics.add('boots')
+    self.kernel.spawn('main', runpy.run_path, (self.appPath,), {'run_name': '__main__'})
+
+  # running ----
+
+  def start(self):
+    self.install()
+    self.kernel.start()
+
+  def run(self, seconds):
+    self.kernel.run(self.kernel.now + seconds)
+
+  def close(self):
+    self.kernel.shutdown()
+    self.setCpuFreq(self.cpuFreq)
+    self.radio = self.world.radio.totals()
+    self.panel = self.display.panelTotals()
+    self.uninstall()
+    if self.ownFlash:
+      shutil.rmtree(self.flash, ignore_errors=True)
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, *args):
+    self.close()
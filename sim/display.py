@@ -0,0 +1,423 @@
+#LCD stand-in: a 320x240 RGB888 framebuffer with the M5GFX drawing primitives used by the app
+#
+#Every primitive is counted together with the number of pixels it pushes over SPI, so
+#render changes can be compared by calls and pixels per frame. Text is not rasterized
+#with real fonts, each glyph cell gets a deterministic ink pattern and the string is
+#kept in a text layer, so tests can both compare framebuffers and read what is shown.
+
+from array import array
+import io
+import math
+import struct
+import zlib
+
+WIDTH = 320
+HEIGHT = 240
+
+class Colors:
+  BLACK = 0x000000
+  NAVY = 0x000080
+  DARKGREEN = 0x008000
+  DARKCYAN = 0x008080
+  MAROON = 0x800000
+  PURPLE = 0x800080
+  OLIVE = 0x808000
+  LIGHTGREY = 0xD3D3D3
+  DARKGREY = 0x808080
+  BLUE = 0x0000FF
+  GREEN = 0x00FF00
+  CYAN = 0x00FFFF
+  RED = 0xFF0000
+  MAGENTA = 0xFF00FF
+  YELLOW = 0xFFFF00
+  WHITE = 0xFFFFFF
+  ORANGE = 0xFFA500
+  GREENYELLOW = 0xADFF2F
+  PINK = 0xFFC0CB
+
+class Font:
+
+  def __init__(self, name, height):
+    self.name = name
+    self.height = height
+
+  def __repr__(self):
+    return 'Font(' + self.name + ')'
+
+class Fonts:
+  DejaVu9 = Font('DejaVu9', 9)
+  DejaVu12 = Font('DejaVu12', 12)
+  DejaVu18 = Font('DejaVu18', 18)
+  DejaVu24 = Font('DejaVu24', 24)
+  DejaVu40 = Font('DejaVu40', 40)
+  DejaVu56 = Font('DejaVu56', 56)
+  DejaVu72 = Font('DejaVu72', 72)
+  ASCII7 = Font('ASCII7', 8)
+
+#advance width of a glyph as a fraction of the font height
+GLYPH_WIDTHS = {' ': 0.32, ':': 0.34, '.': 0.32, ',': 0.32, '%': 0.95, '+': 0.84, '-': 0.36, 'm': 0.97, 'w': 0.82, 'i': 0.28, 'l': 0.28, 'I': 0.3}
+
+def glyphWidth(ch, height):
+  if ch in GLYPH_WIDTHS:
+    return int(GLYPH_WIDTHS[ch] * height + 0.5)
+  if ch.isdigit():
+    return int(0.64 * height + 0.5)
+  if ch.isupper():
+    return int(0.7 * height + 0.5)
+  return int(0.6 * height + 0.5)
+
+def glyphInk(ch):
+  #5x7 on/off pattern derived from the character code
+  bits = (ord(ch) * 2654435761) & 0x7FFFFFFFF
+  return [[(bits >> (r * 5 + c)) & 1 for c in range(5)] for r in range(7)]
+
+class TextItem:
+
+  def __init__(self, msg, x, y, w, h, font, color, background):
+    self.msg = msg
+    self.x = x
+    self.y = y
+    self.w = w
+    self.h = h
+    self.font = font
+    self.color = color
+    self.background = background
+
+  def __repr__(self):
+    return 'TextItem(' + repr(self.msg) + ', ' + str(self.x) + ', ' + str(self.y) + ')'
+
+#modelled cost of a primitive in microseconds: a fixed per transaction overhead plus
+#the pixels, 16 bit over the 40MHz SPI bus for the panel and a memory fill for canvases
+PANEL_COST = (25, 0.4)
+CANVAS_COST = (2, 0.01)
+
+class Surface:
+  #drawing state and primitives shared by the panel and off-screen canvases
+
+  def __init__(self, metrics, width, height, prefix, native, cost):
+    self.metrics = metrics
+    self.prefix = prefix
+    self.physWidth = width
+    self.physHeight = height
+    self.rows = [array('I', [0]) * width for i in range(height)]
+    self.texts = []
+    self.native = native
+    self.rotation = native
+    self.cost = cost
+    self.font = Fonts.DejaVu9
+    self.textSize = 1
+    self.textColor = Colors.WHITE
+    self.textBackground = None
+
+  # geometry ----
+
+  def width(self):
+    return self.physWidth if (self.rotation - self.native) % 2 == 0 else self.physHeight
+
+  def height(self):
+    return self.physHeight if (self.rotation - self.native) % 2 == 0 else self.physWidth
+
+  def toPhysical(self, x, y, w, h):
+    #rotation 1 is the native landscape orientation of the Core2 panel
+    r = (self.rotation - self.native) % 4
+    if r == 0:
+      return x, y, w, h
+    if r == 2:
+      return self.physWidth - x - w, self.physHeight - y - h, w, h
+    if r == 3:
+      return self.physWidth - y - h, x, h, w
+    return y, self.physHeight - x - w, h, w
+
+  def count(self, name, pixels):
+    self.metrics.add(self.prefix + 'calls')
+    self.metrics.add(self.prefix + 'call.' + name)
+    self.metrics.add(self.prefix + 'pixels', pixels)
+    self.metrics.add(self.prefix + 'us', self.cost[0] + pixels * self.cost[1])
+
+  def paint(self, x, y, w, h, color):
+    #paints a logical rectangle, returns the number of visible pixels
+    self.metrics.kernel.guard()
+    x, y, w, h = self.toPhysical(x, y, w, h)
+    x0 = max(x, 0)
+    y0 = max(y, 0)
+    x1 = min(x + w, self.physWidth)
+    y1 = min(y + h, self.physHeight)
+    if x0 >= x1 or y0 >= y1:
+      return 0
+    span = array('I', [color]) * (x1 - x0)
+    for row in range(y0, y1):
+      self.rows[row][x0:x1] = span
+    self.covered(x0, y0, x1, y1)
+    return (x1 - x0) * (y1 - y0)
+
+  def covered(self, x0, y0, x1, y1):
+    if self.texts:
+      self.texts = [t for t in self.texts if t.x >= x1 or t.x + t.w <= x0 or t.y >= y1 or t.y + t.h <= y0]
+
+  def pixel(self, x, y):
+    x, y, w, h = self.toPhysical(x, y, 1, 1)
+    return self.rows[y][x]
+
+  # primitives ----
+
+  def setRotation(self, r):
+    self.rotation = r % 4
+
+  def getRotation(self):
+    return self.rotation
+
+  def clear(self, color=Colors.BLACK):
+    self.fillScreen(color)
+
+  def fillScreen(self, color=Colors.BLACK):
+    self.count('fillScreen', self.paint(0, 0, self.width(), self.height(), color))
+    self.texts = []
+
+  def fillRect(self, x, y, w, h, color=None):
+    self.count('fillRect', self.paint(x, y, w, h, self.textColor if color == None else color))
+
+  def drawRect(self, x, y, w, h, color=None):
+    color = self.textColor if color == None else color
+    n = self.paint(x, y, w, 1, color) + self.paint(x, y + h - 1, w, 1, color)
+    n += self.paint(x, y + 1, 1, h - 2, color) + self.paint(x + w - 1, y + 1, 1, h - 2, color)
+    self.count('drawRect', n)
+
+  def drawPixel(self, x, y, color=None):
+    self.count('drawPixel', self.paint(x, y, 1, 1, self.textColor if color == None else color))
+
+  def drawLine(self, x0, y0, x1, y1, color=None):
+    color = self.textColor if color == None else color
+    n = 0
+    steps = max(abs(x1 - x0), abs(y1 - y0))
+    for i in range(steps + 1):
+      t = i / steps if steps > 0 else 0
+      n += self.paint(int(round(x0 + (x1 - x0) * t)), int(round(y0 + (y1 - y0) * t)), 1, 1, color)
+    self.count('drawLine', n)
+
+  def drawFastHLine(self, x, y, w, color=None):
+    self.count('drawFastHLine', self.paint(x, y, w, 1, self.textColor if color == None else color))
+
+  def drawFastVLine(self, x, y, h, color=None):
+    self.count('drawFastVLine', self.paint(x, y, 1, h, self.textColor if color == None else color))
+
+  def fillCircle(self, x, y, r, color=None):
+    color = self.textColor if color == None else color
+    n = 0
+    for dy in range(-r, r + 1):
+      dx = math.isqrt(r * r - dy * dy)
+      n += self.paint(x - dx, y + dy, 2 * dx + 1, 1, color)
+    self.count('fillCircle', n)
+
+  def drawCircle(self, x, y, r, color=None):
+    color = self.textColor if color == None else color
+    n = 0
+    for dy in range(-r, r + 1):
+      dx = math.isqrt(r * r - dy * dy)
+      n += self.paint(x - dx, y + dy, 1, 1, color) + self.paint(x + dx, y + dy, 1, 1, color)
+    self.count('drawCircle', n)
+
+  def fillTriangle(self, x0, y0, x1, y1, x2, y2, color=None):
+    color = self.textColor if color == None else color
+    points = sorted([(y0, x0), (y1, x1), (y2, x2)])
+    n = 0
+    for y in range(points[0][0], points[2][0] + 1):
+      xs = []
+      for (ya, xa), (yb, xb) in ((points[0], points[1]), (points[1], points[2]), (points[0], points[2])):
+        if ya == yb:
+          if y == ya:
+            xs += [xa, xb]
+        elif ya <= y <= yb:
+          xs.append(xa + (xb - xa) * (y - ya) / (yb - ya))
+      if xs:
+        left = int(math.floor(min(xs)))
+        right = int(math.ceil(max(xs)))
+        n += self.paint(left, y, right - left + 1, 1, color)
+    self.count('fillTriangle', n)
+
+  def copyRect(self, dstX, dstY, w, h, srcX, srcY):
+    #LovyanGFX argument order, the pixels are read back and written again
+    self.metrics.kernel.guard()
+    sx, sy, pw, ph = self.toPhysical(srcX, srcY, w, h)
+    dx, dy, pw, ph = self.toPhysical(dstX, dstY, w, h)
+    x0 = max(0, -sx, -dx)
+    y0 = max(0, -sy, -dy)
+    x1 = min(pw, self.physWidth - sx, self.physWidth - dx)
+    y1 = min(ph, self.physHeight - sy, self.physHeight - dy)
+    n = 0
+    if x0 < x1 and y0 < y1:
+      block = [self.rows[sy + y][sx + x0:sx + x1] for y in range(y0, y1)]
+      for i, y in enumerate(range(y0, y1)):
+        self.rows[dy + y][dx + x0:dx + x1] = block[i]
+      self.covered(dx + x0, dy + y0, dx + x1, dy + y1)
+      n = (x1 - x0) * (y1 - y0)
+    self.count('copyRect', 2 * n)
+
+  # text ----
+
+  def setFont(self, font):
+    self.font = font
+
+  def setTextSize(self, size):
+    self.textSize = size
+
+  def setTextColor(self, color, background=None):
+    self.textColor = color
+    self.textBackground = background
+
+  def fontHeight(self, font=None):
+    font = self.font if font == None else font
+    self.metrics.add(self.prefix + 'measure')
+    return int(font.height * self.textSize)
+
+  def textWidth(self, msg, font=None):
+    font = self.font if font == None else font
+    self.metrics.add(self.prefix + 'measure')
+    return self.measure(msg, font)
+
+  def measure(self, msg, font):
+    return sum(glyphWidth(ch, font.height * self.textSize) for ch in msg)
+
+  def drawString(self, msg, x, y, font=None):
+    font = self.font if font == None else font
+    h = int(font.height * self.textSize)
+    w = self.measure(msg, font)
+    n = 0
+    if self.textBackground != None:
+      n += self.paint(x, y, w, h, self.textBackground)
+    cx = x
+    for ch in msg:
+      gw = glyphWidth(ch, font.height * self.textSize)
+      if ch != ' ':
+        ink = glyphInk(ch)
+        cw = max(gw // 6, 1)
+        ch_ = max(h // 8, 1)
+        for r in range(7):
+          for c in range(5):
+            if ink[r][c]:
+              n += self.paint(cx + cw // 2 + c * cw, y + ch_ // 2 + r * ch_, cw, ch_, self.textColor)
+      cx += gw
+    px, py, pw, ph = self.toPhysical(x, y, w, h)
+    self.covered(px, py, px + pw, py + ph)
+    self.texts.append(TextItem(msg, px, py, pw, ph, font, self.textColor, self.textBackground))
+    self.count('drawString', w * h if self.textBackground != None else n)
+    return w
+
+  def drawCenterString(self, msg, x, y, font=None):
+    font = self.font if font == None else font
+    return self.drawString(msg, x - self.measure(msg, font) // 2, y, font)
+
+  # inspection ----
+
+  def text(self):
+    #visible strings, top to bottom and left to right, strings drawn right next to each
+    #other on one line (like the clock's single characters) are joined
+    texts = []
+    last = None
+    #upside down the characters of a string follow each other from right to left
+    reverse = (self.rotation - self.native) % 4 == 2
+    for t in sorted(self.texts, key=lambda t: (t.y, t.x)):
+      if last != None and t.y == last.y and t.x == last.x + last.w:
+        texts[-1] = t.msg + texts[-1] if reverse else texts[-1] + t.msg
+      else:
+        texts.append(t.msg)
+      last = t
+    return texts
+
+  def snapshot(self):
+    return b''.join(row.tobytes() for row in self.rows)
+
+  def savePng(self, path):
+    raw = b''.join(b'\x00' + bytes(b for c in row for b in ((c >> 16) & 0xFF, (c >> 8) & 0xFF, c & 0xFF)) for row in self.rows)
+    def chunk(kind, data):
+      return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    with io.open(path, 'wb') as f:
+      f.write(b'\x89PNG\r\n\x1a\n')
+      f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', self.physWidth, self.physHeight, 8, 2, 0, 0, 0)))
+      f.write(chunk(b'IDAT', zlib.compress(raw)))
+      f.write(chunk(b'IEND', b''))
+
+class Canvas(Surface):
+  #off-screen sprite as returned by Display.newCanvas, drawn in RAM and pushed in one transfer
+
+  def __init__(self, display, width, height, bpp, psram):
+    Surface.__init__(self, display.metrics, width, height, 'canvas.', 0, CANVAS_COST)
+    self.display = display
+    self.bpp = bpp
+    self.psram = psram
+    display.metrics.add('canvas.bytes', width * height * bpp // 8)
+
+  def push(self, x, y):
+    d = self.display
+    d.metrics.kernel.guard()
+    px, py, pw, ph = d.toPhysical(x, y, self.physWidth, self.physHeight)
+    r = (d.rotation - d.native) % 4
+    n = 0
+    for cy in range(self.physHeight):
+      row = self.rows[cy]
+      if r == 0 or r == 2:
+        target = py + cy if r == 0 else py + ph - 1 - cy
+        if 0 <= target < d.physHeight:
+          span = row if r == 0 else array('I', reversed(row))
+          x0 = max(px, 0)
+          x1 = min(px + pw, d.physWidth)
+          if x0 < x1:
+            d.rows[target][x0:x1] = span[x0 - px:x1 - px]
+            n += x1 - x0
+      else:
+        for cx in range(self.physWidth):
+          tx, ty, tw, th = d.toPhysical(x + cx, y + cy, 1, 1)
+          if 0 <= tx < d.physWidth and 0 <= ty < d.physHeight:
+            d.rows[ty][tx] = row[cx]
+            n += 1
+    d.covered(max(px, 0), max(py, 0), min(px + pw, d.physWidth), min(py + ph, d.physHeight))
+    for t in self.texts:
+      tx, ty, tw, th = d.toPhysical(x + t.x, y + t.y, t.w, t.h)
+      d.texts.append(TextItem(t.msg, tx, ty, tw, th, t.font, t.color, t.background))
+    d.count('push', n)
+
+  def delete(self):
+    self.rows = []
+
+class Display(Surface):
+
+  FONTS = Fonts
+  COLOR = Colors
+
+  def __init__(self, metrics):
+    Surface.__init__(self, metrics, WIDTH, HEIGHT, 'lcd.', 1, PANEL_COST)
+    self.brightness = 0
+    self.sleeping = False
+    self.panelState = 'off'
+    self.panelSince = 0.0
+    self.panelSeconds = {} #seconds per backlight level, 'sleep' while the panel sleeps
+
+  def newCanvas(self, w=0, h=0, bpp=16, psram=False):
+    self.metrics.kernel.guard()
+    return Canvas(self, w or self.width(), h or self.height(), bpp, psram)
+
+  def setBrightness(self, brightness):
+    self.brightness = brightness
+    self.metrics.add('lcd.brightness')
+    self.updatePanel()
+
+  def getBrightness(self):
+    return self.brightness
+
+  def sleep(self):
+    self.sleeping = True
+    self.metrics.add('lcd.sleep')
+    self.updatePanel()
+
+  def wakeup(self):
+    self.sleeping = False
+    self.updatePanel()
+
+  def updatePanel(self):
+    now = self.metrics.kernel.now
+    self.panelSeconds[self.panelState] = self.panelSeconds.get(self.panelState, 0) + now - self.panelSince
+    self.panelState = 'sleep' if self.sleeping else self.brightness
+    self.panelSince = now
+
+  def panelTotals(self):
+    self.updatePanel()
+    return dict(self.panelSeconds)
@@ -0,0 +1,130 @@
+#Runs main.py on the simulated Core2 for a given virtual time and prints a report
+#
+#  python -m sim.run --hours 2
+#  python -m sim.run --hours 0.5 --dump screen.png --log app.log
+
+import argparse
+import io
+import json
+import sys
+
+from sim.device import Simulation
+
+def average(cycles, name):
+  if len(cycles) == 0:
+    return 0
+  return sum(c['counters'].get(name, 0) for c in cycles) / len(cycles)
+
+def summary(sim):
+  kernel = sim.kernel
+  metrics = kernel.metrics
+  hours = kernel.now / 3600
+  minutes = max(kernel.now / 60, 1e-9)
+  #the first cycle includes boot and the last one may be cut short by the end of the run
+  cycles = metrics.cycles[1:-1] if len(metrics.cycles) > 2 else metrics.cycles
+  timers = {k[6:]: v / minutes for k, v in metrics.total.items() if k.startswith('timer.') and k != 'timer.fires'}
+  tasks = {k[5:]: v / minutes for k, v in metrics.total.items() if k.startswith('task.')}
+  return {
+    'virtualHours': hours,
+    'readings': metrics.get('readings'),
+    'resets': kernel.resets,
+    'errors': [(round(t, 1), name, repr(e)) for (t, name, e) in kernel.errors],
+    'cycle': {
+      'count': len(cycles),
+      'cpuMs': average(cycles, 'cpu') * 1000,
+      'lcdCalls': average(cycles, 'lcd.calls'),
+      'lcdPixels': average(cycles, 'lcd.pixels'),
+      'lcdMeasure': average(cycles, 'lcd.measure'),
+      'lcdUs': average(cycles, 'lcd.us'),
+      'canvasCalls': average(cycles, 'canvas.calls'),
+      'canvasUs': average(cycles, 'canvas.us'),
+      'flashWrites': average(cycles, 'flash.writes'),
+      'flashBytes': average(cycles, 'flash.bytesWritten'),
+      'netBytesIn': average(cycles, 'net.bytesIn'),
+      'handshakes': average(cycles, 'net.handshakes'),
+      'resumed': average(cycles, 'net.resumed'),
+      'wakeups': average(cycles, 'wakeups') + average(cycles, 'timer.fires')
+    },
+    'wakeupsPerMinute': {
+      'threads': metrics.get('wakeups') / minutes,
+      'timers': metrics.get('timer.fires') / minutes,
+      'byTimer': timers,
+      'byTask': tasks
+    },
+    'threads': {a.name: {'wakeups': a.wakeups, 'cpuMs': a.cpu * 1000} for a in kernel.actors},
+    'radioSecondsPerHour': {k: v / max(hours, 1e-9) for k, v in sim.radio.items()},
+    'backlightSecondsPerHour': {k: v / max(hours, 1e-9) for k, v in sim.panel.items() if v > 0},
+    'cpuMhzSecondsPerHour': {k // 1000000: v / max(hours, 1e-9) for k, v in sim.cpuFreqSeconds.items() if v > 0},
+    'hostCpuSeconds': kernel.cpu,
+    'screen': sim.display.text()
+  }
+
+def printSummary(s, out):
+  c = s['cycle']
+  print('Simulated %.2f h: %d readings, %d resets, %d thread errors' % (s['virtualHours'], s['readings'], s['resets'], len(s['errors'])), file=out)
+  for error in s['errors']:
+    print('  error at %ss in %s: %s' % error, file=out)
+  print('Per reading cycle (avg of %d):' % c['count'], file=out)
+  print('  host cpu   %8.2f ms' % c['cpuMs'], file=out)
+  print('  lcd        %8.1f calls %10.0f px %6.1f measures %8.0f us' % (c['lcdCalls'], c['lcdPixels'], c['lcdMeasure'], c['lcdUs']), file=out)
+  print('  canvas     %8.1f calls %28.0f us' % (c['canvasCalls'], c['canvasUs']), file=out)
+  print('  flash      %8.1f writes %9.0f bytes' % (c['flashWrites'], c['flashBytes']), file=out)
+  print('  network    %8.0f bytes in %6.2f handshakes %6.2f resumed' % (c['netBytesIn'], c['handshakes'], c['resumed']), file=out)
+  print('  wakeups    %8.1f' % c['wakeups'], file=out)
+  w = s['wakeupsPerMinute']
+  print('Wakeups per minute: threads %.1f, timers %.1f %s' % (w['threads'], w['timers'], {k: round(v, 1) for k, v in w['byTimer'].items()}), file=out)
+  print('Task steps per minute: ' + str({k: round(v, 1) for k, v in sorted(w['byTask'].items())}), file=out)
+  print('Radio seconds per hour: ' + str({k: round(v) for k, v in s['radioSecondsPerHour'].items()}), file=out)
+  print('Backlight seconds per hour: ' + str({k: round(v) for k, v in s['backlightSecondsPerHour'].items()}), file=out)
+  print('CPU MHz seconds per hour: ' + str({k: round(v) for k, v in s['cpuMhzSecondsPerHour'].items()}), file=out)
+  print('Host cpu: %.2f s' % s['hostCpuSeconds'], file=out)
+  print('Screen: ' + str(s['screen']), file=out)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Run main.py on a simulated M5Stack Core2')
+  parser.add_argument('--app', default='main.py')
+  parser.add_argument('--hours', type=float, default=1)
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--flash', help='flash directory to keep between runs')
+  parser.add_argument('--log', help='file for the application output')
+  parser.add_argument('--dump', help='write the final framebuffer as a PNG image')
+  parser.add_argument('--flip', action='store_true', help='device upside down')
+  parser.add_argument('--no-env', action='store_true', help='no ENV unit attached')
+  parser.add_argument('--no-rgb', action='store_true', help='no RGB unit attached')
+  parser.add_argument('--battery', type=int, help='battery level, implies running unplugged')
+  parser.add_argument('--json', action='store_true', help='print the report as json')
+  parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', help='config.json override, value parsed as json')
+  args = parser.parse_args(argv)
+
+  config = {}
+  for item in args.set:
+    key, value = item.split('=', 1)
+    try:
+      config[key] = json.loads(value)
+    except ValueError:
+      config[key] = value
+
+  log = io.open(args.log, 'w') if args.log else io.open('/dev/null', 'w')
+  sim = Simulation(app=args.app, seed=args.seed, flash=args.flash, config=config, log=log)
+  world = sim.world
+  world.envUnit = not args.no_env
+  world.rgbUnit = not args.no_rgb
+  if args.flip:
+    world.accel = (0.0, -1.0, 0.0)
+  if args.battery != None:
+    world.batteryLevel = args.battery
+    world.charging = False
+  with sim:
+    sim.run(args.hours * 3600)
+  log.close()
+  if args.dump:
+    sim.display.savePng(args.dump)
+  s = summary(sim)
+  if args.json:
+    json.dump(s, sys.stdout, indent=2)
+    print()
+  else:
+    printSummary(s, sys.stdout)
+
+if __name__ == '__main__':
+  main()
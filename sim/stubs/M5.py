@@ -0,0 +1,144 @@
+#UiFlow2 M5 module stand-in: display, power, IMU, touch panel and buttons
+
+from sim import device
+
+_sim = device.current
+_kernel = _sim.kernel
+_world = _sim.world
+
+Display = _sim.display
+Lcd = Display
+
+class _Power:
+
+  def getBatteryLevel(self):
+    _kernel.guard()
+    return int(_world.batteryLevel)
+
+  def getBatteryVoltage(self):
+    return int(3300 + 9 * _world.batteryLevel)
+
+  def isCharging(self):
+    return _world.charging
+
+  def setVibration(self, level):
+    _kernel.guard()
+    _world.output('vibration', level)
+
+  def setLed(self, level):
+    _kernel.guard()
+    _world.output('led', level)
+
+Power = _Power()
+
+class _Imu:
+
+  def getAccel(self):
+    _kernel.guard()
+    _kernel.metrics.add('imu.reads')
+    return _world.accel
+
+  def getGyro(self):
+    return (0.0, 0.0, 0.0)
+
+Imu = _Imu()
+
+class _Touch:
+
+  def __init__(self):
+    self.current = None
+    self.last = None
+    self.pressed = False
+
+  def poll(self):
+    self.current = _world.activeTouch()
+    self.pressed = self.current != None and self.current is not self.last
+    if self.current != None:
+      self.last = self.current
+
+  def getCount(self):
+    return 0 if self.current == None else 1
+
+  def getDetail(self, index=0):
+    #x, y, prev_x, prev_y, wasPressed, isPressed, isHolding, wasReleased, wasClicked
+    if self.current == None:
+      return (-1, -1, -1, -1, False, False, False, False, False)
+    x, y = self.current[2], self.current[3]
+    return (x, y, x, y, self.pressed, True, False, False, False)
+
+  def getX(self):
+    return -1 if self.current == None else self.current[2]
+
+  def getY(self):
+    return -1 if self.current == None else self.current[3]
+
+Touch = _Touch()
+
+class _CbType:
+  WAS_CLICKED = 0
+  WAS_DOUBLECLICKED = 1
+  WAS_HOLD = 2
+  WAS_PRESSED = 3
+  WAS_RELEASED = 4
+
+class _Button:
+  CB_TYPE = _CbType
+
+  def __init__(self, name):
+    self.name = name
+    self.callbacks = {}
+    self.pressed = False
+
+  def setCallback(self, type=_CbType.WAS_PRESSED, cb=None):
+    self.callbacks[type] = cb
+
+  def wasPressed(self):
+    pressed = self.pressed
+    self.pressed = False
+    return pressed
+
+  def isPressed(self):
+    return False
+
+BtnA = _Button('A')
+BtnB = _Button('B')
+BtnC = _Button('C')
+_buttons = {'A': BtnA, 'B': BtnB, 'C': BtnC}
+_delivered = [0]
+
+class _Widgets:
+
+  def setBrightness(self, brightness):
+    _kernel.guard()
+    Display.setBrightness(brightness)
+
+  def fillScreen(self, color):
+    Display.fillScreen(color)
+
+Widgets = _Widgets()
+
+def begin():
+  Display.setRotation(1)
+  Display.clear(0)
+  Display.setBrightness(64)
+
+def update():
+  #button callbacks are dispatched from here, like in UiFlow2
+  _kernel.guard()
+  _kernel.metrics.add('m5.update')
+  Touch.poll()
+  presses = _world.presses
+  while _delivered[0] < len(presses) and presses[_delivered[0]][0] <= _kernel.now:
+    button = _buttons[presses[_delivered[0]][1]]
+    _delivered[0] += 1
+    button.pressed = True
+    cb = button.callbacks.get(_CbType.WAS_PRESSED)
+    if cb != None:
+      cb(True)
+
+def _reset():
+  for button in _buttons.values():
+    button.callbacks.clear()
+  Touch.current = None
+
+_kernel.resetHooks.append(_reset)
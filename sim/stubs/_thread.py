@@ -0,0 +1,70 @@
+#_thread stand-in, threads are scheduled cooperatively by the simulator kernel
+
+from sim import device
+
+_kernel = device.current.kernel
+
+error = RuntimeError
+
+class LockType:
+
+  def __init__(self):
+    self.held = False
+    self.waiters = []
+
+  def acquire(self, waitflag=1, timeout=-1):
+    _kernel.guard()
+    if not self.held:
+      self.held = True
+      return True
+    if not waitflag:
+      return False
+    if _kernel.current() == None:
+      raise RuntimeError('Lock held while acquired from a timer callback')
+    _kernel.metrics.add('lock.contended')
+    deadline = None if timeout < 0 else _kernel.now + timeout
+    while self.held:
+      waiter = _kernel.waiter()
+      self.waiters.append(waiter)
+      try:
+        if not _kernel.wait(waiter, None if deadline == None else deadline - _kernel.now):
+          return False
+      finally:
+        if waiter in self.waiters:
+          self.waiters.remove(waiter)
+    self.held = True
+    return True
+
+  def release(self):
+    if not self.held:
+      raise RuntimeError('release unlocked lock')
+    self.held = False
+    if self.waiters:
+      _kernel.notify(self.waiters.pop(0))
+
+  def locked(self):
+    return self.held
+
+  def __enter__(self):
+    self.acquire()
+    return self
+
+  def __exit__(self, *args):
+    self.release()
+
+def allocate_lock():
+  return LockType()
+
+def start_new_thread(function, args, kwargs=None):
+  _kernel.guard()
+  return _kernel.spawn(getattr(function, '__name__', 'thread'), function, args, kwargs).ident
+
+def get_ident():
+  actor = _kernel.current()
+  return 0 if actor == None else actor.ident
+
+def stack_size(size=0):
+  return 4096
+
+def exit():
+  raise SystemExit
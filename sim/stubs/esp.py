@@ -0,0 +1,5 @@
+def osdebug(level):
+  pass
+
+def flash_size():
+  return 16 * 1024 * 1024
@@ -0,0 +1,60 @@
+#UiFlow2 hardware module stand-in: watchdog, I2C bus and pins
+
+from sim import device
+
+_sim = device.current
+_kernel = _sim.kernel
+_watchdog = None
+
+class WDT:
+
+  def __init__(self, id=0, timeout=5000):
+    global _watchdog
+    if _watchdog != None:
+      _watchdog.event.cancel()
+    _watchdog = self
+    self.timeout = timeout / 1000
+    self.event = None
+    self.feed()
+
+  def feed(self):
+    if self.event != None:
+      self.event.cancel()
+    self.event = _kernel.after(self.timeout, lambda: _kernel.reset('wdt'))
+
+class I2C:
+
+  def __init__(self, id=0, scl=None, sda=None, freq=400000):
+    self.id = id
+    self.freq = freq
+
+  def scan(self):
+    _kernel.metrics.add('i2c.scans')
+    return [0x44, 0x70] if _sim.world.envUnit else []
+
+class Pin:
+  IN = 1
+  OUT = 3
+  PULL_UP = 1
+  PULL_DOWN = 2
+  IRQ_RISING = 1
+  IRQ_FALLING = 2
+
+  def __init__(self, id, mode=-1, pull=-1, value=None):
+    self.id = id
+    self.level = value or 0
+
+  def value(self, level=None):
+    if level == None:
+      return self.level
+    self.level = level
+
+  def irq(self, handler=None, trigger=IRQ_FALLING):
+    _sim.pinIrqs[self.id] = (self, handler)
+
+def _reset():
+  global _watchdog
+  _watchdog = None
+  _sim.pinIrqs.clear()
+
+_kernel.resetHooks.append(_reset)
@@ -0,0 +1,99 @@
+#machine stand-in: soft timers on the virtual clock, reset, RTC and CPU frequency
+
+from sim import device
+
+_sim = device.current
+_kernel = _sim.kernel
+_timers = {}
+
+PWRON_RESET = 1
+HARD_RESET = 2
+WDT_RESET = 3
+DEEPSLEEP_RESET = 4
+SOFT_RESET = 5
+
+_CAUSES = {'power_on': PWRON_RESET, 'hard': HARD_RESET, 'wdt': WDT_RESET, 'deepsleep': DEEPSLEEP_RESET, 'soft': SOFT_RESET}
+
+class Timer:
+  ONE_SHOT = 0
+  PERIODIC = 1
+
+  def __init__(self, id=-1, **kwargs):
+    self.id = id
+    self.event = None
+    self.callback = None
+    if kwargs:
+      self.init(**kwargs)
+
+  def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+    self.deinit()
+    previous = _timers.get(self.id)
+    if previous != None and previous is not self:
+      previous.deinit()
+    _timers[self.id] = self
+    if freq > 0:
+      period = 1000 / freq
+    self.mode = mode
+    self.period = max(period, 1) / 1000
+    self.callback = callback
+    self.event = _kernel.after(self.period, self.fire)
+
+  def fire(self):
+    if self.mode == Timer.PERIODIC:
+      self.event = _kernel.after(self.period, self.fire)
+    else:
+      self.event = None
+    _kernel.metrics.add('timer.fires')
+    _kernel.metrics.add('timer.' + str(self.id))
+    if self.callback != None:
+      self.callback(self)
+
+  def deinit(self):
+    if self.event != None:
+      self.event.cancel()
+      self.event = None
+
+class RTC:
+
+  def datetime(self, datetimetuple=None):
+    utime = device.load('utime')
+    if datetimetuple == None:
+      t = utime.localtime()
+      return (t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0)
+    t = datetimetuple
+    _kernel.setRtc(utime.mktime((t[0], t[1], t[2], t[4], t[5], t[6], 0, 0)) + t[7] / 1000000)
+
+  def init(self, datetimetuple):
+    self.datetime(datetimetuple)
+
+def reset():
+  _kernel.reset('soft')
+  _kernel.guard()
+
+def soft_reset():
+  reset()
+
+def reset_cause():
+  return _CAUSES.get(_kernel.resetCause, PWRON_RESET)
+
+def freq(hz=None):
+  if hz == None:
+    return _sim.cpuFreq
+  _sim.setCpuFreq(hz)
+
+def idle():
+  _kernel.sleep(0)
+
+def lightsleep(ms=None):
+  _kernel.metrics.add('machine.lightsleep')
+  _kernel.sleep((ms or 0) / 1000)
+
+def unique_id():
+  return b'\x24\x0a\xc4\x00\x00\x01'
+
+def _reset():
+  for timer in list(_timers.values()):
+    timer.deinit()
+  _timers.clear()
+
+_kernel.resetHooks.append(_reset)
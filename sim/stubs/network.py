@@ -0,0 +1,161 @@
+#network stand-in: a station interface associating with the access points of the world
+
+from sim import device
+
+_sim = device.current
+_kernel = _sim.kernel
+_interfaces = {}
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+STAT_NO_AP_FOUND = 201
+STAT_WRONG_PASSWORD = 202
+STAT_BEACON_TIMEOUT = 200
+STAT_ASSOC_FAIL = 203
+STAT_HANDSHAKE_TIMEOUT = 204
+
+AUTH_OPEN = 0
+AUTH_WPA2_PSK = 3
+
+class WLAN:
+  PM_NONE = 0
+  PM_PERFORMANCE = 1
+  PM_POWERSAVE = 2
+
+  def __new__(cls, interface=STA_IF):
+    if interface not in _interfaces:
+      wlan = object.__new__(cls)
+      wlan.interface = interface
+      wlan.isActive = False
+      wlan.state = STAT_IDLE
+      wlan.ap = None
+      wlan.event = None
+      wlan.settings = {'pm': WLAN.PM_PERFORMANCE, 'essid': '', 'channel': 1, 'mac': b'\x24\x0a\xc4\x00\x00\x01', 'txpower': 20, 'reconnects': -1}
+      _interfaces[interface] = wlan
+    return _interfaces[interface]
+
+  def __init__(self, interface=STA_IF):
+    pass
+
+  def update(self):
+    if self.interface == STA_IF:
+      world = _sim.world
+      world.wifiActive = self.isActive
+      world.wifiConnected = self.state == STAT_GOT_IP
+      world.wifiPm = self.settings['pm']
+      world.updateRadio()
+
+  def active(self, isActive=None):
+    if isActive == None:
+      return self.isActive
+    _kernel.guard()
+    self.isActive = bool(isActive)
+    if not self.isActive:
+      self.disconnect()
+    self.update()
+    return self.isActive
+
+  def scan(self):
+    _kernel.guard()
+    if not self.isActive:
+      raise OSError('Wifi Not Started')
+    _kernel.metrics.add('wifi.scans')
+    world = _sim.world
+    world.busy += 1
+    world.updateRadio()
+    try:
+      _kernel.sleep(world.scanSeconds)
+    finally:
+      world.busy -= 1
+      world.updateRadio()
+    return [(ap.ssid.encode(), ap.bssid, ap.channel, ap.rssi, AUTH_WPA2_PSK, False) for ap in world.accessPoints]
+
+  def connect(self, ssid=None, key=None, *, bssid=None):
+    _kernel.guard()
+    if not self.isActive:
+      raise OSError('Wifi Not Started')
+    world = _sim.world
+    _kernel.metrics.add('wifi.connects')
+    if self.event != None:
+      self.event.cancel()
+      world.busy -= 1
+    self.state = STAT_CONNECTING
+    self.ap = None
+    candidates = [ap for ap in world.accessPoints if ap.ssid == ssid and (bssid == None or ap.bssid == bssid)]
+    candidates.sort(key=lambda ap: -ap.rssi)
+    #without a bssid the driver scans all channels before it can associate
+    seconds = world.associateSeconds + (0 if bssid != None else world.scanSeconds * 0.6)
+    if len(candidates) == 0:
+      self.event = _kernel.after(world.scanSeconds * 2, lambda: self.connected(STAT_NO_AP_FOUND, None))
+    elif candidates[0].password != key:
+      self.event = _kernel.after(seconds + 2, lambda: self.connected(STAT_WRONG_PASSWORD, None))
+    else:
+      ap = candidates[0]
+      self.event = _kernel.after(seconds, lambda: self.connected(STAT_GOT_IP, ap))
+    world.busy += 1
+    self.update()
+
+  def connected(self, state, ap):
+    self.event = None
+    self.state = state
+    self.ap = ap
+    if ap != None:
+      self.settings['essid'] = ap.ssid
+      self.settings['channel'] = ap.channel
+    _sim.world.busy -= 1
+    self.update()
+
+  def disconnect(self):
+    if self.event != None:
+      self.event.cancel()
+      self.event = None
+      _sim.world.busy -= 1
+    self.state = STAT_IDLE
+    self.ap = None
+    self.update()
+
+  def isconnected(self):
+    _kernel.guard()
+    return self.state == STAT_GOT_IP
+
+  def status(self, param=None):
+    if param == 'rssi':
+      if self.ap == None:
+        raise OSError('Not connected')
+      return self.ap.rssi
+    return self.state
+
+  def config(self, *args, **kwargs):
+    if args:
+      if args[0] == 'bssid':
+        return self.ap.bssid if self.ap != None else b'\x00' * 6
+      return self.settings[args[0]]
+    for k in kwargs:
+      self.settings[k] = kwargs[k]
+    self.update()
+
+  def ifconfig(self, config=None):
+    if self.interface == AP_IF:
+      return ('192.168.4.1', '255.255.255.0', '192.168.4.1', '0.0.0.0')
+    if self.state != STAT_GOT_IP:
+      return ('0.0.0.0', '0.0.0.0', '0.0.0.0', '0.0.0.0')
+    return ('192.168.1.50', '255.255.255.0', '192.168.1.1', '192.168.1.1')
+
+def _reset():
+  for wlan in _interfaces.values():
+    if wlan.event != None:
+      wlan.event.cancel()
+      wlan.event = None
+    wlan.isActive = False
+    wlan.state = STAT_IDLE
+    wlan.ap = None
+    wlan.update()
+  _interfaces.clear()
+  _sim.world.busy = 0
+  _sim.world.updateRadio()
+
+_kernel.resetHooks.append(_reset)
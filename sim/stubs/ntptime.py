@@ -0,0 +1,22 @@
+#ntptime stand-in, a successful settime() sets the RTC to the world clock
+
+from sim import device
+
+_sim = device.current
+_kernel = _sim.kernel
+
+host = 'pool.ntp.org'
+timeout = 1
+
+def time():
+  _kernel.metrics.add('ntp.requests')
+  world = _sim.world
+  if not world.wifiConnected or not world.ntpReachable or host in world.ntpBlocked:
+    _kernel.sleep(timeout)
+    raise OSError(116, 'ETIMEDOUT')
+  _kernel.sleep(world.ntpLatency)
+  return int(_kernel.world())
+
+def settime():
+  t = time()
+  _kernel.setRtc(t)
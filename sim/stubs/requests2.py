@@ -0,0 +1,105 @@
+#UiFlow2 requests2 stand-in talking to the simulated backend over a modelled TLS link
+
+import json as _json
+from sim import device
+from sim.world import httpDate
+
+_sim = device.current
+_kernel = _sim.kernel
+
+class Raw:
+  #socket-like view of the response body
+
+  def __init__(self, body):
+    self.body = body
+    self.pos = 0
+
+  def read(self, size=-1):
+    if size < 0:
+      size = len(self.body) - self.pos
+    chunk = self.body[self.pos:self.pos + size]
+    self.pos += len(chunk)
+    return chunk
+
+  def readinto(self, buf, size=-1):
+    chunk = self.read(len(buf) if size < 0 else min(size, len(buf)))
+    buf[:len(chunk)] = chunk
+    return len(chunk)
+
+  def readline(self):
+    end = self.body.find(b'\n', self.pos)
+    return self.read(len(self.body) - self.pos if end < 0 else end + 1 - self.pos)
+
+  def close(self):
+    pass
+
+class Response:
+
+  def __init__(self, status, body, headers):
+    self.status_code = status
+    self.reason = b'OK' if status == 200 else b'Error'
+    self.headers = headers
+    self.encoding = 'utf-8'
+    self.raw = Raw(body)
+    self._content = None
+
+  @property
+  def content(self):
+    if self._content == None:
+      self._content = self.raw.read()
+    return self._content
+
+  @property
+  def text(self):
+    return str(self.content, self.encoding)
+
+  def json(self):
+    return _json.loads(self.content)
+
+  def close(self):
+    _kernel.metrics.add('net.closed')
+    self.raw = None
+
+def request(method, url, data=None, json=None, headers=None, stream=None, auth=None, timeout=None, parse_headers=True):
+  _kernel.guard()
+  world = _sim.world
+  headers = headers or {}
+  if not world.wifiConnected:
+    _kernel.sleep(0.01)
+    raise OSError(-202)
+  world.busy += 1
+  world.updateRadio()
+  try:
+    _kernel.metrics.add('net.requests')
+    _kernel.metrics.add('net.handshakes')
+    _kernel.metrics.add('net.handshakeSeconds', world.handshakeSeconds)
+    _kernel.sleep(world.dnsSeconds + world.rttSeconds + world.handshakeSeconds)
+    if world.backend.down(_kernel.now):
+      raise OSError(113, 'EHOSTUNREACH')
+    sent = len(method) + len(url) + 64 + sum(len(k) + len(str(v)) + 4 for k, v in headers.items())
+    if data != None: sent += len(data)
+    if json != None: sent += len(_json.dumps(json))
+    _kernel.sleep(sent / world.bytesPerSecond + world.rttSeconds / 2)
+    status, body = world.backend.serve(_kernel, method, url, headers)
+    _kernel.sleep(len(body) / world.bytesPerSecond + world.rttSeconds / 2)
+    _kernel.metrics.add('net.bytesOut', sent)
+    _kernel.metrics.add('net.bytesIn', len(body))
+    return Response(status, body, {'Date': httpDate(_kernel.world()), 'Content-Type': 'application/json', 'Content-Length': str(len(body))})
+  finally:
+    world.busy -= 1
+    world.updateRadio()
+
+def get(url, **kw):
+  return request('GET', url, **kw)
+
+def post(url, **kw):
+  return request('POST', url, **kw)
+
+def put(url, **kw):
+  return request('PUT', url, **kw)
+
+def delete(url, **kw):
+  return request('DELETE', url, **kw)
+
+def head(url, **kw):
+  return request('HEAD', url, **kw)
@@ -0,0 +1,13 @@
+#on MicroPython time and utime are the same module, anything else falls back to CPython
+
+from sim import device
+from sim.core import _time as _realTime #CPython's time, imported before the stubs
+
+_utime = device.load('utime')
+
+for _name in dir(_utime):
+  if not _name.startswith('_'):
+    globals()[_name] = getattr(_utime, _name)
+
+def __getattr__(name):
+  return getattr(_realTime, name)
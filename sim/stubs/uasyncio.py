@@ -0,0 +1,459 @@
+#uasyncio stand-in: a MicroPython style event loop on the virtual clock
+#
+#Tasks run in the device thread that called run(). When no task is ready the thread
+#parks in the kernel until the next sleeping task is due or an event is set from a timer
+#callback or the simulated network, so every kernel wakeup of that thread is one loop
+#wakeup. open_connection talks HTTP/1.1 with keep-alive to the simulated backend.
+
+import heapq
+from collections import deque
+from sim import device
+from sim.core import DeviceReset, SimulationExit
+from sim.world import httpDate
+
+_sim = device.current
+_kernel = _sim.kernel
+
+ECONNRESET = 104
+EHOSTUNREACH = 113
+
+class CancelledError(BaseException):
+  pass
+
+class TimeoutError(Exception):
+  pass
+
+class _Wait:
+  #awaited by a task to hand a wait request to the loop
+  __slots__ = ('kind', 'arg')
+
+  def __init__(self, kind, arg=None):
+    self.kind = kind
+    self.arg = arg
+
+  def __await__(self):
+    return (yield self)
+
+class Task:
+
+  def __init__(self, coro, loop):
+    self.coro = coro
+    self.loop = loop
+    self.done_ = False
+    self.result = None
+    self.exc = None
+    self.waiting = [] #tasks awaiting this one
+    self.blocker = None #object whose waiting list holds this task
+    self.wakeSeq = 0 #only the sleeper entry with this seq is valid
+
+  def done(self):
+    return self.done_
+
+  def cancel(self):
+    if self.done_:
+      return False
+    self.unblock()
+    self.loop.schedule(self, exc=CancelledError())
+    return True
+
+  def unblock(self):
+    self.wakeSeq = -1
+    if self.blocker != None:
+      if self in self.blocker.waiting: self.blocker.waiting.remove(self)
+      self.blocker = None
+
+  def finish(self, result, exc):
+    self.done_ = True
+    self.result = result
+    self.exc = exc
+    for task in self.waiting:
+      self.loop.schedule(task)
+    if exc != None and len(self.waiting) == 0 and not isinstance(exc, CancelledError):
+      #like MicroPython's default exception handler, but also in the simulation report
+      print('Task exception wasn\'t retrieved')
+      _kernel.crashed(_kernel.current(), exc)
+    self.waiting = []
+
+  def __await__(self):
+    if not self.done_:
+      yield _Wait('wait', self)
+    if self.exc != None:
+      raise self.exc
+    return self.result
+
+class Loop:
+
+  def __init__(self):
+    self.ready = deque()
+    self.sleepers = []
+    self.seq = 0
+    self.waiter = None
+    self.current = None
+
+  def create_task(self, coro):
+    task = Task(coro, self)
+    self.schedule(task)
+    return task
+
+  def schedule(self, task, value=None, exc=None):
+    self.ready.append((task, value, exc))
+    #wakes the parked loop thread when called from a timer callback or the network
+    if self.waiter != None and self.waiter.active:
+      _kernel.notify(self.waiter)
+
+  def step(self, task, value, exc):
+    if task.done_:
+      return
+    task.unblock()
+    self.current = task
+    #task steps by coroutine name, several tasks may share one loop wakeup
+    _kernel.metrics.add('task.' + task.coro.__name__)
+    try:
+      if exc != None: request = task.coro.throw(exc)
+      else: request = task.coro.send(value)
+    except StopIteration as e:
+      task.finish(e.value, None)
+    except (DeviceReset, SimulationExit):
+      raise
+    except BaseException as e:
+      task.finish(None, e)
+    else:
+      self.block(task, request)
+    finally:
+      self.current = None
+
+  def block(self, task, request):
+    if request == None or request.kind == 'yield':
+      self.ready.append((task, None, None))
+    elif request.kind == 'sleep':
+      self.seq += 1
+      task.wakeSeq = self.seq
+      heapq.heappush(self.sleepers, (request.arg, self.seq, task))
+    else:
+      #an event, lock or task with a waiting list
+      request.arg.waiting.append(task)
+      task.blocker = request.arg
+
+  def runOnce(self):
+    while len(self.sleepers) > 0 and self.sleepers[0][0] <= _kernel.now:
+      until, seq, task = heapq.heappop(self.sleepers)
+      if task.wakeSeq == seq:
+        task.wakeSeq = 0
+        self.ready.append((task, None, None))
+    if len(self.ready) > 0:
+      #tasks made ready meanwhile run in the next round, after due sleepers
+      for i in range(len(self.ready)):
+        task, value, exc = self.ready.popleft()
+        self.step(task, value, exc)
+      _kernel.guard()
+      return
+    while len(self.sleepers) > 0 and self.sleepers[0][2].wakeSeq != self.sleepers[0][1]:
+      heapq.heappop(self.sleepers)
+    timeout = self.sleepers[0][0] - _kernel.now if len(self.sleepers) > 0 else None
+    self.waiter = _kernel.waiter()
+    try:
+      _kernel.wait(self.waiter, timeout)
+    finally:
+      self.waiter = None
+
+  def run_until_complete(self, main):
+    task = main if isinstance(main, Task) else self.create_task(main)
+    while not task.done_:
+      self.runOnce()
+    if task.exc != None:
+      raise task.exc
+    return task.result
+
+  def run_forever(self):
+    while True:
+      self.runOnce()
+
+  def close(self):
+    pass
+
+_loop = Loop()
+
+def get_event_loop():
+  return _loop
+
+def new_event_loop():
+  global _loop
+  _loop = Loop()
+  return _loop
+
+def create_task(coro):
+  return _loop.create_task(coro)
+
+def current_task():
+  return _loop.current
+
+def run(coro):
+  return new_event_loop().run_until_complete(coro)
+
+async def sleep(seconds):
+  if seconds <= 0:
+    await _Wait('yield')
+  else:
+    await _Wait('sleep', _kernel.now + seconds)
+
+async def sleep_ms(ms):
+  await sleep(ms / 1000)
+
+class Event:
+
+  def __init__(self):
+    self.state = False
+    self.waiting = []
+
+  def is_set(self):
+    return self.state
+
+  def set(self):
+    self.state = True
+    for task in self.waiting:
+      task.blocker = None
+      _loop.schedule(task)
+    self.waiting = []
+
+  def clear(self):
+    self.state = False
+
+  async def wait(self):
+    if not self.state:
+      await _Wait('wait', self)
+    return True
+
+class ThreadSafeFlag(Event):
+  #set from timer callbacks, wait clears it
+
+  async def wait(self):
+    if not self.state:
+      await _Wait('wait', self)
+    self.state = False
+
+class Lock:
+
+  def __init__(self):
+    self.state = False
+    self.waiting = []
+
+  def locked(self):
+    return self.state
+
+  async def acquire(self):
+    while self.state:
+      await _Wait('wait', self)
+    self.state = True
+    return True
+
+  def release(self):
+    if not self.state:
+      raise RuntimeError('Lock not acquired')
+    self.state = False
+    if len(self.waiting) > 0:
+      task = self.waiting.pop(0)
+      task.blocker = None
+      _loop.schedule(task)
+
+  async def __aenter__(self):
+    return await self.acquire()
+
+  async def __aexit__(self, *args):
+    self.release()
+
+async def _cancelAfter(task, seconds, expired):
+  await sleep(seconds)
+  expired.append(True)
+  task.cancel()
+
+async def wait_for(aw, timeout):
+  task = aw if isinstance(aw, Task) else create_task(aw)
+  if timeout == None:
+    return await task
+  expired = []
+  canceller = create_task(_cancelAfter(task, timeout, expired))
+  try:
+    return await task
+  except CancelledError:
+    if len(expired) > 0:
+      raise TimeoutError()
+    task.cancel()
+    raise
+  finally:
+    canceller.cancel()
+
+def wait_for_ms(aw, timeout):
+  return wait_for(aw, timeout / 1000)
+
+async def gather(*aws, return_exceptions=False):
+  tasks = [aw if isinstance(aw, Task) else create_task(aw) for aw in aws]
+  results = []
+  for task in tasks:
+    try:
+      results.append(await task)
+    except Exception as e:
+      if not return_exceptions:
+        raise
+      results.append(e)
+  return results
+
+# network ----
+
+class Stream:
+  #client end of a connection to the simulated backend, which answers HTTP/1.1 with
+  #keep-alive and closes connections idle for longer than world.keepAliveSeconds
+
+  def __init__(self, host, s=None):
+    self.host = host
+    self.s = s #the ssl socket of a TLS connection
+    self.inbuf = b''
+    self.outbuf = b''
+    self.closed = False
+    self.eof = False
+    self.pending = False
+    self.lastActive = _kernel.now
+    self.event = Event()
+
+  def get_extra_info(self, name):
+    return None
+
+  def idle(self):
+    if not self.eof and not self.pending and _kernel.now - self.lastActive > _sim.world.keepAliveSeconds:
+      self.eof = True
+    return self.eof
+
+  def write(self, data):
+    _kernel.guard()
+    if self.closed:
+      raise OSError(ECONNRESET)
+    if self.idle():
+      #the request goes out, the answer is the FIN the server sent earlier
+      return
+    data = bytes(data)
+    _kernel.metrics.add('net.bytesOut', len(data))
+    self.outbuf += data
+    end = self.outbuf.find(b'\r\n\r\n')
+    if end >= 0:
+      request = self.outbuf[:end]
+      self.outbuf = self.outbuf[end + 4:]
+      self.exchange(request, len(data))
+
+  async def drain(self):
+    pass
+
+  def exchange(self, request, sent):
+    world = _sim.world
+    lines = str(request, 'ascii').split('\r\n')
+    method, path = lines[0].split(' ')[:2]
+    headers = {}
+    for line in lines[1:]:
+      k, v = line.split(':', 1)
+      headers[k.strip().lower()] = v.strip()
+    url = 'https://' + self.host + path
+    self.pending = True
+    world.busy += 1
+    world.updateRadio()
+    _kernel.metrics.add('net.requests')
+    _kernel.after(sent / world.bytesPerSecond + world.rttSeconds / 2, lambda: self.hold(method, url, headers))
+
+  def hold(self, method, url, headers):
+    world = _sim.world
+    if not world.wifiConnected or world.backend.down(_kernel.now):
+      self.deliver(None)
+      return
+    _kernel.after(world.backend.holdSeconds(_kernel, url), lambda: self.respond(method, url, headers))
+
+  def respond(self, method, url, headers):
+    world = _sim.world
+    status, body = world.backend.answer(_kernel, method, url, headers)
+    head = 'HTTP/1.1 ' + str(status) + (' OK' if status == 200 else ' Error') + '\r\nDate: ' + httpDate(_kernel.world()) + '\r\nContent-Type: application/json\r\nContent-Length: ' + str(len(body)) + '\r\nConnection: keep-alive\r\n\r\n'
+    data = head.encode() + body
+    _kernel.after(len(data) / world.bytesPerSecond + world.rttSeconds / 2, lambda: self.deliver(data))
+
+  def deliver(self, data):
+    #None when the connection broke
+    world = _sim.world
+    self.pending = False
+    world.busy -= 1
+    world.updateRadio()
+    if data == None:
+      self.eof = True
+    else:
+      _kernel.metrics.add('net.bytesIn', len(data))
+      self.inbuf += data
+      self.lastActive = _kernel.now
+    self.event.set()
+
+  async def more(self):
+    #waits for data, False at the end of the stream
+    while len(self.inbuf) == 0:
+      if self.closed:
+        raise OSError(ECONNRESET)
+      if self.idle():
+        return False
+      self.event.clear()
+      await self.event.wait()
+    return True
+
+  async def readline(self):
+    while True:
+      i = self.inbuf.find(b'\n')
+      if i >= 0:
+        line = self.inbuf[:i + 1]
+        self.inbuf = self.inbuf[i + 1:]
+        return line
+      if not await self.more():
+        line = self.inbuf
+        self.inbuf = b''
+        return line
+
+  async def read(self, n=-1):
+    if not await self.more():
+      return b''
+    if n < 0:
+      n = len(self.inbuf)
+    data = self.inbuf[:n]
+    self.inbuf = self.inbuf[len(data):]
+    return data
+
+  def close(self):
+    if not self.closed:
+      _kernel.metrics.add('net.closed')
+    self.closed = True
+
+  async def wait_closed(self):
+    pass
+
+async def open_connection(host, port, ssl=None, server_hostname=None):
+  _kernel.guard()
+  world = _sim.world
+  if not world.wifiConnected:
+    await sleep(0.01)
+    raise OSError(-202)
+  world.busy += 1
+  world.updateRadio()
+  try:
+    #the name lookup of MicroPython's open_connection blocks the loop
+    _kernel.sleep(world.dnsSeconds)
+    await sleep(world.rttSeconds)
+    if world.backend.down(_kernel.now):
+      raise OSError(EHOSTUNREACH)
+    _kernel.metrics.add('net.connects')
+    sock = None
+    if ssl:
+      sock = ssl.wrap_socket(None, server_hostname=server_hostname, do_handshake_on_connect=False)
+      seconds = world.resumeSeconds if sock.session_reused else world.handshakeSeconds
+      _kernel.metrics.add('net.handshakes')
+      if sock.session_reused: _kernel.metrics.add('net.resumed')
+      _kernel.metrics.add('net.handshakeSeconds', seconds)
+      await sleep(seconds)
+  finally:
+    world.busy -= 1
+    world.updateRadio()
+  stream = Stream(host, sock)
+  return stream, stream
+
+def _reset():
+  new_event_loop()
+
+_kernel.resetHooks.append(_reset)
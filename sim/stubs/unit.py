@@ -0,0 +1,45 @@
+#UiFlow2 unit stand-ins for the ENV III and RGB units
+
+from sim import device
+
+_sim = device.current
+_kernel = _sim.kernel
+
+class ENVUnit:
+
+  def __init__(self, i2c=None, type=3):
+    _kernel.sleep(0.02)
+    if not _sim.world.envUnit:
+      raise OSError(19, 'ENODEV')
+
+  def read_temperature(self):
+    _kernel.metrics.add('i2c.reads')
+    return _sim.world.temperature()
+
+  def read_humidity(self):
+    _kernel.metrics.add('i2c.reads')
+    return _sim.world.humidity()
+
+  def read_pressure(self):
+    _kernel.metrics.add('i2c.reads')
+    return _sim.world.pressure()
+
+class RGBUnit:
+
+  def __init__(self, port, number=3):
+    if not _sim.world.rgbUnit:
+      raise OSError(19, 'ENODEV')
+    self.colors = [0] * number
+
+  def set_color(self, index, color):
+    _kernel.guard()
+    if self.colors[index] != color:
+      self.colors[index] = color
+      _sim.world.output('rgb' + str(index), color)
+
+  def fill_color(self, color):
+    for i in range(len(self.colors)):
+      self.set_color(i, color)
+
+  def set_brightness(self, brightness):
+    _sim.world.output('rgb.brightness', brightness)
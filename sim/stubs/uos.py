@@ -0,0 +1,5 @@
+from os import *
+from os import urandom, stat, listdir, remove, rename, mkdir
+
+def uname():
+  return ('esp32', 'm5stack-core2', '1.22.0', 'v1.22.0', 'M5STACK Core2 with ESP32(SPIRAM)')
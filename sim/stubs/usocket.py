@@ -0,0 +1,92 @@
+#usocket stand-in: the listening side used by the configuration portal and UDP
+#datagrams to the ntp servers of the world, answered after the world's ntp latency
+
+import struct
+from sim import device
+
+_sim = device.current
+_kernel = _sim.kernel
+
+AF_INET = 2
+SOCK_STREAM = 1
+SOCK_DGRAM = 2
+SOL_SOCKET = 1
+SO_REUSEADDR = 4
+EAGAIN = 11
+NTP_DELTA = 2208988800 #1900 to 1970
+
+_hosts = {} #fake address to host name
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+  _kernel.guard()
+  world = _sim.world
+  if not world.wifiConnected:
+    raise OSError(-202)
+  _kernel.sleep(world.dnsSeconds)
+  ip = '10.0.%d.%d' % (len(_hosts) // 250, len(_hosts) % 250 + 1)
+  for k in _hosts:
+    if _hosts[k] == host:
+      ip = k
+  _hosts[ip] = host
+  return [(AF_INET, SOCK_DGRAM, 0, '', (ip, port))]
+
+def _ntpAnswer(request):
+  #server mode, stratum 2, transmit timestamp of the world clock
+  t = _kernel.world()
+  seconds = int(t)
+  fraction = int((t - seconds) * 4294967296)
+  return bytes([0x24, 2]) + b'\0' * 38 + struct.pack('!II', seconds + NTP_DELTA, fraction)
+
+class socket:
+
+  def __init__(self, af=AF_INET, type=SOCK_STREAM, proto=0):
+    self.address = None
+    self.type = type
+    self.blocking = True
+    self.received = []
+
+  def setsockopt(self, level, option, value):
+    pass
+
+  def setblocking(self, flag):
+    self.blocking = flag
+
+  def bind(self, address):
+    self.address = address
+
+  def listen(self, backlog=0):
+    pass
+
+  def accept(self):
+    #nobody ever joins the access point of the simulated device
+    _kernel.wait(_kernel.waiter())
+
+  def sendto(self, data, address):
+    _kernel.guard()
+    world = _sim.world
+    if not world.wifiConnected:
+      raise OSError(-202)
+    host = _hosts.get(address[0])
+    if address[1] != 123 or host == None:
+      return len(data)
+    _kernel.metrics.add('ntp.requests')
+    if world.ntpReachable and host not in world.ntpBlocked:
+      latency = world.ntpLatencies.get(host, world.ntpLatency)
+      def serve():
+        #the server stamps its answer halfway through the round trip
+        answer = _ntpAnswer(data)
+        _kernel.after(latency / 2, lambda: self.received.append(answer))
+      _kernel.after(latency / 2, serve)
+    return len(data)
+
+  def recv(self, size):
+    _kernel.guard()
+    if len(self.received) == 0:
+      if not self.blocking:
+        raise OSError(EAGAIN)
+      while len(self.received) == 0:
+        _kernel.sleep(0.01)
+    return self.received.pop(0)[:size]
+
+  def close(self):
+    pass
@@ -0,0 +1,34 @@
+#ussl stand-in following the MicroPython API, only the client context is used: the TLS
+#handshake itself is modelled by uasyncio.open_connection, which wraps its socket here
+
+PROTOCOL_TLS_CLIENT = 0
+PROTOCOL_TLS_SERVER = 1
+CERT_NONE = 0
+CERT_OPTIONAL = 1
+CERT_REQUIRED = 2
+
+class SSLSession:
+
+  def __init__(self, host):
+    self.host = host
+
+class SSLSocket:
+
+  def __init__(self, host, session):
+    self.session_reused = session != None and session.host == host
+    self.session = session if self.session_reused else SSLSession(host)
+
+class SSLContext:
+
+  def __init__(self, protocol=PROTOCOL_TLS_CLIENT):
+    self.protocol = protocol
+    self.verify_mode = CERT_NONE
+
+  def load_verify_locations(self, cafile=None, cadata=None):
+    pass
+
+  def load_cert_chain(self, certfile, keyfile):
+    pass
+
+  def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True, server_hostname=None, session=None):
+    return SSLSocket(server_hostname, session)
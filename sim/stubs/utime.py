@@ -0,0 +1,50 @@
+#utime / time stand-in driven by the virtual clock
+
+import calendar
+import time as _time
+from sim import device
+from sim.core import TICKS_PERIOD
+
+_kernel = device.current.kernel
+
+def time():
+  return int(_kernel.rtc())
+
+def time_ns():
+  return int(_kernel.rtc() * 1000000000)
+
+def localtime(secs=None):
+  #the RTC runs in UTC, like on the device
+  if secs == None:
+    secs = time()
+  t = _time.gmtime(secs)
+  return (t[0], t[1], t[2], t[3], t[4], t[5], t[6], t[7])
+
+gmtime = localtime
+
+def mktime(t):
+  return calendar.timegm((t[0], t[1], 1, 0, 0, 0)) + (t[2] - 1) * 86400 + t[3] * 3600 + t[4] * 60 + t[5]
+
+def sleep(seconds):
+  _kernel.sleep(seconds)
+
+def sleep_ms(ms):
+  _kernel.sleep(ms / 1000)
+
+def sleep_us(us):
+  _kernel.sleep(us / 1000000)
+
+def ticks_ms():
+  return _kernel.ticks(1000)
+
+def ticks_us():
+  return _kernel.ticks(1000000)
+
+ticks_cpu = ticks_us
+
+def ticks_add(ticks, delta):
+  return (ticks + delta) % TICKS_PERIOD
+
+def ticks_diff(ticks1, ticks2):
+  half = TICKS_PERIOD // 2
+  return ((ticks1 - ticks2 + half) % TICKS_PERIOD) - half
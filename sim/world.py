@@ -0,0 +1,258 @@
+#Everything outside of the device: CGM readings served by a Nightscout style backend,
+#Wi-Fi access points, NTP, the battery and the sensors, plus scripted user input
+
+import json
+import math
+import random
+import time as _time
+from urllib.parse import urlsplit, parse_qs
+
+READING_INTERVAL = 300
+
+def direction(rate):
+  #rate of change in mg/dL per minute, same buckets as Nightscout
+  if rate > 3: return 'DoubleUp'
+  if rate > 2: return 'SingleUp'
+  if rate > 1: return 'FortyFiveUp'
+  if rate >= -1: return 'Flat'
+  if rate >= -2: return 'FortyFiveDown'
+  if rate >= -3: return 'SingleDown'
+  return 'DoubleDown'
+
+def isoDate(seconds):
+  t = _time.gmtime(seconds)
+  return '%04d-%02d-%02dT%02d:%02d:%02d' % (t[0], t[1], t[2], t[3], t[4], t[5])
+
+def httpDate(seconds):
+  return _time.strftime('%a, %d %b %Y %H:%M:%S GMT', _time.gmtime(seconds))
+
+def tzSeconds(tz):
+  #'GMT+02:00' -> 7200
+  if tz == None or len(tz) < 5:
+    return 0
+  [HH, MM] = [int(i) for i in tz[4:].split(':')]
+  seconds = HH * 3600 + MM * 60
+  return -seconds if tz[3] == '-' else seconds
+
+class Glucose:
+  #a CGM sensor producing a reading every ~5 minutes from a smooth random walk
+
+  def __init__(self, world, history=24 * 3600, profile=None):
+    self.world = world
+    self.rng = random.Random(world.seed)
+    self.readings = []
+    self.profile = profile if profile != None else self.defaultProfile
+    self.phase = self.rng.uniform(0, 2 * math.pi)
+    t = world.epoch - history + self.rng.uniform(0, READING_INTERVAL)
+    self.nextTime = t
+    self.nextId = 1000
+    self.ensure(world.epoch)
+
+  def defaultProfile(self, t):
+    return 140 + 60 * math.sin(2 * math.pi * t / 12600 + self.phase) + 25 * math.sin(2 * math.pi * t / 2820)
+
+  def ensure(self, until):
+    while self.nextTime <= until:
+      t = self.nextTime
+      sgv = int(min(400, max(40, self.profile(t) + self.rng.gauss(0, 2))))
+      delta = sgv - self.readings[-1]['sgv'] if self.readings else 0
+      self.readings.append({'id': self.nextId, 'time': int(t), 'sgv': sgv, 'delta': delta, 'direction': direction(delta / 5)})
+      self.nextId += 1
+      self.nextTime = t + READING_INTERVAL + self.rng.uniform(-3, 3)
+
+  def upTo(self, now):
+    self.ensure(now)
+    i = len(self.readings)
+    while i > 0 and self.readings[i - 1]['time'] > now:
+      i -= 1
+    return self.readings[:i]
+
+class Backend:
+  #Nightscout API as served by the gms-world backend: entries.json with local dates,
+  #an 'ago' string and long polling through waitfornextid
+
+  def __init__(self, world):
+    self.world = world
+    self.outages = []
+    self.requests = []
+
+  def down(self, now):
+    for (start, end) in self.outages:
+      if start <= now < end:
+        return True
+    return False
+
+  def delivered(self, kernel, reading):
+    #the first delivery of each reading starts a new measurement cycle
+    cycle = kernel.metrics.cycle
+    if cycle == None or cycle['label'] < reading['id']:
+      kernel.metrics.newCycle(reading['id'])
+      kernel.metrics.add('readings')
+
+  def entry(self, reading, tz, now):
+    local = reading['time'] + tz
+    mins = int((now - reading['time']) / 60)
+    return {
+      '_id': '%024x' % (reading['id'] * 7919),
+      'id': reading['id'],
+      'device': 'xDrip-DexcomG6',
+      'date': isoDate(local),
+      'dateString': isoDate(reading['time']) + '.000Z',
+      'mills': reading['time'] * 1000,
+      'sysTime': isoDate(reading['time']) + '.000Z',
+      'sgv': reading['sgv'],
+      'delta': reading['delta'],
+      'direction': reading['direction'],
+      'type': 'sgv',
+      'filtered': reading['sgv'] * 1000 + 144,
+      'unfiltered': reading['sgv'] * 1000 + 288,
+      'rssi': 100,
+      'noise': 1,
+      'utcOffset': tz // 60,
+      'ago': str(mins) + ' min ago'
+    }
+
+  def serve(self, kernel, method, url, headers):
+    #runs in the calling device thread, long polls block it in virtual time
+    kernel.sleep(self.holdSeconds(kernel, url))
+    return self.answer(kernel, method, url, headers)
+
+  def holdSeconds(self, kernel, url):
+    #how long a long poll is held before it is answered: until the next reading or its timeout
+    parts = urlsplit(url)
+    params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+    readings = self.world.glucose.upTo(kernel.world())
+    waitId = params.get('waitfornextid')
+    if waitId != None and len(readings) > 0 and str(readings[-1]['id']) == waitId:
+      timeout = int(params.get('timeout', 30000)) / 1000
+      due = self.world.glucose.nextTime - kernel.epoch
+      return max(min(due, kernel.now + timeout) - kernel.now, 0)
+    return 0
+
+  def answer(self, kernel, method, url, headers):
+    parts = urlsplit(url)
+    params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+    self.requests.append((kernel.now, method, url))
+    tz = tzSeconds(headers.get('x-gms-tz'))
+    if not parts.path.endswith('/entries.json'):
+      return 404, b'{"status":404,"message":"Not found"}'
+    count = int(params.get('count', 10))
+    readings = self.world.glucose.upTo(kernel.world())
+    now = kernel.world()
+    if len(readings) > 0:
+      self.delivered(kernel, readings[-1])
+    body = [self.entry(r, tz, now) for r in reversed(readings[-count:])]
+    return 200, json.dumps(body).encode()
+
+class AccessPoint:
+
+  def __init__(self, ssid, password, bssid, channel, rssi):
+    self.ssid = ssid
+    self.password = password
+    self.bssid = bssid
+    self.channel = channel
+    self.rssi = rssi
+
+class Radio:
+  #integrates the time spent in each Wi-Fi radio state
+
+  def __init__(self, kernel):
+    self.kernel = kernel
+    self.state = 'off'
+    self.since = 0.0
+    self.seconds = {}
+
+  def set(self, state):
+    now = self.kernel.now
+    self.seconds[self.state] = self.seconds.get(self.state, 0) + now - self.since
+    self.state = state
+    self.since = now
+
+  def totals(self):
+    self.set(self.state)
+    return dict(self.seconds)
+
+class World:
+
+  def __init__(self, kernel, seed=1):
+    self.kernel = kernel
+    self.seed = seed
+    self.epoch = kernel.epoch
+    self.glucose = Glucose(self)
+    self.backend = Backend(self)
+    self.radio = Radio(kernel)
+    self.accessPoints = [AccessPoint('home', 'secret', b'\x24\x0a\xc4\x11\x22\x33', 6, -58)]
+    self.scanSeconds = 2.2
+    self.associateSeconds = 1.1
+    self.wifiActive = False
+    self.wifiConnected = False
+    self.wifiPm = 1
+    self.busy = 0
+    self.ntpReachable = True
+    self.ntpBlocked = set()
+    self.ntpLatency = 0.08
+    self.ntpLatencies = {} #host to latency, for servers slower than ntpLatency
+    #network timings of an ESP32 talking TLS to a cloud endpoint
+    self.dnsSeconds = 0.05
+    self.rttSeconds = 0.08
+    self.handshakeSeconds = 1.6
+    self.resumeSeconds = 0.35
+    self.keepAliveSeconds = 75 #idle connections are closed by the server after this
+    self.bytesPerSecond = 40000
+    self.batteryLevel = 80
+    self.charging = True
+    self.accel = (0.0, 1.0, 0.0)
+    self.envUnit = True
+    self.rgbUnit = True
+    self.touches = []
+    self.presses = []
+    self.outputs = []
+
+  def updateRadio(self):
+    #the radio is fully on while scanning, associating or while a request is open,
+    #a connected station otherwise sits in modem sleep unless power save is off
+    if not self.wifiActive:
+      state = 'off'
+    elif self.busy > 0 or (self.wifiConnected and self.wifiPm == 0):
+      state = 'on'
+    elif self.wifiConnected:
+      state = 'sleep'
+    else:
+      state = 'idle'
+    if state != self.radio.state:
+      self.radio.set(state)
+
+  # sensors ----
+
+  def temperature(self):
+    return 21.5 + math.sin(self.kernel.now / 3600)
+
+  def humidity(self):
+    return 45.0 + 5 * math.sin(self.kernel.now / 5400)
+
+  def pressure(self):
+    return 1008.0 + 3 * math.sin(self.kernel.now / 7200)
+
+  # scripted input ----
+
+  def tilt(self, at, y):
+    #y > 0 normal orientation, y < 0 upside down
+    self.kernel.at(at, lambda: setattr(self, 'accel', (0.0, y, math.sqrt(max(1 - y * y, 0)))), persistent=True)
+
+  def touch(self, at, x, y, duration=0.15):
+    self.touches.append((at, at + duration, x, y))
+
+  def press(self, at, button):
+    self.presses.append((at, button))
+    self.presses.sort(key=lambda p: p[0])
+
+  def activeTouch(self):
+    now = self.kernel.now
+    for touch in self.touches:
+      if touch[0] <= now < touch[1]:
+        return touch
+    return None
+
+  def output(self, name, value):
+    self.outputs.append((self.kernel.now, name, value))
+    self.kernel.metrics.add('out.' + name)
@@ -0,0 +1,118 @@
+#Glucose statistics kept up to date reading by reading
+#The readings of the last hours are held in a window of their own, every new reading is
+#added to running sums and the readings leaving the window are subtracted, so mean,
+#standard deviation and time in range cost O(1) per reading and nothing to read. Rate of
+#change and the short-term slope only look at the newest few readings.
+
+import math
+from history import History
+
+class GlucoseStats:
+
+  def __init__(self, low, high, hours=24, slopeMinutes=15, capacity=288):
+    self.low = low
+    self.high = high
+    self.span = hours * 3600
+    self.slopeSpan = slopeMinutes * 60
+    self.window = History(capacity)
+    self.reset()
+
+  def reset(self):
+    self.window.clear()
+    self.total = 0
+    self.squares = 0
+    self.below = 0
+    self.above = 0
+    self.diff = 0 #sgv change from the reading before the newest
+    self.rate = 0.0 #sgv change per minute from the reading before the newest
+    self.slope = 0.0 #least squares sgv change per minute over the slope span
+
+  def count(self, sgv, sign):
+    self.total += sign * sgv
+    self.squares += sign * sgv * sgv
+    if sgv < self.low: self.below += sign
+    elif sgv > self.high: self.above += sign
+
+  def newest(self):
+    return self.window.newest()
+
+  def add(self, seconds, sgv):
+    #False for a reading not newer than the newest one, see rebuild
+    newest = self.window.newest()
+    if newest != None and seconds <= newest[0]:
+      return False
+    w = self.window
+    while len(w) > 0 and (len(w) == w.capacity or w.time(0) <= seconds - self.span):
+      self.count(w.dropOldest()[1], -1)
+    w.append(seconds, sgv)
+    self.count(sgv, 1)
+    self.diff = 0
+    self.rate = 0.0
+    if newest != None:
+      self.diff = sgv - newest[1]
+      self.rate = self.diff * 60 / (seconds - newest[0])
+    self.slope = self.leastSquares(seconds)
+    return True
+
+  def leastSquares(self, seconds):
+    #over the readings of the slope span only, a handful at most
+    n = 0
+    st = 0.0
+    sy = 0.0
+    stt = 0.0
+    sty = 0.0
+    i = len(self.window) - 1
+    while i >= 0 and self.window.time(i) >= seconds - self.slopeSpan:
+      t = (self.window.time(i) - seconds) / 60
+      y = self.window.sgv(i)
+      n += 1
+      st += t
+      sy += y
+      stt += t * t
+      sty += t * y
+      i -= 1
+    d = n * stt - st * st
+    if n < 2 or d == 0:
+      return 0.0
+    return (n * sty - st * sy) / d
+
+  def rebuild(self, history):
+    #after older readings were merged into the history
+    self.reset()
+    newest = history.newest()
+    if newest != None:
+      for (seconds, sgv) in history.range(since=newest[0] - self.span + 1):
+        self.add(seconds, sgv)
+
+  def update(self, history, batch):
+    #(seconds, sgv) pairs just merged into history, oldest first
+    for (seconds, sgv) in batch:
+      newest = self.window.newest()
+      if newest != None and seconds <= newest[0] and (self.window.get(seconds) == sgv or seconds <= newest[0] - self.span):
+        #known already or too old for the window
+        continue
+      if not self.add(seconds, sgv):
+        self.rebuild(history)
+        return
+
+  def mean(self):
+    n = len(self.window)
+    return self.total / n if n > 0 else 0
+
+  def sd(self):
+    n = len(self.window)
+    if n < 2:
+      return 0
+    return math.sqrt((n * self.squares - self.total * self.total) / (n * (n - 1)))
+
+  def inRange(self):
+    #percent of the readings within low..high
+    n = len(self.window)
+    return 100 * (n - self.below - self.above) // n if n > 0 else 0
+
+  def summary(self):
+    n = len(self.window)
+    if n == 0:
+      return 'no readings'
+    return ('%d readings, mean %.0f, sd %.0f, in range %d%% (below %d%%, above %d%%), rate %+.1f/min, slope %+.1f/min' %
+      (n, self.mean(), self.sd(), self.inRange(), 100 * self.below // n, 100 * self.above // n, self.rate, self.slope))
@@ -0,0 +1,6 @@
+#The app modules live in the repository root, tests import them like the device does
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
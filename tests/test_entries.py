@@ -0,0 +1,76 @@
+import asyncio
+import io
+import json
+import os
+
+import pytest
+
+import entries
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sim', 'payloads')
+
+def parse(data, limit=10, chunk=7, make=None):
+  parser = entries.Parser(limit, make)
+  for i in range(0, len(data), chunk):
+    parser.feed(data[i:i + chunk])
+  return parser.close()
+
+def kept(entry):
+  return {k: entry[k] for k in ('sgv', 'date', 'direction', 'id', 'ago') if k in entry}
+
+@pytest.mark.parametrize('name', ['entries-10.json', 'entries-50.json'])
+@pytest.mark.parametrize('chunk', [1, 13, 128, 100000])
+def test_payloads_match_json(name, chunk):
+  with open(os.path.join(PAYLOAD_DIR, name), 'rb') as f:
+    data = f.read()
+  expected = [kept(entry) for entry in json.loads(data)[:10]]
+  assert parse(data, chunk=chunk) == expected
+
+def test_limit_skips_the_rest():
+  data = json.dumps([{'sgv': 100 + i, 'id': i} for i in range(20)]).encode()
+  assert parse(data, limit=3) == [{'sgv': 100, 'id': 0}, {'sgv': 101, 'id': 1}, {'sgv': 102, 'id': 2}]
+
+def test_values_nested_and_escaped():
+  data = b'[ {"sgv" : 120,"extra":{"sgv":1,"list":[1,{"id":2}]},"ago":"3 \\"min\\" ago","direction":null,"x":-1.5e2,"id":true} ]'
+  assert parse(data) == [{'sgv': 120, 'ago': '3 "min" ago', 'direction': None, 'id': True}]
+
+def test_long_values_are_cut():
+  data = json.dumps([{'ago': 'x' * 100}]).encode()
+  assert parse(data) == [{'ago': 'x' * entries.MAX_TOKEN}]
+
+def test_make_records():
+  data = b'[{"id":7,"date":1000,"sgv":140,"direction":"FortyFiveUp","ago":"1 min ago"}]'
+  make = lambda fields: entries.record(fields.get('id'), fields['date'], fields['sgv'], entries.directionCode(fields.get('direction')), fields.get('ago'))
+  [entry] = parse(data, make=make)
+  assert entry[entries.ID] == 7
+  assert entry[entries.TIME] == 1000
+  assert entry[entries.SGV] == 140
+  assert entry[entries.DIRECTION] == entries.FORTY_FIVE_UP
+  assert entry[entries.AGO] == '1 min ago'
+  assert entries.rising(entry[entries.DIRECTION])
+
+@pytest.mark.parametrize('data', [b'{"sgv":1}', b'[{"sgv":1}', b'[{"ago":"3 min', b'[[1]]', b'[]]'])
+def test_invalid_json(data):
+  with pytest.raises(ValueError):
+    parse(data)
+
+def test_read_blocking_stream():
+  data = json.dumps([{'sgv': 100 + i} for i in range(5)]).encode()
+  assert entries.read(io.BytesIO(data), limit=2, bufsize=16) == [{'sgv': 100}, {'sgv': 101}]
+
+def test_read_async_body():
+  class Body:
+    def __init__(self, data):
+      self.data = data
+    async def read(self, size):
+      chunk = self.data[:size]
+      self.data = self.data[size:]
+      return chunk
+  data = json.dumps([{'sgv': 100 + i} for i in range(5)]).encode()
+  assert asyncio.run(entries.readAsync(Body(data), limit=10, bufsize=9)) == [{'sgv': 100 + i} for i in range(5)]
+
+def test_direction_codes():
+  assert entries.directionCode('Flat') == entries.FLAT
+  assert entries.directionCode('unknown') == entries.NONE
+  assert entries.directionName(entries.DOUBLE_DOWN) == 'DoubleDown'
+  assert entries.falling(entries.SINGLE_DOWN) and not entries.falling(entries.FLAT)
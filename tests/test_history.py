@@ -0,0 +1,65 @@
+from history import History
+
+def test_append_in_order():
+  h = History(4)
+  for i in range(3):
+    h.append(i * 300, 100 + i)
+  assert len(h) == 3
+  assert h.items() == [(0, 100), (300, 101), (600, 102)]
+  assert h.newest() == (600, 102)
+
+def test_append_drops_oldest_when_full():
+  h = History(3)
+  for i in range(5):
+    h.append(i * 300, 100 + i)
+  assert h.items() == [(600, 102), (900, 103), (1200, 104)]
+
+def test_merge_unordered_batch():
+  h = History(10)
+  h.merge([(900, 103), (0, 100), (600, 102), (300, 101)])
+  assert h.items() == [(0, 100), (300, 101), (600, 102), (900, 103)]
+
+def test_merge_fills_gap_and_replaces_known_timestamp():
+  h = History(10)
+  for seconds in (0, 300, 1200, 1500):
+    h.append(seconds, 100)
+  h.merge([(900, 130), (600, 120), (300, 110)])
+  assert h.items() == [(0, 100), (300, 110), (600, 120), (900, 130), (1200, 100), (1500, 100)]
+
+def test_merge_across_the_ring_wrap():
+  h = History(4)
+  for i in range(6):
+    h.append(i * 300, 100 + i)
+  #start is in the middle of the arrays now
+  assert h.start == 2
+  h.merge([(1350, 200), (1800, 201)])
+  assert h.items() == [(1200, 104), (1350, 200), (1500, 105), (1800, 201)]
+
+def test_merge_older_than_the_buffer_keeps_the_newest():
+  h = History(3)
+  for i in range(3):
+    h.append(1000 + i * 300, 100 + i)
+  h.merge([(0, 90), (300, 91)])
+  assert h.items() == [(1000, 100), (1300, 101), (1600, 102)]
+
+def test_append_older_reading_is_merged():
+  h = History(5)
+  h.append(0, 100)
+  h.append(600, 102)
+  h.append(300, 101)
+  h.append(600, 110)
+  assert h.items() == [(0, 100), (300, 101), (600, 110)]
+
+def test_find_get_and_range():
+  h = History(8)
+  for i in range(5):
+    h.append(i * 300, 100 + i)
+  assert h.find(450) == 2
+  assert h.get(600) == 102
+  assert h.get(650) == None
+  assert h.range(since=300, until=900) == [(300, 101), (600, 102)]
+
+def test_arrays_hold_capacity_items():
+  h = History(288)
+  assert len(h.times) == len(h.sgvs) == 288
+  assert h.times.itemsize >= 4 and h.sgvs.itemsize == 2
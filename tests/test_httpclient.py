@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+import httpclient
+
+BODY = b'[{"sgv":120}]' * 20
+
+class Server:
+  #plain HTTP/1.1 server answering every request with the response of its path
+
+  def __init__(self):
+    self.paths = []
+    self.connections = 0
+    self.closeAfter = None #requests per connection before the server drops it
+
+  async def start(self):
+    self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+    return 'http://127.0.0.1:' + str(self.server.sockets[0].getsockname()[1]) + '/api/v1'
+
+  async def stop(self):
+    self.server.close()
+    await self.server.wait_closed()
+
+  async def handle(self, reader, writer):
+    self.connections += 1
+    served = 0
+    while self.closeAfter == None or served < self.closeAfter:
+      line = await reader.readline()
+      if not line:
+        break
+      while (await reader.readline()) not in (b'\r\n', b''):
+        pass
+      path = line.split()[1].decode()
+      self.paths.append(path)
+      served += 1
+      if path.endswith('/chunked'):
+        writer.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n')
+        for i in range(0, len(BODY), 50):
+          chunk = BODY[i:i + 50]
+          writer.write(b'%x;ext=1\r\n%s\r\n' % (len(chunk), chunk))
+        writer.write(b'0\r\nX-Trailer: 1\r\n\r\n')
+      elif path.endswith('/eof'):
+        writer.write(b'HTTP/1.0 200 OK\r\n\r\n' + BODY)
+        await writer.drain()
+        break
+      else:
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\nDate: Mon, 02 Jun 2025 06:00:00 GMT\r\n\r\n%s' % (len(BODY), BODY))
+      await writer.drain()
+    writer.close()
+
+async def readAll(response):
+  data = b''
+  while True:
+    chunk = await response.raw.read(17)
+    if not chunk:
+      break
+    data += chunk
+  response.close()
+  return data
+
+def serve(test):
+  async def run():
+    server = Server()
+    url = await server.start()
+    try:
+      await test(server, url)
+    finally:
+      await server.stop()
+  asyncio.run(run())
+
+def test_content_length_body_and_keep_alive():
+  async def test(server, url):
+    client = httpclient.Client(url)
+    for i in range(3):
+      response = await client.get('/entries.json')
+      assert response.status_code == 200
+      assert response.headers['date'] == 'Mon, 02 Jun 2025 06:00:00 GMT'
+      assert await readAll(response) == BODY
+    assert server.paths == ['/api/v1/entries.json'] * 3
+    assert client.connects == 1 and server.connections == 1
+    client.close()
+  serve(test)
+
+def test_chunked_body():
+  async def test(server, url):
+    client = httpclient.Client(url)
+    for i in range(2):
+      response = await client.get('/chunked')
+      assert await readAll(response) == BODY
+    assert client.connects == 1
+    client.close()
+  serve(test)
+
+def test_body_until_connection_close():
+  async def test(server, url):
+    client = httpclient.Client(url)
+    response = await client.get('/eof')
+    assert await readAll(response) == BODY
+    assert client.writer == None
+    response = await client.get('/entries.json')
+    assert await readAll(response) == BODY
+    assert client.connects == 2
+    client.close()
+  serve(test)
+
+def test_unread_body_closes_the_connection():
+  async def test(server, url):
+    client = httpclient.Client(url)
+    response = await client.get('/entries.json')
+    await response.raw.read(10)
+    response.close()
+    assert client.writer == None
+    assert await readAll(await client.get('/entries.json')) == BODY
+    assert client.connects == 2
+    client.close()
+  serve(test)
+
+def test_reconnect_and_retry_after_server_closed_idle_connection():
+  async def test(server, url):
+    server.closeAfter = 1
+    client = httpclient.Client(url)
+    for i in range(3):
+      assert await readAll(await client.get('/entries.json')) == BODY
+    assert client.requests == 3
+    assert client.connects == 3
+    client.close()
+  serve(test)
+
+def test_new_connection_failing_is_not_retried():
+  async def test(server, url):
+    await server.stop()
+    client = httpclient.Client(url)
+    with pytest.raises(OSError):
+      await client.get('/entries.json')
+    assert client.connects == 0
+    await server.start()
+  serve(test)
+
+def test_base_path():
+  assert httpclient.Client('https://example.com/api/v1/').base == '/api/v1'
+  assert httpclient.Client('https://example.com').base == ''
+  client = httpclient.Client('http://example.com:8080/')
+  assert (client.tls, client.host, client.port, client.base) == (False, 'example.com', 8080, '')
+
+def test_session_context_offers_the_session():
+  class Context:
+    verify_mode = 0
+    def wrap_socket(self, sock, **kwargs):
+      return kwargs
+    def wrap_bio(self, incoming, outgoing, **kwargs):
+      return kwargs
+  context = httpclient.SessionContext(Context(), 'session')
+  assert context.wrap_socket(None, server_hostname='host') == {'server_hostname': 'host', 'session': 'session'}
+  assert context.wrap_bio(None, None, server_side=False) == {'server_side': False, 'session': 'session'}
+  assert context.verify_mode == 0
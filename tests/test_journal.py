@@ -0,0 +1,90 @@
+import os
+
+import journal
+from journal import Journal, RECORD_SIZE
+
+def readings(n, start=0):
+  return [(start + i * 300, 100 + i, i % 8) for i in range(n)]
+
+def write(filename, records):
+  with open(filename, 'wb') as f:
+    f.write(b''.join([journal.pack(*record) for record in records]))
+
+def test_check_byte():
+  data = journal.pack(1000, 120, 4)
+  assert len(data) == RECORD_SIZE
+  assert data[-1] == journal.check(data)
+  #an erased or zeroed record never passes
+  assert journal.check(b'\xff' * RECORD_SIZE) != 0xFF
+  assert journal.check(b'\x00' * RECORD_SIZE) != 0x00
+  flipped = bytes([data[0] ^ 1]) + data[1:]
+  assert flipped[-1] != journal.check(flipped)
+
+def test_append_and_load(tmp_path):
+  filename = str(tmp_path / 'sgv.journal')
+  j = Journal(filename, capacity=10)
+  for record in readings(3):
+    j.append(*record)
+  assert os.path.getsize(filename) == 3 * RECORD_SIZE
+  j = Journal(filename, capacity=10)
+  assert j.load() == readings(3)
+  assert j.last == readings(3)[-1]
+
+def test_missing_journal(tmp_path):
+  j = Journal(str(tmp_path / 'sgv.journal'))
+  assert j.load() == []
+  assert j.last == None
+
+def test_torn_tail_is_dropped_and_rewritten(tmp_path):
+  filename = str(tmp_path / 'sgv.journal')
+  write(filename, readings(4))
+  with open(filename, 'ab') as f:
+    f.write(journal.pack(1200, 140, 4)[:5])
+  j = Journal(filename, capacity=10)
+  assert j.load() == readings(4)
+  #compacted, so the next record is appended on a record boundary
+  assert os.path.getsize(filename) == 4 * RECORD_SIZE
+  j.append(1200, 140, 4)
+  assert Journal(filename, capacity=10).load() == readings(4) + [(1200, 140, 4)]
+
+def test_corrupt_last_record_is_dropped(tmp_path):
+  filename = str(tmp_path / 'sgv.journal')
+  write(filename, readings(3))
+  with open(filename, 'r+b') as f:
+    f.seek(2 * RECORD_SIZE)
+    f.write(b'\x00' * RECORD_SIZE)
+  assert Journal(filename, capacity=10).load() == readings(2)
+
+def test_compaction_keeps_the_newest(tmp_path):
+  filename = str(tmp_path / 'sgv.journal')
+  j = Journal(filename, capacity=5)
+  for record in readings(9):
+    j.append(*record)
+  assert os.path.getsize(filename) == 9 * RECORD_SIZE
+  j.append(*readings(10)[-1])
+  assert os.path.getsize(filename) == 5 * RECORD_SIZE
+  assert j.records == 5
+  assert not os.path.exists(j.tmpFilename)
+  assert Journal(filename, capacity=5).load() == readings(10)[5:]
+
+def test_compaction_cut_off_after_the_temporary_file(tmp_path):
+  filename = str(tmp_path / 'sgv.journal')
+  j = Journal(filename, capacity=5)
+  write(j.tmpFilename, readings(5, 3000))
+  #the journal was removed, the rename did not happen
+  assert j.load() == readings(5, 3000)
+  assert os.path.exists(filename)
+  assert not os.path.exists(j.tmpFilename)
+
+def test_replace_where_rename_does_not_overwrite(tmp_path, monkeypatch):
+  filename = str(tmp_path / 'sgv.journal')
+  write(filename, readings(2))
+  j = Journal(filename, capacity=5)
+  write(j.tmpFilename, readings(3, 3000))
+  rename = os.rename
+  def fatRename(src, dst):
+    if os.path.exists(dst): raise OSError(17, 'EEXIST')
+    rename(src, dst)
+  monkeypatch.setattr(os, 'rename', fatRename)
+  j.replace()
+  assert Journal(filename, capacity=5).load() == readings(3, 3000)
@@ -0,0 +1,69 @@
+import math
+import statistics
+
+from history import History
+from stats import GlucoseStats
+
+def feed(stats, history, readings):
+  for (seconds, sgv) in readings:
+    history.append(seconds, sgv)
+    stats.update(history, [(seconds, sgv)])
+
+def test_mean_sd_and_range_match_a_full_pass():
+  stats = GlucoseStats(70, 180, hours=1)
+  history = History(100)
+  readings = [(i * 300, 60 + (i * 37) % 160) for i in range(40)]
+  feed(stats, history, readings)
+  #the window holds the last hour only
+  window = [sgv for (seconds, sgv) in readings if seconds > readings[-1][0] - 3600]
+  assert len(stats.window) == len(window) == 12
+  assert math.isclose(stats.mean(), statistics.mean(window))
+  assert math.isclose(stats.sd(), statistics.stdev(window))
+  inRange = len([sgv for sgv in window if 70 <= sgv <= 180])
+  assert stats.inRange() == 100 * inRange // len(window)
+
+def test_running_sums_are_not_recomputed():
+  stats = GlucoseStats(70, 180, hours=1)
+  history = History(100)
+  feed(stats, history, [(i * 300, 100) for i in range(30)])
+  #adding a reading touches no more than the readings leaving the window
+  before = stats.total
+  feed(stats, history, [(30 * 300, 160)])
+  assert stats.total - before == 160 - 100
+
+def test_capacity_limits_the_window():
+  stats = GlucoseStats(70, 180, capacity=5)
+  history = History(100)
+  feed(stats, history, [(i * 300, 100 + i) for i in range(10)])
+  assert len(stats.window) == 5
+  assert stats.mean() == 107
+
+def test_diff_rate_and_slope():
+  stats = GlucoseStats(70, 180)
+  history = History(100)
+  feed(stats, history, [(i * 300, 100 + 10 * i) for i in range(4)])
+  assert stats.diff == 10
+  assert math.isclose(stats.rate, 2.0)
+  assert math.isclose(stats.slope, 2.0)
+
+def test_older_reading_rebuilds_from_the_history():
+  stats = GlucoseStats(70, 180)
+  history = History(100)
+  feed(stats, history, [(0, 100), (600, 120)])
+  history.merge([(300, 200)])
+  stats.update(history, [(300, 200)])
+  assert len(stats.window) == 3
+  assert math.isclose(stats.mean(), 140)
+  assert stats.diff == -80
+
+def test_known_reading_is_skipped():
+  stats = GlucoseStats(70, 180)
+  history = History(100)
+  feed(stats, history, [(0, 100), (300, 110)])
+  stats.update(history, [(0, 100), (300, 110)])
+  assert len(stats.window) == 2 and stats.total == 210
+
+def test_empty():
+  stats = GlucoseStats(70, 180)
+  assert stats.mean() == 0 and stats.sd() == 0 and stats.inRange() == 0
+  assert stats.summary() == 'no readings'
@@ -0,0 +1,134 @@
+#timesync talks to the RTC, the clock and the flash, it runs on the stand-ins of the
+#simulator without booting the app
+
+import io
+import shutil
+import struct
+
+import pytest
+
+from sim.device import Simulation
+
+@pytest.fixture
+def device():
+  sim = Simulation(log=io.StringIO())
+  sim.install()
+  try:
+    import timesync
+    import utime
+    yield sim, timesync, utime
+  finally:
+    sim.uninstall()
+    shutil.rmtree(sim.flash, ignore_errors=True)
+
+def packet(seconds, fraction=0, first=0x24, stratum=2):
+  #server answer: leap 0, version 4, mode 4 and the transmit timestamp at 40
+  msg = bytearray(48)
+  msg[0] = first
+  msg[1] = stratum
+  msg[40:48] = struct.pack('!II', seconds, fraction)
+  return bytes(msg)
+
+def test_parse_server_answer(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  seconds = utime.mktime((2025, 6, 2, 6, 0, 0, 0, 0))
+  assert ts.parse(packet(seconds + timesync.NTP_DELTA, 0x80000000)) == seconds * 1000 + 500
+  assert ts.parse(packet(seconds + timesync.NTP_DELTA, 0x40000000)) == seconds * 1000 + 250
+
+def test_parse_rejects_invalid_answers(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  seconds = utime.mktime((2025, 6, 2, 6, 0, 0, 0, 0)) + timesync.NTP_DELTA
+  assert ts.parse(packet(seconds)[:47]) == None
+  assert ts.parse(packet(seconds, first=0x23)) == None #client mode
+  assert ts.parse(packet(seconds, first=0xE4)) == None #leap 3, clock not synchronized
+  assert ts.parse(packet(seconds, stratum=0)) == None #kiss of death
+  assert ts.parse(packet(seconds, stratum=16)) == None
+  assert ts.parse(packet(0)) == None
+
+def test_http_date_sets_the_clock_when_ntp_fails(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  date = 'Mon, 02 Jun 2025 06:00:00 GMT'
+  ts.httpDate(date)
+  assert ts.source == None #no ntp failure yet
+  ts.failures = 1
+  ts.httpDate(date)
+  assert ts.source == 'http'
+  assert utime.time() == utime.mktime((2025, 6, 2, 6, 0, 0, 0, 0))
+  assert utime.gmtime(utime.time())[:6] == (2025, 6, 2, 6, 0, 0)
+  assert ts.synced.is_set() and ts.lastNtp == None
+
+def test_http_date_month_and_day(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  ts.failures = 1
+  ts.httpDate('Wed, 31 Dec 2025 23:59:59 GMT')
+  assert utime.gmtime(utime.time())[:6] == (2025, 12, 31, 23, 59, 59)
+
+def test_invalid_http_date_is_ignored(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  ts.failures = 1
+  ts.httpDate('02 Jun 2025')
+  ts.httpDate(None)
+  assert ts.source == None and not ts.synced.is_set()
+
+def test_drift_between_ntp_syncs(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  start = utime.mktime((2025, 6, 2, 6, 0, 0, 0, 0))
+  ts.set(start * 1000, 'ntp')
+  assert ts.drift == None
+  assert ts.interval() == 2 * 1000000 // timesync.DEFAULT_DRIFT
+  #two hours later the RTC is 720 ms ahead: 100 ppm fast
+  sim.kernel.now += 7200
+  ts.set(ts.nowMs() - 720, 'ntp')
+  assert ts.drift == 100
+  assert ts.interval() == 20000
+  #a sync from another source measures nothing and restarts the span
+  sim.kernel.now += 7200
+  ts.set(ts.nowMs() - 50, 'http')
+  assert ts.drift == 100 and ts.lastNtp == None
+
+def test_drift_needs_a_long_enough_span(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  ts.set(utime.mktime((2025, 6, 2, 6, 0, 0, 0, 0)) * 1000, 'ntp')
+  sim.kernel.now += timesync.MIN_DRIFT_SPAN - 1
+  ts.set(ts.nowMs() - 500, 'ntp')
+  assert ts.drift == None
+
+def test_interval_is_clamped(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  ts.drift = 0
+  assert ts.interval() == ts.maxInterval
+  ts.drift = -10
+  assert ts.interval() == min(2 * 1000000 // 10, ts.maxInterval)
+  ts.drift = 5000
+  assert ts.interval() == ts.minInterval
+
+def test_trusted(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  #RTC not set since power on
+  assert not ts.trusted()
+  ts.set(utime.mktime((2025, 6, 2, 6, 0, 0, 0, 0)) * 1000, 'ntp')
+  ts.drift = 100
+  assert ts.trusted()
+  sim.kernel.now += ts.interval() - 1
+  assert ts.trusted()
+  sim.kernel.now += 1
+  assert not ts.trusted()
+
+def test_state_survives_a_reset(device):
+  sim, timesync, utime = device
+  ts = timesync.TimeSync(2025)
+  ts.set(utime.mktime((2025, 6, 2, 6, 0, 0, 0, 0)) * 1000, 'ntp')
+  sim.kernel.now += 7200
+  ts.set(ts.nowMs() - 1440, 'ntp')
+  ts = timesync.TimeSync(2025)
+  assert ts.drift == 200 and ts.lastSync == ts.lastNtp == utime.time()
+  assert ts.trusted()
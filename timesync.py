@@ -0,0 +1,186 @@
+#Time sync service for the RTC
+#A request goes to every ntp server of the pool at once on non-blocking UDP sockets and
+#the first valid answer sets the RTC, so neither a slow server nor a blocked one stalls
+#the event loop. When UDP/123 is blocked the Date header of the backend responses sets
+#the clock instead. The RTC drift measured between two ntp syncs is kept on flash with
+#the time of the last sync: it decides how long the RTC is trusted without a sync, e.g.
+#after a watchdog reset, and how often it is synced again in the background.
+
+import machine
+import struct
+import sys
+import ujson
+import usocket
+import utime
+
+try:
+  import uasyncio as asyncio
+except:
+  import asyncio
+
+HOSTS = ('0.pool.ntp.org', '1.pool.ntp.org', '2.pool.ntp.org', '3.pool.ntp.org')
+NTP_DELTA = 3155673600 if utime.gmtime(0)[0] == 2000 else 2208988800 #1900 to the epoch
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+DEFAULT_DRIFT = 100 #ppm assumed until measured
+MIN_DRIFT_SPAN = 3600 #secs between two ntp syncs to measure the drift
+POLL_MS = 20 #ms between checks of the sockets
+
+class TimeSync:
+
+  def __init__(self, minYear, hosts=HOSTS, timeout=2000, maxError=2, minInterval=3600, maxInterval=86400, stateFile='time.json'):
+    self.minYear = minYear #an RTC before this year was not set since power on
+    self.hosts = hosts
+    self.timeout = timeout #ms to wait for the first answer
+    self.maxError = maxError #secs the RTC may be off before it is synced again
+    self.minInterval = minInterval
+    self.maxInterval = maxInterval
+    self.stateFile = stateFile
+    self.addresses = {}
+    self.lastSync = None #utc secs of the last sync from any source
+    self.lastNtp = None #utc secs of the last ntp sync since the RTC was set otherwise
+    self.drift = None #ppm the RTC runs fast
+    self.source = None
+    self.failures = 0
+    self.syncs = 0
+    self.synced = asyncio.Event()
+    self.load()
+
+  def load(self):
+    try:
+      with open(self.stateFile, 'r') as f:
+        state = ujson.loads(f.read())
+      self.lastSync = state['sync']
+      self.lastNtp = state['ntp']
+      self.drift = state['drift']
+    except Exception as e:
+      print('No time sync state')
+
+  def save(self):
+    try:
+      with open(self.stateFile, 'w') as f:
+        f.write(ujson.dumps({'sync': self.lastSync, 'ntp': self.lastNtp, 'drift': self.drift}))
+    except Exception as e:
+      sys.print_exception(e)
+
+  def nowMs(self):
+    return utime.time_ns() // 1000000
+
+  def interval(self):
+    #secs until the RTC may be maxError off
+    drift = abs(self.drift) if self.drift != None else DEFAULT_DRIFT
+    if drift == 0:
+      return self.maxInterval
+    return min(max(self.maxError * 1000000 // drift, self.minInterval), self.maxInterval)
+
+  def trusted(self):
+    #an RTC running since the last sync, e.g. through a watchdog reset, and not too far off yet
+    now = utime.time()
+    if utime.gmtime(now)[0] < self.minYear or self.lastSync == None:
+      return False
+    return now >= self.lastSync and now - self.lastSync < self.interval()
+
+  def due(self):
+    return not self.synced.is_set() or utime.time() - self.lastSync >= self.interval()
+
+  def parse(self, msg):
+    #utc ms of a valid server answer or None
+    if len(msg) < 48 or msg[0] & 7 != 4 or msg[0] >> 6 == 3 or msg[1] == 0 or msg[1] > 15:
+      return None
+    seconds, fraction = struct.unpack('!II', msg[40:48])
+    if seconds == 0:
+      return None
+    return (seconds - NTP_DELTA) * 1000 + (fraction * 1000 >> 32)
+
+  async def query(self):
+    #the first valid answer of all servers, half the round trip added, or None. Only the
+    #name lookups block, their addresses are kept
+    request = bytearray(48)
+    request[0] = 0x1B #version 3, client mode
+    sockets = []
+    for host in self.hosts:
+      try:
+        address = self.addresses.get(host)
+        if address == None:
+          address = usocket.getaddrinfo(host, 123)[0][-1]
+          self.addresses[host] = address
+        s = usocket.socket(usocket.AF_INET, usocket.SOCK_DGRAM)
+        s.setblocking(False)
+        s.sendto(request, address)
+        sockets.append((host, s, utime.ticks_ms()))
+      except Exception as e:
+        print('Time server ' + host + ' failed: ' + str(e))
+        self.addresses.pop(host, None)
+    start = utime.ticks_ms()
+    try:
+      while len(sockets) > 0 and utime.ticks_diff(utime.ticks_ms(), start) < self.timeout:
+        await asyncio.sleep_ms(POLL_MS)
+        for (host, s, sent) in sockets:
+          try:
+            msg = s.recv(48)
+          except OSError:
+            continue
+          ms = self.parse(msg)
+          if ms != None:
+            rtt = utime.ticks_diff(utime.ticks_ms(), sent)
+            print('Time from ' + host + ' in ' + str(rtt) + ' ms')
+            return ms + rtt // 2
+    finally:
+      for (host, s, sent) in sockets:
+        s.close()
+    return None
+
+  def set(self, ms, source):
+    now = ms // 1000
+    if utime.gmtime(utime.time())[0] >= self.minYear:
+      offset = self.nowMs() - ms
+      print('RTC was ' + str(offset) + ' ms off, set from ' + source)
+      if source == 'ntp' and self.lastNtp != None and now - self.lastNtp >= MIN_DRIFT_SPAN:
+        self.drift = offset * 1000 // (now - self.lastNtp)
+        print('RTC drift ' + str(self.drift) + ' ppm, next sync in ' + str(self.interval()) + ' secs')
+    tm = utime.gmtime(now)
+    machine.RTC().datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], ms % 1000 * 1000))
+    self.lastSync = now
+    self.lastNtp = now if source == 'ntp' else None
+    self.source = source
+    self.syncs += 1
+    self.save()
+    self.synced.set()
+
+  def httpDate(self, value):
+    #Date header of an http response, e.g. 'Mon, 02 Jun 2025 06:00:00 GMT', used while
+    #the ntp servers do not answer
+    if value == None or self.failures == 0 or not self.due():
+      return
+    try:
+      parts = value.split(' ')
+      [HH, MM, SS] = [int(i) for i in parts[4].split(':')]
+      seconds = utime.mktime((int(parts[3]), MONTHS.index(parts[2]) + 1, int(parts[1]), HH, MM, SS, 0, 0))
+      self.set(seconds * 1000 + 500, 'http')
+    except Exception as e:
+      sys.print_exception(e)
+
+  async def monitor(self):
+    #syncs when due, retries failed syncs sooner, every 2 s doubled up to a minute until
+    #the time is set and up to 15 minutes after
+    if self.trusted():
+      print('RTC trusted, synced ' + str(utime.time() - self.lastSync) + ' secs ago')
+      self.source = 'rtc'
+      self.synced.set()
+    while True:
+      if self.due():
+        ms = await self.query()
+        if ms != None:
+          self.failures = 0
+          self.set(ms, 'ntp')
+        else:
+          self.failures += 1
+          print('No time server answered, ' + str(self.failures) + ' failures')
+      if self.failures > 0:
+        wait = min(2 << min(self.failures - 1, 9), 60 if not self.synced.is_set() else 900)
+      else:
+        wait = self.interval() - (utime.time() - self.lastSync)
+      await asyncio.sleep(max(wait, 1))
+
+  def stats(self):
+    return ('source: ' + str(self.source) + ', syncs: ' + str(self.syncs) + ', drift: ' + (str(self.drift) + ' ppm' if self.drift != None else 'unknown') +
+      ', next sync in ' + str(self.interval() - (utime.time() - self.lastSync) if self.lastSync != None else 0) + ' secs')
@@ -0,0 +1,88 @@
+#Touch screen and button input polled by a task at a low idle rate
+#M5.update reads the touch controller and dispatches the button callbacks. While nobody
+#touches the device it is polled every idle ms, after a touch or a button press every
+#active ms until linger ms passed without activity. Touches are mapped to actions by
+#hit-test regions. Actions, also those of button callbacks, are queued and run after
+#M5.update returned, and slow work like saving the config can wait until the input is
+#idle again, so a series of presses ends with a single flash write. A wake function can
+#swallow the touch or press that woke the device up.
+
+import M5
+import sys
+import utime
+
+try:
+  import uasyncio as asyncio
+except:
+  import asyncio
+
+class TouchInput:
+
+  def __init__(self, idle=200, active=50, linger=5000):
+    self.idle = idle
+    self.active = active
+    self.linger = linger
+    self.regions = [] #x0, y0, x1, y1, action
+    self.fallback = None
+    self.pending = []
+    self.whenIdle = []
+    self.lastActivity = None #ticks ms of the last touch or button press
+    self.wake = None #called on activity, True when it woke the device up
+    self.polls = 0
+
+  def region(self, x0, y0, x1, y1, action):
+    self.regions.append((x0, y0, x1, y1, action))
+
+  def hit(self, x, y):
+    for r in self.regions:
+      if x >= r[0] and x <= r[2] and y >= r[1] and y <= r[3]:
+        return r[4]
+    return self.fallback
+
+  def defer(self, action):
+    #queues an action, e.g. from a button callback
+    self.lastActivity = utime.ticks_ms()
+    if not self.woke(): self.pending.append(action)
+
+  def woke(self):
+    return self.wake != None and self.wake()
+
+  def afterActivity(self, action):
+    #runs action once when the input is idle again
+    if action not in self.whenIdle: self.whenIdle.append(action)
+
+  def poll(self):
+    self.polls += 1
+    M5.update()
+    if M5.Touch.getCount() > 0:
+      self.lastActivity = utime.ticks_ms()
+      woke = self.woke()
+      if M5.Touch.getDetail(0)[4] == True:
+        tx = M5.Touch.getX()
+        ty = M5.Touch.getY()
+        print("Touch screen pressed at " + str(tx) + "," + str(ty))
+        action = self.hit(tx, ty)
+        if action != None and not woke: self.pending.append(action)
+    while len(self.pending) > 0:
+      self.call(self.pending.pop(0), None)
+
+  def call(self, action, *args):
+    #a failing action must not stop the input task
+    try:
+      action(*args)
+    except Exception as e:
+      sys.print_exception(e)
+
+  def busy(self):
+    return self.lastActivity != None and utime.ticks_diff(utime.ticks_ms(), self.lastActivity) < self.linger
+
+  async def monitor(self):
+    while True:
+      self.poll()
+      if self.busy():
+        await asyncio.sleep_ms(self.active)
+        continue
+      self.lastActivity = None
+      while len(self.whenIdle) > 0:
+        self.call(self.whenIdle.pop(0))
+      await asyncio.sleep_ms(self.idle)
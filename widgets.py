@@ -0,0 +1,504 @@
+#Retained mode widgets for drawScreen
+#Every widget remembers what it last put on the panel, so a render pushes only the
+#widgets whose text, color or position changed and erases just the pixels they left behind
+
+import M5
+import math
+from entries import DOUBLE_UP, SINGLE_UP, FORTY_FIVE_UP, FLAT, FORTY_FIVE_DOWN, SINGLE_DOWN, DOUBLE_DOWN
+
+LEFT = 0
+CENTER = 1
+RIGHT = 2
+
+def subtract(a, b):
+  #parts of rectangle a=(x, y, w, h) not covered by rectangle b
+  ax, ay, aw, ah = a
+  bx, by, bw, bh = b
+  x1 = max(ax, bx)
+  y1 = max(ay, by)
+  x2 = min(ax + aw, bx + bw)
+  y2 = min(ay + ah, by + bh)
+  if x1 >= x2 or y1 >= y2:
+    return [a]
+  parts = []
+  if ay < y1: parts.append((ax, ay, aw, y1 - ay))
+  if y2 < ay + ah: parts.append((ax, y2, aw, ay + ah - y2))
+  if ax < x1: parts.append((ax, y1, x1 - ax, y2 - y1))
+  if x2 < ax + aw: parts.append((x2, y1, ax + aw - x2, y2 - y1))
+  return parts
+
+def intersects(a, b):
+  return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+class TextMetrics:
+  #bounded LRU cache of text widths and font heights keyed by (font, size, text), the
+  #strings on screen come from a small set so steady-state frames measure nothing on
+  #the display driver. hits and misses tell how well it does.
+
+  def __init__(self, capacity=48):
+    self.capacity = capacity
+    self.entries = {} #key: [value, last use]
+    self.uses = 0
+    self.hits = 0
+    self.misses = 0
+
+  def width(self, font, size, text):
+    return self.lookup((font, size, text))
+
+  def height(self, font, size=1):
+    return self.lookup((font, size, None))
+
+  def lookup(self, key):
+    self.uses += 1
+    entry = self.entries.get(key)
+    if entry != None:
+      self.hits += 1
+      entry[1] = self.uses
+      return entry[0]
+    self.misses += 1
+    font, size, text = key
+    M5.Display.setFont(font)
+    M5.Display.setTextSize(size)
+    value = M5.Display.fontHeight() if text == None else M5.Display.textWidth(text)
+    M5.Display.setTextSize(1)
+    if len(self.entries) >= self.capacity:
+      #evicts the least recently used
+      oldest = None
+      for k in self.entries:
+        if oldest == None or self.entries[k][1] < self.entries[oldest][1]: oldest = k
+      del self.entries[oldest]
+    self.entries[key] = [value, self.uses]
+    return value
+
+  def stats(self):
+    total = self.hits + self.misses
+    rate = 100 * self.hits // total if total > 0 else 0
+    return 'hits: ' + str(self.hits) + ', misses: ' + str(self.misses) + ' (' + str(rate) + '% hits)'
+
+METRICS = TextMetrics()
+
+class Label:
+
+  def __init__(self, x, y, font, align=LEFT, size=1, silent=False):
+    self.x = x
+    self.y = y
+    self.font = font
+    self.align = align
+    self.size = size
+    self.silent = silent
+    self.text = None
+    self.color = M5.Display.COLOR.WHITE
+    self.band = None
+    self.box = None
+    self.dirty = True
+    self.height = 0
+
+  def measure(self, text):
+    #width of text in this label's font
+    if self.height == 0: self.height = METRICS.height(self.font, self.size)
+    return METRICS.width(self.font, self.size, text)
+
+  def update(self, text, color=M5.Display.COLOR.WHITE, x=None):
+    if x == None: x = self.x
+    if text != self.text or color != self.color or x != self.x:
+      self.text = text
+      self.color = color
+      self.x = x
+      self.dirty = True
+
+  def target(self):
+    if self.text == None:
+      return None
+    w = self.measure(self.text)
+    x = self.x
+    if self.align == CENTER: x = int(self.x - w / 2)
+    elif self.align == RIGHT: x = int(self.x - w)
+    return (x, self.y, w, self.height)
+
+  def erase(self, d):
+    if self.box == None:
+      return []
+    box = self.target()
+    parts = [self.box] if box == None else subtract(self.box, box)
+    for (x, y, w, h) in parts:
+      d.fillRect(x, y, w, h, self.band.color)
+    return parts
+
+  def draw(self, d):
+    box = self.target()
+    if box != None:
+      d.setFont(self.font)
+      d.setTextSize(self.size)
+      d.setTextColor(self.color, self.band.color)
+      d.drawString(self.text, box[0], box[1])
+      d.setTextSize(1)
+      if self.silent == False:
+        print("Printing " + self.text)
+    self.box = box
+    self.dirty = False
+
+class Clock:
+  #HH:MM label redrawing only the characters that changed, the digits of the font have one
+  #width so every character keeps its cell and a new minute usually repaints a single digit
+
+  def __init__(self, x, y, font, silent=False):
+    self.x = x
+    self.y = y
+    self.font = font
+    self.silent = silent
+    self.text = None
+    self.color = M5.Display.COLOR.WHITE
+    self.band = None
+    self.box = None
+    self.dirty = True
+    self.drawn = None #text in box
+    self.height = 0
+
+  def width(self, ch):
+    if self.height == 0: self.height = METRICS.height(self.font)
+    return METRICS.width(self.font, 1, ch)
+
+  def update(self, text, color=M5.Display.COLOR.WHITE):
+    if text != self.text or color != self.color:
+      if color != self.color: self.drawn = None
+      self.text = text
+      self.color = color
+      self.dirty = True
+
+  def target(self):
+    if self.text == None:
+      return None
+    w = 0
+    for ch in self.text:
+      w += self.width(ch)
+    return (self.x, self.y, w, self.height)
+
+  def erase(self, d):
+    #a box of the same size is repainted cell by cell in draw
+    if self.box == None or self.box == self.target():
+      return []
+    d.fillRect(self.box[0], self.box[1], self.box[2], self.box[3], self.band.color)
+    self.drawn = None
+    return [self.box]
+
+  def draw(self, d):
+    box = self.target()
+    if box != None:
+      #text equal to what is on the panel means the cells were painted over
+      full = self.box == None or self.drawn == None or len(self.drawn) != len(self.text) or self.drawn == self.text
+      d.setFont(self.font)
+      d.setTextColor(self.color, self.band.color)
+      x = box[0]
+      for i in range(len(self.text)):
+        ch = self.text[i]
+        w = self.width(ch)
+        if full or ch != self.drawn[i]:
+          d.drawString(ch, x, box[1])
+        x += w
+      if self.silent == False:
+        print("Printing " + self.text)
+    self.drawn = self.text
+    self.box = box
+    self.dirty = False
+
+class Arrow:
+  #direction arrow: a filled circle with one or two triangles pointing the trend
+
+  DIRECTIONS = {DOUBLE_UP: (0, 8), DOUBLE_DOWN: (180, 8), SINGLE_UP: (0, 0), SINGLE_DOWN: (180, 0), FLAT: (90, 0), FORTY_FIVE_UP: (45, 0), FORTY_FIVE_DOWN: (135, 0)}
+
+  def __init__(self, radius=48, gap=16):
+    self.radius = radius
+    self.gap = gap
+    self.cx = None
+    self.cy = None
+    self.direction = None
+    self.circleColor = M5.Display.COLOR.WHITE
+    self.triColor = M5.Display.COLOR.WHITE
+    self.band = None
+    self.box = None
+    self.dirty = True
+    for (angle, ydiff) in Arrow.DIRECTIONS.values():
+      arrowVertices(radius, gap, angle)
+
+  def update(self, cx, cy, direction, triColor, circleColor=M5.Display.COLOR.WHITE):
+    if direction not in Arrow.DIRECTIONS: direction = None
+    if (cx, cy, direction, triColor, circleColor) != (self.cx, self.cy, self.direction, self.triColor, self.circleColor):
+      self.cx = cx
+      self.cy = cy
+      self.direction = direction
+      self.triColor = triColor
+      self.circleColor = circleColor
+      self.dirty = True
+
+  def target(self):
+    if self.direction == None:
+      return None
+    r = self.radius
+    return (self.cx - r, self.cy - r, 2 * r + 1, 2 * r + 1)
+
+  def erase(self, d):
+    #a circle at the same place covers the old arrow, otherwise clear where it was
+    if self.box == None or self.box == self.target():
+      return []
+    r = self.radius
+    d.fillCircle(self.box[0] + r, self.box[1] + r, r, self.band.color)
+    return [self.box]
+
+  def draw(self, d):
+    if self.direction != None:
+      angle, ydiff = Arrow.DIRECTIONS[self.direction]
+      drawDirectionV2(self.cx, self.cy, radius=self.radius, angle_degrees=angle, gap=self.gap, circle_color=self.circleColor, tri_color=self.triColor, ydiff=ydiff, gfx=d)
+    self.box = self.target()
+    self.dirty = False
+
+class Chart:
+  #glucose plot with the MIN/MAX target band, one slot of step pixels per reading and the
+  #newest reading in the rightmost slot. A new reading moves the plotted pixels to the left
+  #and draws only the slots that came in, the whole plot is drawn again only when the band
+  #was cleared, the limits changed or the history does not line up with what is on screen.
+  #With a sprite in canvas the plot is kept and scrolled off-screen and pushed in one go
+
+  INTERVAL = 300 #seconds between two readings
+  LOW = 40 #sgv at the bottom edge
+  HIGH = 300 #sgv at the top edge
+
+  def __init__(self, x, y, w, h, step=5, radius=2):
+    self.x = x
+    self.y = y
+    self.w = w
+    self.h = h
+    self.step = step
+    self.radius = radius
+    self.background = M5.Display.COLOR.BLACK
+    self.rangeColor = M5.Display.COLOR.DARKGREEN
+    self.newest = None
+    self.limits = None
+    self.slots = {}
+    self.drawn = None
+    self.canvas = None
+    self.band = None
+    self.box = None
+    self.dirty = True
+
+  def update(self, points, low, high):
+    #points are (seconds, sgv) pairs in any order, an empty list hides the chart
+    newest = None
+    slots = {}
+    for (seconds, sgv) in sorted(points, reverse=True):
+      if newest == None: newest = seconds
+      k = int((newest - seconds + Chart.INTERVAL / 2) // Chart.INTERVAL)
+      if k < self.w // self.step and k not in slots:
+        slots[k] = sgv
+    if (newest, (low, high), slots) != (self.newest, self.limits, self.slots):
+      self.newest = newest
+      self.limits = (low, high)
+      self.slots = slots
+      self.dirty = True
+
+  def target(self):
+    if self.newest == None:
+      return None
+    return (self.x, self.y, self.w, self.h)
+
+  def shift(self):
+    #slots the plot moved since it was drawn, None if it has to be drawn from scratch
+    if self.drawn == None:
+      return None
+    newest, limits, slots = self.drawn
+    if limits != self.limits or self.newest < newest:
+      return None
+    shift = int((self.newest - newest + Chart.INTERVAL / 2) // Chart.INTERVAL)
+    for k in range(shift, self.w // self.step):
+      if self.slots.get(k) != slots.get(k - shift):
+        return None
+    return shift
+
+  def sgvY(self, sgv):
+    #row of sgv counted from the top of the chart
+    sgv = min(max(sgv, Chart.LOW), Chart.HIGH)
+    return self.h - 1 - int((sgv - Chart.LOW) * (self.h - 1) / (Chart.HIGH - Chart.LOW))
+
+  def erase(self, d):
+    if self.box == None or self.box == self.target():
+      return []
+    d.fillRect(self.box[0], self.box[1], self.box[2], self.box[3], self.band.color)
+    return [self.box]
+
+  def draw(self, d):
+    box = self.target()
+    if box == None:
+      self.drawn = None
+    elif self.canvas != None and d == M5.Display:
+      #the sprite keeps the plot between renders, so it only ever scrolls
+      self.plot(self.canvas, 0, 0, self.shift())
+      self.canvas.push(self.x, self.y)
+      self.drawn = (self.newest, self.limits, self.slots)
+    elif self.canvas != None:
+      #part of a frame composed off-screen, the sprite is left as it is
+      self.plot(d, self.x, self.y, None)
+    else:
+      self.plot(d, self.x, self.y, self.shift() if self.box == box else None)
+      self.drawn = (self.newest, self.limits, self.slots)
+    self.box = box
+    self.dirty = False
+
+  def plot(self, g, x, y, shift):
+    if shift != None and shift > 0 and shift * self.step < self.w and hasattr(g, 'copyRect'):
+      w = self.w - shift * self.step
+      g.copyRect(x, y, w, self.h, x + shift * self.step, y)
+      self.paint(g, x, y, w, shift * self.step, range(shift))
+    else:
+      self.paint(g, x, y, 0, self.w, self.slots)
+
+  def paint(self, g, x, y, left, w, slots):
+    #background, target band and the points of the given slots, from left to left+w
+    low, high = self.limits
+    top = self.sgvY(high)
+    g.fillRect(x + left, y, w, self.h, self.background)
+    g.fillRect(x + left, y + top, w, self.sgvY(low) - top + 1, self.rangeColor)
+    r = self.radius
+    for k in slots:
+      sgv = self.slots.get(k)
+      if sgv == None:
+        continue
+      color = M5.Display.COLOR.WHITE
+      if sgv < low: color = M5.Display.COLOR.RED
+      elif sgv > high: color = M5.Display.COLOR.ORANGE
+      cx = x + self.w - k * self.step - self.step // 2 - 1
+      cy = y + min(max(self.sgvY(sgv), r), self.h - 1 - r)
+      g.fillCircle(cx, cy, r, color)
+
+class Band:
+  #full width background stripe, owns the widgets drawn on top of it
+
+  def __init__(self, y, h, color, width=320):
+    self.y = y
+    self.h = h
+    self.width = width
+    self.color = color
+    self.widgets = []
+    self.dirty = True
+
+  def add(self, widget):
+    widget.band = self
+    self.widgets.append(widget)
+    return widget
+
+  def setColor(self, color):
+    if color != self.color:
+      self.color = color
+      self.dirty = True
+
+  def render(self, d, only=None):
+    if self.dirty:
+      if only != None:
+        #the band gets repainted by the next full render anyway
+        only.draw(d)
+        return
+      d.fillRect(0, self.y, self.width, self.h, self.color)
+      for widget in self.widgets:
+        widget.box = None
+        widget.dirty = True
+      self.dirty = False
+    widgets = self.widgets if only == None else [only]
+    erased = []
+    for widget in widgets:
+      if widget.dirty:
+        erased += widget.erase(d)
+    #anything uncovered by an erase has to be drawn again
+    for widget in self.widgets:
+      if not widget.dirty and widget.box != None:
+        for rect in erased:
+          if intersects(rect, widget.box):
+            widget.dirty = True
+            widgets = self.widgets
+            break
+    for widget in widgets:
+      if widget.dirty:
+        widget.draw(d)
+
+class Screen:
+
+  def __init__(self):
+    self.bands = []
+    self.rotation = None
+    self.canvas = None
+
+  def add(self, band):
+    self.bands.append(band)
+    return band
+
+  def invalidate(self):
+    #something else painted over the panel, next render starts from scratch
+    for band in self.bands:
+      band.dirty = True
+
+  def render(self, rotation, only=None):
+    if rotation != self.rotation:
+      self.rotation = rotation
+      self.invalidate()
+    M5.Display.setRotation(rotation)
+    full = False
+    for band in self.bands:
+      full = full or band.dirty
+    if full and only == None and self.canvas != None:
+      #compose the whole frame off-screen and push it in one transfer
+      self.invalidate()
+      for band in self.bands:
+        band.render(self.canvas)
+      self.canvas.push(0, 0)
+      return
+    for band in self.bands:
+      if only == None or only.band == band:
+        band.render(M5.Display, only)
+
+#triangle vertex offsets from the arrow center keyed by (radius, gap, angle), every Arrow
+#fills it for the Nightscout directions when created so drawing does no trigonometry
+ARROW_VERTICES = {}
+
+def arrowVertices(radius, gap, angle_degrees):
+  key = (radius, gap, angle_degrees)
+  vertices = ARROW_VERTICES.get(key)
+  if vertices == None:
+    r_tri = radius - gap
+    # We subtract 90 degrees so that Input 0 aligns with "Up" (270 deg / -90 deg on circle)
+    # We add the user input 'angle_degrees' to rotate clockwise from there.
+    rotation_rad = (angle_degrees - 90) * (math.pi / 180)
+    # Vertex 1 is the "Pointer", vertex 2 and 3 are +120 and +240 degrees from it
+    vertices = []
+    for turn in (0, 2 * math.pi / 3, 4 * math.pi / 3):
+      a = rotation_rad + turn
+      vertices.append(int(r_tri * math.cos(a)))
+      vertices.append(int(r_tri * math.sin(a)))
+    vertices = tuple(vertices)
+    ARROW_VERTICES[key] = vertices
+  return vertices
+
+def drawDirectionV2(cx, cy, radius=48, angle_degrees=0, gap=16, circle_color=M5.Display.COLOR.WHITE, tri_color=M5.Display.COLOR.WHITE, ydiff=0, gfx=M5.Lcd):
+    #cx - Center X coordinate
+    #cy - Center Y coordinate
+    #radius - Radius of the circle
+    #gap - Pixel gap
+    #circle_color
+    #tri_color
+    #ydiff - triangle distance
+    #gfx - display or canvas to draw on
+
+    # 1. Clear previous state
+    gfx.fillCircle(cx, cy, radius, circle_color)
+
+    # 2. Look up the vertices
+    dx1, dy1, dx2, dy2, dx3, dy3 = arrowVertices(radius, gap, angle_degrees)
+    x1 = cx + dx1
+    y1 = cy + dy1
+    x2 = cx + dx2
+    y2 = cy + dy2
+    x3 = cx + dx3
+    y3 = cy + dy3
+
+    # 3. Draw
+    if ydiff == 0:
+      gfx.fillTriangle(x1, y1, x2, y2, x3, y3, tri_color)
+    else:
+      gfx.fillTriangle(x1, y1-ydiff, x2, y2-ydiff, x3, y3-ydiff, tri_color)
+      gfx.fillTriangle(x1, y1+ydiff, x2, y2+ydiff, x3, y3+ydiff, tri_color)